@@ -0,0 +1,202 @@
+"""
+This file implements an asynchronous variant of the Benders decomposition method from main.py.
+
+In the synchronous method every iteration waits for the slowest scenario. Here, the dual problems of the scenarios are
+solved by workers which stream their results back as soon as they are available. Each scenario i has its own auxiliary
+variable theta_i (multi-cut), hence every single dual solution yields a valid optimality cut, no matter for which
+candidate x it was computed. The master problem is re-solved as soon as enough scenarios (or a time budget) have reported
+and the new candidate is sent to the workers while they are still working on the previous one.
+"""
+
+import time
+import itertools
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from gurobipy import GRB
+from aux_fct import init_env, init_master, init_scenarios, init_worker, solve_block, solve_block_in_worker
+from aux_fct import stack_blocks, scenario_objectives, bound_criterion
+from cut_pool import CutPool
+
+# Constants
+MAX_ITER = 10000
+TOL_OPT = 0.001
+BATCH_FRACTION = 0.25       # default fraction of the scenarios that have to report before the master is re-solved
+
+
+def asynchronous_benders_decomposition(A,b,c,T,W,h,q,p, num_workers=2, pool="thread", batch_size=None, time_budget=None):
+    """ Solve a block-structured linear program (see benders_decomposition) using asynchronous Benders decomposition.
+
+    The scenarios are split into num_workers blocks and each block is solved by its own worker, one scenario at a time.
+    Each worker processes the scenarios of its candidates in first-in-first-out order, such that every candidate is
+    eventually evaluated for all scenarios. The objective value of a fully evaluated candidate is an upper bound, the
+    optimal value of the master problem a lower bound. A new candidate is only sent to the workers once all scenarios of
+    the older candidates have been started, such that at most two candidates are in progress at any time.
+
+    Input:
+        A,b,c,T,W,h,q,p: Problem data as for benders_decomposition
+        num_workers: Number of workers
+        pool: Either "thread" or "process"
+        batch_size: Number of new scenario results after which the master problem is re-solved
+                    (by default a quarter of the scenarios)
+        time_budget: Time in seconds after which the master problem is re-solved if at least one new result has arrived
+
+    Output:
+        A dictionary containing
+            solution: Best solution found (x,y_1,...,y_N), or only the last master solution x if no candidate was 
+                      evaluated for all scenarios before the method stopped
+            opt_val: Objective value of this solution (inf if there is no evaluated candidate)
+            termination_reason: Reason for termination of the algorithm
+            iter: Number of master problems solved
+            lower_bound: Lower bound on the optimal value given by the master problem
+            upper_bound: Objective value of the best solution found
+            cut_pool: Number of cuts and master solve time after each master solve
+
+    An exception is raised if the problem turns out to be unsolvable.
+    """
+    N = len(W)      # Number of scenarios
+    batch_size = batch_size or max(1, int(BATCH_FRACTION * N))
+    c = np.asarray(c, dtype=np.float64)
+    T, offsets = stack_blocks(T)
+    h = stack_blocks(h)[0]
+
+    # Initialize and solve master problem with one auxiliary variable per scenario
+    env = init_env()
+    master, x, theta = init_master(A,b,c,N,env)
+    if master.Status != GRB.OPTIMAL:
+        raise Exception("Initial relaxation is not solvable.")
+    cut_pool = CutPool(master, x, theta)
+    released = np.zeros(N, dtype=bool)
+
+    # Each block of scenarios is assigned to its own single worker
+    blocks = np.array_split(np.arange(N), num_workers)
+    block_of = np.repeat(np.arange(num_workers), [len(block) for block in blocks])
+    envs, models, variables = [env], [], []
+    if pool == "thread":
+        executors = [ThreadPoolExecutor(max_workers=1) for _ in blocks]
+        for block in blocks:
+            envs.append(init_env())
+            block_models, block_variables = init_scenarios(len(block), [W[i] for i in block], [q[i] for i in block], envs[-1])
+            models += block_models
+            variables += block_variables
+    elif pool == "process":
+        executors = [ProcessPoolExecutor(max_workers=1, initializer=init_worker, initargs=([W[i] for i in block], [q[i] for i in block]))
+                     for block in blocks]
+    else:
+        raise Exception("Unknown pool type. Choose either 'thread' or 'process'.")
+
+    queues = [deque() for _ in blocks]      # scenarios (candidate, scenario) waiting to be solved by each worker
+    running = {}                            # future -> (candidate, scenario, worker)
+    candidates = {}                         # candidates which are not fully evaluated yet
+    counter = itertools.count()
+    upper, lower = np.inf, -np.inf
+    x_best, y_best = None, None
+
+    def add_candidate(x_value):
+        """ Queue all scenarios for the candidate x_value. """
+        k = next(counter)
+        candidates[k] = {"x": x_value, "objectives": scenario_objectives(T, h, offsets, x_value), "value": c@x_value,
+                         "remaining": N, "unstarted": N, "y": [None] * N}
+        for scenario in range(N):
+            queues[block_of[scenario]].append((k, scenario))
+
+    def dispatch():
+        """ Send the next queued scenario to each idle worker. """
+        busy = {worker for (_, _, worker) in running.values()}
+        for worker, queue in enumerate(queues):
+            if worker not in busy and queue:
+                k, scenario = queue.popleft()
+                candidates[k]["unstarted"] -= 1
+                d = candidates[k]["objectives"][scenario]
+                if pool == "thread":
+                    future = executors[worker].submit(solve_block, models, variables, {scenario: d}, [scenario])
+                else:
+                    local = scenario - blocks[worker][0]
+                    future = executors[worker].submit(solve_block_in_worker, {local: d}, [local])
+                running[future] = (k, scenario, worker)
+
+    def terminated(reason=False):
+        return bound_criterion(len(cut_pool.master_time), MAX_ITER, lower, upper, TOL_OPT, reason)
+
+    try:
+        x_last = x.X
+        add_candidate(x_last)
+        cut_pool.update(x.X, np.zeros(N), 0)
+        dispatch()
+        new_results = 0
+        last_solve = time.perf_counter()
+        while not terminated():
+            # Wait for the next result (or until the time budget is used up)
+            timeout = None if time_budget is None else max(0, last_solve + time_budget - time.perf_counter())
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                k, scenario, _ = running.pop(future)
+                status, vector, obj_val, y_scenario = future.result()[0]
+                new_results += 1
+                candidate = candidates.get(k)
+                rows = slice(offsets[scenario], offsets[scenario+1])
+
+                # If the dual is infeasible, the primal problem is infeasible or unbounded (and hence not solvable)
+                if status == GRB.INFEASIBLE:
+                    raise Exception("Problem is not solvable")
+
+                # If the dual is unbounded, add a feasibility cut and discard the candidate
+                if status == GRB.UNBOUNDED:
+                    cut_pool.add((T[rows].T@vector)[None,:], [-1], [np.dot(vector,h[rows])])
+                    if candidate is not None:
+                        del candidates[k]
+                        for queue in queues:
+                            for task in [task for task in queue if task[0] == k]:
+                                queue.remove(task)
+
+                # If the dual problem is solvable, add an optimality cut for theta_i of the scenario
+                if status == GRB.OPTIMAL:
+                    cut_pool.add(p[scenario] * (T[rows].T@vector)[None,:], [scenario], [p[scenario] * np.dot(vector,h[rows])])
+                    if not released[scenario]:
+                        theta[scenario].LB = -np.inf
+                        theta[scenario].UB = np.inf
+                        released[scenario] = True
+                    if candidate is not None:
+                        candidate["value"] += p[scenario] * obj_val
+                        candidate["y"][scenario] = y_scenario
+                        candidate["remaining"] -= 1
+                        if candidate["remaining"] == 0:
+                            # The candidate is fully evaluated and yields an upper bound
+                            if candidate["value"] < upper:
+                                upper, x_best, y_best = candidate["value"], candidate["x"], candidate["y"]
+                            del candidates[k]
+
+            # Re-solve the master problem if enough results have arrived and the older candidates have all been started
+            idle = not running and not any(queues)
+            triggered = new_results >= batch_size or (time_budget is not None and new_results > 0 and
+                                                      time.perf_counter() - last_solve >= time_budget)
+            latest = max(candidates, default=-1)
+            if idle or (triggered and all(candidates[k]["unstarted"] == 0 for k in candidates if k != latest)):
+                start = time.perf_counter()
+                master.optimize()
+                if master.Status != GRB.OPTIMAL:
+                    raise Exception("Problem is unsolvable")
+                x_last = x.X
+                cut_pool.update(x_last, theta.X, time.perf_counter() - start)
+                if np.all(released):
+                    lower = master.ObjVal
+                if idle or latest not in candidates or not np.allclose(x.X, candidates[latest]["x"]):
+                    add_candidate(x.X)
+                new_results = 0
+                last_solve = time.perf_counter()
+
+            dispatch()
+
+    finally:
+        for executor in executors:
+            executor.shutdown(cancel_futures=True)
+        for model in [master] + models:
+            model.dispose()
+        for env in envs:
+            env.dispose()
+
+    # The optimal primal solutions of the scenarios are the duals of the optimal dual solutions
+    solution = np.hstack((x_best, np.ravel(y_best))) if x_best is not None else x_last
+    return {"solution": solution, "opt_val": upper, "termination_reason": terminated(reason=True),
+            "iter": len(cut_pool.master_time) - 1, "lower_bound": lower, "upper_bound": upper, "cut_pool": cut_pool.statistics()}
@@ -1,32 +1,51 @@
 """ This file implements several auxiliary functions for the Benders decomposition method from main.py. """
 
 import numpy as np
+import scipy.sparse as sp
 import gurobipy as gp
 from gurobipy import GRB 
 
 
-def init_master(A,b,c):
-    """ Initialize and solve the master problem. """
+def init_env():
+    """ Start a Gurobi environment which can be shared by several models. """
     env = gp.Env(empty=True)
     env.setParam("OutputFlag",0)    # suppress any Gurobi console output
     env.start()
-    master = gp.Model(env=env)
+
+    return env
+
+
+def init_master(A,b,c,num_clusters=1,env=None):
+    """ 
+    Initialize and solve the master problem. 
+    
+    One auxiliary variable theta_j is added for each of the num_clusters clusters of scenarios. 
+    The variables are fixed to 0 until the first optimality cuts are added (otherwise the master is unbounded).
+    If no environment is given, a new one is started.
+    """
+    master = gp.Model(env=env or init_env())
     x = master.addMVar(shape=np.shape(A)[1], vtype=GRB.CONTINUOUS)      # x >= 0 is set by default
     master.addConstr(A@x == b)
     master.setObjective(c@x, GRB.MINIMIZE)
     master.optimize()
+    theta = master.addMVar(shape=num_clusters, vtype=GRB.CONTINUOUS, obj=1, lb=0, ub=0)
+
+    return master, x, theta
 
-    return master, x
 
+def init_clusters(N, num_clusters):
+    """ Assign the scenarios to num_clusters clusters of consecutive scenarios and return the cluster of each scenario. """
+    if not 1 <= num_clusters <= N:
+        raise Exception("The number of clusters has to be between 1 and the number of scenarios.")
+    return np.repeat(np.arange(num_clusters), [len(cluster) for cluster in np.array_split(np.arange(N), num_clusters)])
 
-def init_scenarios(N, W, q):
-    """ Initialize the optimization model for each scenario. """
+
+def init_scenarios(N, W, q, env=None):
+    """ Initialize the optimization model for each scenario. All models share the environment env (a new one if not given). """
+    env = env or init_env()
     models = []
     variables = []
     for scenario in range(N):
-        env = gp.Env(empty=True)
-        env.setParam("OutputFlag",0)    # suppress any Gurobi console output
-        env.start()
         model = gp.Model(env=env)
         models.append(model)
         models[-1].Params.DualReductions = 0     # distinguish between infeasible and unbounded problems   
@@ -37,10 +56,161 @@ def init_scenarios(N, W, q):
     return models, variables
 
 
-def stopping_criterion(iter, MAX_ITER, theta, models, p, N, TOL_OPT, reason=False):
+def stack_blocks(blocks):
+    """ 
+    Stack the matrices T_1,...,T_N (or the vectors h_1,...,h_N) on top of each other. 
+    
+    Output:
+        The stacked matrix (in CSR format if any block is a scipy.sparse matrix) or vector 
+        and the offsets such that block i consists of the rows offsets[i]:offsets[i+1]
+    """
+    offsets = np.concatenate(([0], np.cumsum([np.shape(block)[0] for block in blocks])))
+    if any(sp.issparse(block) for block in blocks):
+        return sp.vstack(blocks, format="csr"), offsets
+    if np.ndim(blocks[0]) == 1:
+        return np.concatenate(blocks).astype(np.float64), offsets
+    return np.vstack(blocks), offsets
+
+
+def extensive_form(A,b,c,T,W,h,q,p):
+    """ 
+    Build the extensive form of the block-structured linear program (see benders_decomposition), i.e. the constraint 
+    matrix as sparse CSR matrix, the right-hand side and the cost vector of the variables (x,y_1,...,y_N).
+    """
+    blocks = [sp.csr_matrix(block) for block in W]
+    A_ = sp.bmat([[sp.csr_matrix(A), None], [stack_blocks([sp.csr_matrix(block) for block in T])[0], sp.block_diag(blocks)]], 
+                 format="csr")
+    b_ = np.concatenate((np.asarray(b, dtype=np.float64), stack_blocks(h)[0]))
+    c_ = np.concatenate([np.asarray(c, dtype=np.float64)] + [p_i * np.asarray(q_i, dtype=np.float64) for p_i, q_i in zip(p, q)])
+
+    return A_, b_, c_
+
+
+def solve_extensive_form(A,b,c,T,W,h,q,p, env=None):
+    """ 
+    Solve the extensive form of the block-structured linear program directly with Gurobi.
+
+    Output:
+        A dictionary containing the optimal solution (x,y_1,...,y_N), its objective value and the runtime of Gurobi
+    """
+    A_, b_, c_ = extensive_form(A,b,c,T,W,h,q,p)
+    model_env = env or init_env()
+    model = gp.Model(env=model_env)
+    try:
+        x = model.addMVar(shape=A_.shape[1], vtype=GRB.CONTINUOUS)
+        model.addConstr(A_@x == b_)
+        model.setObjective(c_@x, GRB.MINIMIZE)
+        model.optimize()
+        if model.Status != GRB.OPTIMAL:
+            raise Exception("Problem is not solvable")
+        return {"solution": x.X, "opt_val": model.ObjVal, "runtime": model.Runtime}
+    finally:
+        model.dispose()
+        if env is None:
+            model_env.dispose()
+
+
+def scenario_objectives(T_stack, h_stack, offsets, x_master):
+    """ Compute the objectives h_i - T_i*x_master of all scenarios with a single matrix-vector product. """
+    return np.split(h_stack - T_stack@x_master, offsets[1:-1])
+
+
+def optimality_cut(T_stack, h_stack, offsets, duals, p, clusters, num_clusters):
+    """ 
+    Compute the coefficients sum_i p_i * T_i^T pi_i and right-hand sides sum_i p_i * h_i*pi_i of the optimality cuts, 
+    where the sums run over the scenarios i of each cluster and pi_i are the dual solutions duals.
+    All cuts are obtained from one product of T_stack with a sparse matrix holding the weighted duals of each cluster.
+    """
+    sizes = np.diff(offsets)
+    weights = np.repeat(p, sizes) * np.concatenate(duals)
+    P = sp.csr_matrix((weights, (np.repeat(clusters, sizes), np.arange(len(weights)))), shape=(num_clusters, len(weights)))
+    coefs = P@T_stack
+    if sp.issparse(coefs):
+        coefs = coefs.tocsr()
+
+    return coefs, P@h_stack
+
+
+def solve_scenario(model, variables, d):
+    """ 
+    Solve the dual problem of a single scenario with objective d = h_i - T_i*x for the current master solution x.
+
+    Output:
+        Tuple (status, vector, obj_val, y) where vector is the optimal dual solution if the dual problem is solvable and 
+        an unbounded ray if it is unbounded. obj_val and the optimal primal solution y are only set if the dual is solvable.
+        If the iteration limit of the model is reached, vector and obj_val belong to the last point of the simplex method.
+    """
+    model.setObjective(d@variables, GRB.MAXIMIZE)
+    model.optimize()
+
+    if model.Status == GRB.OPTIMAL:
+        return model.Status, variables.X, model.ObjVal, np.array(model.getAttr("Pi", model.getConstrs()))
+    if model.Status == GRB.UNBOUNDED:
+        return model.Status, variables.UnbdRay, None, None
+    if model.Status == GRB.ITERATION_LIMIT:
+        # The current (possibly not dual feasible) point of the simplex method
+        return model.Status, variables.X, np.dot(d, variables.X), None
+    return model.Status, None, None, None
+
+
+def solve_scenarios(models, variables, objectives, executors=None, blocks=None):
+    """ 
+    Solve the dual problems of all scenarios, where objectives[i] = h_i - T_i*x is the objective of scenario i.
+
+    If no executors are given, the scenarios are solved one after another. Otherwise, blocks[j] is a block of scenario 
+    indices which is always solved by the single worker of executors[j] (a thread or a process), such that each scenario 
+    model keeps its warm start. In both cases all scenarios are solved, such that every scenario model is in the same 
+    state afterwards, and the returned list of results (see solve_scenario) is in scenario order and ends with the first 
+    scenario that is infeasible or unbounded, so that the generated cuts do not depend on the workers.
+    """
+    if executors is None:
+        results = solve_block(models, variables, objectives, range(len(objectives)))
+    elif models is None:
+        # Worker processes hold the models of their block themselves
+        futures = [executor.submit(solve_block_in_worker, [objectives[scenario] for scenario in block]) 
+                   for executor, block in zip(executors, blocks)]
+    else:
+        futures = [executor.submit(solve_block, models, variables, objectives, block) 
+                   for executor, block in zip(executors, blocks)]
+    if executors is not None:
+        results = [result for future in futures for result in future.result()]
+
+    for scenario in range(len(results)):
+        if results[scenario][0] in (GRB.INFEASIBLE, GRB.UNBOUNDED):
+            return results[:scenario+1]
+    return results
+
+
+def solve_block(models, variables, objectives, block):
+    """ Solve the dual problems of the scenarios in block one after another. """
+    return [solve_scenario(models[scenario], variables[scenario], objectives[scenario]) for scenario in block]
+
+
+# Scenario models of a worker process
+_worker = {}
+
+
+def init_worker(W, q):
+    """ Initialize the models of a worker process for the block of scenarios given by W and q. """
+    models, variables = init_scenarios(len(W), W, q, init_env())
+    _worker.update(models=models, variables=variables)
+
+
+def solve_block_in_worker(objectives, block=None):
+    """ 
+    Solve the dual problems of the block of scenarios of a worker process. 
+    If block is given, only the scenarios with these indices within the block are solved and objectives is indexed by them.
+    """
+    return solve_block(_worker["models"], _worker["variables"], objectives, range(len(objectives)) if block is None else block)
+
+
+def stopping_criterion(iter, MAX_ITER, theta, obj_vals, p, TOL_OPT, reason=False):
     """ 
     If reason = False, test if one of the stopping criteria is met. 
     If reason = True, return the reason for termination. 
+
+    obj_vals stores the optimal values of the dual problems of the scenarios in the last iteration 
+    (or None if not all of them were solvable).
     """
 
     if iter > MAX_ITER:
@@ -49,10 +219,29 @@ def stopping_criterion(iter, MAX_ITER, theta, models, p, N, TOL_OPT, reason=Fals
         return True
     
     try:
-        if np.abs((np.sum([p[model] * models[model].ObjVal for model in range(N)]) - theta.X) / theta.X) <= TOL_OPT:
+        if np.abs((np.dot(p, obj_vals) - np.sum(theta.X)) / np.sum(theta.X)) <= TOL_OPT:
             if reason == True:
                 return "Relative objective tolerance reached"
             return True
         return False
     except:
         return False
+
+
+def bound_criterion(iter, MAX_ITER, lower, upper, TOL_OPT, reason=False):
+    """ 
+    Stopping criterion based on the relative gap between a lower and an upper bound on the optimal value.
+    If reason = False, test if one of the stopping criteria is met. 
+    If reason = True, return the reason for termination. 
+    """
+
+    if iter > MAX_ITER:
+        if reason == True:
+            return "Maximum number of iterations reached"
+        return True
+
+    if upper < np.inf and upper - lower <= TOL_OPT * np.abs(upper):
+        if reason == True:
+            return "Relative objective tolerance reached"
+        return True
+    return False
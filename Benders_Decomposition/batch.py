@@ -0,0 +1,126 @@
+"""
+This file implements a batch interface which solves many independent problems with the Benders decomposition method
+from main.py in parallel.
+
+Each instance is decomposed on its own, so the scenarios of different instances never share a master problem. The
+instances are distributed over worker processes, each of which starts one Gurobi environment and reuses it for the
+master and scenario problems of all its instances. Within a worker, benders_decomposition runs sequentially by default;
+combining the batch with num_workers of benders_decomposition oversubscribes the cores. All scenario data of an
+instance is pickled to its worker, so for instances with very many scenarios the out-of-core solver from
+scenario_store.py is more suitable. Results are yielded in the order they finish and the instances are submitted in
+bounded portions. An exception is reported in the result of its instance; if an instance kills its worker, the
+unfinished instances are solved one at a time to isolate it and the pool is restarted.
+"""
+
+import os
+import time
+import gurobipy as gp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from main import benders_decomposition
+
+# Constants
+TASKS_PER_WORKER = 2    # number of instances submitted per worker at a time
+
+# Gurobi environment of a worker process
+_env = None
+
+
+def init_batch_worker():
+    """ Start the Gurobi environment reused for all instances solved by this worker process. """
+    global _env
+    _env = gp.Env(empty=True)
+    _env.setParam("OutputFlag",0)    # suppress any Gurobi console output
+    _env.start()
+
+
+def solve_instance(index, instance, options):
+    """ Solve a single instance in a worker process and return its index, wall time and result or error message. """
+    start = time.perf_counter()
+    try:
+        result = benders_decomposition(**instance, **options, env=_env)
+    except Exception as error:
+        return {"index": index, "wall_time": time.perf_counter() - start, "error": f"{type(error).__name__}: {error}"}
+    return {"index": index, "wall_time": time.perf_counter() - start, "result": result}
+
+
+def solve_batch(instances, num_workers=None, context=None, **options):
+    """
+    Solve many independent problems with the Benders decomposition method in parallel and yield the results as soon as
+    they are finished.
+
+    Input:
+        instances: Iterable of dictionaries with the arguments A, b, c, T, W, h, q and p of benders_decomposition (and 
+                   possibly further options for this instance)
+        num_workers: Number of worker processes (None for the number of CPUs)
+        context: Multiprocessing context of the workers (None for the default start method)
+        options: Further arguments of benders_decomposition used for all instances
+
+    Output:
+        Generator of dictionaries containing
+            index: Position of the instance in instances
+            wall_time: Wall time of the solve in the worker
+            result: Dictionary returned by benders_decomposition (if it succeeded)
+            error: Error message (if it failed)
+    """
+    num_workers = num_workers or os.cpu_count()
+    instances = enumerate(instances)
+    pending = {}        # future -> (index, instance)
+    executor = ProcessPoolExecutor(num_workers, mp_context=context, initializer=init_batch_worker)
+    try:
+        while True:
+            # Keep a bounded number of instances submitted
+            retry = []
+            for index, instance in instances:
+                try:
+                    pending[executor.submit(solve_instance, index, instance, options)] = (index, instance)
+                except BrokenProcessPool:
+                    retry.append((index, instance))
+                    break
+                except Exception as error:
+                    yield _error(index, error)
+                    continue
+                if len(pending) >= TASKS_PER_WORKER * num_workers:
+                    break
+            if not pending and not retry:
+                return
+
+            done = wait(pending, return_when=FIRST_COMPLETED)[0] if pending else []
+            for future in done:
+                index, instance = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    retry.append((index, instance))
+                    continue
+                except Exception as error:
+                    # E.g. the instance could not be pickled to the worker
+                    result = _error(index, error)
+                yield result
+
+            if retry:
+                # A worker died, hence all unfinished instances are solved on their own to isolate the failing one
+                retry += list(pending.values())
+                pending.clear()
+                executor.shutdown(cancel_futures=True)
+                for index, instance in sorted(retry, key=lambda item: item[0]):
+                    yield from _solve_alone(index, instance, options, context)
+                executor = ProcessPoolExecutor(num_workers, mp_context=context, initializer=init_batch_worker)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _solve_alone(index, instance, options, context):
+    """ Solve an instance in its own worker process (after the pool broke) and yield its result or the failure. """
+    with ProcessPoolExecutor(1, mp_context=context, initializer=init_batch_worker) as executor:
+        try:
+            yield executor.submit(solve_instance, index, instance, options).result()
+        except BrokenProcessPool:
+            yield {"index": index, "wall_time": None, "error": "The worker process terminated abruptly."}
+        except Exception as error:
+            yield _error(index, error)
+
+
+def _error(index, error):
+    """ Return the record of an instance which could not be passed to or returned from a worker process. """
+    return {"index": index, "wall_time": None, "error": f"{type(error).__name__}: {error}"}
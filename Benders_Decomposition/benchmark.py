@@ -0,0 +1,118 @@
+"""
+This file implements a benchmark comparing several variants of the Benders decomposition method from main.py with the
+direct solution of the (sparse) extensive form by Gurobi.
+
+Starting from the base instance size BASE, each of the parameters in SWEEP is varied separately. For every size and
+repetition a randomized two-stage problem (see build_instance in tests.py) is built from a fixed seed and solved by every
+method in a fresh worker process, such that the peak memory of each solve can be measured. The wall time, the peak
+memory, the number of iterations and the relative deviation of the optimal value from the direct solve are written to
+a JSON file.
+
+Usage: python benchmark.py [output file]
+"""
+
+import sys
+import json
+import time
+import resource
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from aux_fct import solve_extensive_form
+from main import benders_decomposition
+from instances import build_instance
+
+# Benchmark configuration
+BASE = {"n": 100, "m": 50, "s": 10, "k": 20, "N": 100}
+SWEEP = {"N": [10, 100, 1000, 5000], "n": [50, 100, 200], "s": [5, 10, 20], "k": [10, 20, 40]}
+VARIANTS = {"single_cut": {}, "multi_cut": {"num_clusters": "N"}, "trust_region": {"stabilization": "trust_region"},
+            "inexact": {"inexact": "limit"}}
+COMPLETE_RECOURSE = True
+REPEATS = 3
+SEED = 0
+TOL = 0.01
+OUTPUT = "benchmark_results.json"
+
+
+def run(method, size, seed):
+    """
+    Build the instance of the given size from the seed and solve it with the given method (in a worker process).
+
+    Output:
+        Dictionary with the wall time of the solve, the peak memory of the process, the number of iterations and the
+        optimal value (or an error message)
+    """
+    np.random.seed(seed)
+    A,b,c,T,W,h,q,p = build_instance(**size, complete_recourse=COMPLETE_RECOURSE)
+
+    start = time.perf_counter()
+    try:
+        if method == "extensive_form":
+            result = solve_extensive_form(A,b,c,T,W,h,q,p)
+            result["iter"] = None
+        else:
+            options = {key: size["N"] if value == "N" else value for key, value in VARIANTS[method].items()}
+            result = benders_decomposition(A,b,c,T,W,h,q,p, **options)
+    except Exception as error:
+        return {"wall_time": time.perf_counter() - start, "error": str(error)}
+    wall_time = time.perf_counter() - start
+
+    # The maximum resident set size is given in kilobytes on Linux
+    return {"wall_time": wall_time, "peak_memory_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "iter": result["iter"], "opt_val": result["opt_val"]}
+
+
+def sizes(base, sweep):
+    """ Return the instance sizes obtained by varying one parameter of base at a time (without duplicates). """
+    result = []
+    for parameter, values in sweep.items():
+        for value in values:
+            size = dict(base, **{parameter: value})
+            if size not in result:
+                result.append(size)
+    return result
+
+
+def benchmark(base=BASE, sweep=SWEEP, variants=VARIANTS, repeats=REPEATS, seed=SEED, output=OUTPUT):
+    """ Run the benchmark, print a summary of each solve and write all records to the JSON file output. """
+    methods = ["extensive_form"] + list(variants)
+    records = []
+
+    # Each solve runs in its own freshly started process
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as executor:
+        for size in sizes(base, sweep):
+            for repeat in range(repeats):
+                instance_seed = seed + repeat
+                reference = None
+                for method in methods:
+                    record = dict(size, method=method, seed=instance_seed, repeat=repeat)
+                    record.update(executor.submit(run, method, size, instance_seed).result())
+                    if method == "extensive_form":
+                        reference = record.get("opt_val")
+                    if "opt_val" in record and reference is not None:
+                        record["rel_error"] = float(abs(record["opt_val"] - reference) / abs(reference))
+                        record["agree"] = bool(record["rel_error"] <= TOL)
+                    records.append(record)
+                    print(summary(record))
+
+    with open(output, "w") as file:
+        json.dump({"config": {"base": base, "sweep": sweep, "variants": variants, "repeats": repeats, "seed": seed,
+                              "complete_recourse": COMPLETE_RECOURSE},
+                   "results": records}, file, indent=1)
+
+    return records
+
+
+def summary(record):
+    """ Textual summary of a single record. """
+    size = ", ".join(f"{key}={record[key]}" for key in BASE)
+    if "error" in record:
+        return f"{size}, {record['method']}: failed ({record['error']})"
+    return (f"{size}, {record['method']}: {record['wall_time']:.2f}s, {record['peak_memory_mb']:.0f} MB, "
+            f"{record['iter'] if record['iter'] is not None else '-'} iterations, "
+            f"{'no reference' if 'agree' not in record else 'agrees' if record['agree'] else 'does not agree'}")
+
+
+if __name__ == "__main__":
+    benchmark(output=sys.argv[1] if len(sys.argv) > 1 else OUTPUT)
@@ -0,0 +1,153 @@
+"""
+This file implements the deduplication of scenarios with identical recourse structure for the Benders decomposition method
+from main.py.
+
+Scenarios i with the same W_i and q_i have the same dual feasible region {pi : W_i^T pi <= q_i} and only differ in the
+objective h_i - T_i x. Therefore, only one dual model is kept per distinct structure together with a cache of the dual
+vertices and extreme rays found so far. A cached vertex pi with basis B (the indices of the constraints active at pi)
+is optimal for the objective d if and only if W_B^{-1} d >= 0, and a cached ray r proves unboundedness if r*d > 0.
+Hence, an LP only has to be solved if no cached vertex or ray is proven to be optimal.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from gurobipy import GRB
+from aux_fct import init_scenarios, solve_scenario
+
+# Tolerance for the optimality and unboundedness checks with cached vertices and rays
+TOL_CACHE = 1e-9
+
+
+def init_structures(W, q):
+    """
+    Detect the scenarios sharing the same recourse structure (W_i, q_i).
+
+    Output:
+        structures: Array of length N storing the index of the structure of each scenario
+        representatives: List with one scenario index for each distinct structure
+    """
+    keys = {}
+    structures = np.zeros(len(W), dtype=int)
+    representatives = []
+    for scenario in range(len(W)):
+        q_i = np.asarray(q[scenario], dtype=np.float64)
+        if sp.issparse(W[scenario]):
+            W_i = sp.csr_matrix(W[scenario], dtype=np.float64)
+            W_i.sum_duplicates()
+            W_i.eliminate_zeros()
+            key = (W_i.shape, W_i.data.tobytes(), W_i.indices.tobytes(), W_i.indptr.tobytes(), q_i.tobytes())
+        else:
+            W_i = np.asarray(W[scenario], dtype=np.float64)
+            key = (W_i.shape, W_i.tobytes(), q_i.tobytes())
+        if key not in keys:
+            keys[key] = len(representatives)
+            representatives.append(scenario)
+        structures[scenario] = keys[key]
+
+    return structures, representatives
+
+
+class DualCache:
+    """ Dual model of one recourse structure (W,q) together with the dual vertices and extreme rays found so far. """
+
+    def __init__(self, W, q, env):
+        self.W = W.toarray() if sp.issparse(W) else np.asarray(W, dtype=np.float64)
+        models, variables = init_scenarios(1, [W], [q], env)
+        self.model, self.variables = models[0], variables[0]
+
+        s = self.W.shape[0]
+        self.vertices = np.zeros((0, s))           # cached dual vertices pi
+        self.inverse_bases = np.zeros((0, s, s))    # inverse of W_B for each vertex
+        self.bases = np.zeros((0, s), dtype=int)     # indices B of the active constraints of each vertex
+        self.rays = np.zeros((0, s))                # cached extreme rays
+
+        self.lp_solves = 0
+        self.hits = 0
+
+
+    def lookup(self, D):
+        """
+        Check the objectives given by the columns of D against the cache in a single vectorized pass.
+
+        Output:
+            List with one entry for each column of D which is either a result tuple (see solve_scenario)
+            or None if the cache does not prove optimality or unboundedness.
+        """
+        results = [None] * D.shape[1]
+        unbounded = np.full(D.shape[1], -1)
+        optimal = np.full(D.shape[1], -1)
+
+        if len(self.rays) > 0:
+            products = self.rays@D
+            certified = products > TOL_CACHE * np.linalg.norm(self.rays, axis=1)[:,None] * np.linalg.norm(D, axis=0)
+            unbounded = np.where(np.any(certified, axis=0), np.argmax(certified, axis=0), -1)
+
+        if len(self.vertices) > 0:
+            multipliers = self.inverse_bases@D          # shape (number of vertices, s, number of objectives)
+            certified = np.all(multipliers >= -TOL_CACHE * (1 + np.abs(multipliers).max(axis=1, keepdims=True)), axis=1)
+            optimal = np.where(np.any(certified, axis=0), np.argmax(certified, axis=0), -1)
+
+        for j in range(D.shape[1]):
+            if unbounded[j] >= 0:
+                results[j] = (GRB.UNBOUNDED, self.rays[unbounded[j]], None, None)
+            elif optimal[j] >= 0:
+                vertex = optimal[j]
+                y = np.zeros(self.W.shape[1])
+                y[self.bases[vertex]] = np.maximum(multipliers[vertex,:,j], 0)
+                results[j] = (GRB.OPTIMAL, self.vertices[vertex], np.dot(self.vertices[vertex], D[:,j]), y)
+        self.hits += sum(result is not None for result in results)
+
+        return results
+
+
+    def solve(self, d):
+        """ Solve the dual problem for the objective d and add the found vertex or ray to the cache. """
+        result = solve_scenario(self.model, self.variables, d)
+        self.lp_solves += 1
+
+        if result[0] == GRB.UNBOUNDED:
+            self.rays = np.vstack((self.rays, result[1]))
+        elif result[0] == GRB.OPTIMAL:
+            # The basis consists of the nonbasic (i.e. active) constraints if all dual variables are basic
+            basis = np.flatnonzero(np.array(self.model.getAttr("CBasis", self.model.getConstrs())) == -1)
+            if len(basis) == self.W.shape[0] and np.all(self.variables.VBasis == 0):
+                W_B = self.W[:,basis]
+                if np.linalg.matrix_rank(W_B) == W_B.shape[0]:
+                    self.vertices = np.vstack((self.vertices, result[1]))
+                    self.inverse_bases = np.concatenate((self.inverse_bases, np.linalg.inv(W_B)[None]))
+                    self.bases = np.vstack((self.bases, basis))
+
+        return result
+
+
+    def dispose(self):
+        """ Free the Gurobi model. """
+        self.model.dispose()
+
+
+
+def solve_scenarios_cached(caches, structures, objectives):
+    """
+    Solve the dual problems of all scenarios with objectives[i] = h_i - T_i*x using the caches of their structures.
+
+    All objectives are first checked against the cache of their structure. The remaining scenarios are solved in scenario
+    order (rechecking the cache which may have grown in the meantime). As for solve_scenarios, the returned list is in
+    scenario order and ends with the first scenario that is infeasible or unbounded.
+    """
+    results = [None] * len(objectives)
+    for structure, cache in enumerate(caches):
+        scenarios = np.flatnonzero(structures == structure)
+        D = np.column_stack([objectives[scenario] for scenario in scenarios])
+        for scenario, result in zip(scenarios, cache.lookup(D)):
+            results[scenario] = result
+
+    for scenario in range(len(objectives)):
+        if results[scenario] is None:
+            cache = caches[structures[scenario]]
+            results[scenario] = cache.lookup(objectives[scenario][:,None])[0]
+            if results[scenario] is None:
+                results[scenario] = cache.solve(objectives[scenario])
+        if results[scenario][0] in (GRB.INFEASIBLE, GRB.UNBOUNDED):
+            return results[:scenario+1]
+
+    return results
@@ -0,0 +1,129 @@
+"""
+This file implements the management of the feasibility and optimality cuts of the master problem of the Benders
+decomposition method from main.py.
+
+Every cut has the form  G_j x + theta_{k_j} >= r_j  (without theta for feasibility cuts). The pool stores all cuts
+generated so far together with their age, i.e. the number of consecutive iterations in which they were not active at the
+master solution. Cuts which are inactive for more than max_age iterations are removed from the master problem, such
+that it does not grow without bound. Removed cuts stay in the pool and are added again as soon as they are violated by
+a master solution.
+
+The coefficients are stored in preallocated arrays whose capacity is doubled when they are full (sparse coefficients
+are stored densely, since they only have the columns of x), and whether each cut is in the master problem is tracked in
+a boolean array, such that adding cuts and finding the removed ones does not scan the whole pool.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+
+# Constants
+TOL_SLACK = 1e-6        # tolerance to decide whether a cut is active or violated (relative to its right-hand side)
+CAPACITY = 64           # initial number of cuts the pool has space for
+
+
+class CutPool:
+    """ Pool of all cuts of a master problem with the variables x and theta. """
+
+    def __init__(self, master, x, theta, max_age=None):
+        self.master = master
+        self.x = x
+        self.theta = theta
+        self.max_age = max_age      # None means that cuts are never removed
+
+        self.G = np.zeros((CAPACITY, x.shape[0]))              # coefficients of x
+        self.thetas = np.zeros(CAPACITY, dtype=int)            # index of the variable theta of each cut (-1 for feasibility cuts)
+        self.rhs = np.zeros(CAPACITY)
+        self.ages = np.zeros(CAPACITY, dtype=int)
+        self.present = np.zeros(CAPACITY, dtype=bool)          # whether the cut is in the master problem
+        self.constrs = []                                      # constraint in the master problem (None if removed)
+        self.count = 0
+
+        # Statistics for each iteration
+        self.active = []            # number of cuts in the master problem
+        self.removed = []           # number of removed cuts
+        self.master_time = []       # wall time of solving the master problem
+
+
+    def add(self, G, thetas, rhs):
+        """ Add the cuts G x + theta[thetas] >= rhs to the pool and the master problem and return their indices. """
+        G = G.toarray() if sp.issparse(G) else np.atleast_2d(G)
+        rhs = np.atleast_1d(rhs)
+        while self.count + len(rhs) > len(self.rhs):
+            self.G = np.vstack((self.G, np.zeros_like(self.G)))
+            self.thetas, self.rhs, self.ages, self.present = (np.concatenate((array, np.zeros_like(array)))
+                                                              for array in (self.thetas, self.rhs, self.ages, self.present))
+        ids = np.arange(self.count, self.count + len(rhs))
+        self.G[ids], self.thetas[ids], self.rhs[ids] = G, thetas, rhs
+        self.constrs += [None] * len(rhs)
+        self.count += len(rhs)
+        self._insert(ids)
+
+        return ids
+
+
+    def set_rhs(self, ids, rhs):
+        """ Replace the right-hand sides of the cuts with the given indices. """
+        self.rhs[ids] = rhs
+        for id, value in zip(np.atleast_1d(ids), np.atleast_1d(rhs)):
+            if self.present[id]:
+                self.constrs[id].RHS = value
+
+
+    def slacks(self, x_value, theta_value):
+        """ Compute G x + theta[thetas] - rhs for all cuts with one matrix-vector product. """
+        return (self.G[:self.count]@x_value + np.append(theta_value, 0)[self.thetas[:self.count]] - 
+                self.rhs[:self.count])
+
+
+    def add_violated(self, x_value, theta_value):
+        """ Add removed cuts which are violated by (x_value, theta_value) back to the master problem.
+        Return whether any cut was added. """
+        removed = ~self.present[:self.count]
+        if not np.any(removed):
+            return False
+        violated = removed & (self.slacks(x_value, theta_value) < -TOL_SLACK * (1 + np.abs(self.rhs[:self.count])))
+        self._insert(np.flatnonzero(violated))
+
+        return bool(np.any(violated))
+
+
+    def update(self, x_value, theta_value, master_time):
+        """ Age the cuts at the master solution (x_value, theta_value), remove the old ones and record statistics. """
+        if self.max_age is not None:
+            inactive = self.slacks(x_value, theta_value) > TOL_SLACK * (1 + np.abs(self.rhs[:self.count]))
+            self.ages[:self.count] = np.where(inactive, self.ages[:self.count] + 1, 0)
+            self._remove(np.flatnonzero(self.present[:self.count] & (self.ages[:self.count] > self.max_age)))
+
+        num_active = int(np.sum(self.present[:self.count]))
+        self.active.append(num_active)
+        self.removed.append(self.count - num_active)
+        self.master_time.append(master_time)
+
+
+    def statistics(self):
+        """ Return the number of active and removed cuts and the master solve time of each iteration. """
+        return {"active": np.array(self.active), "removed": np.array(self.removed), "master_time": np.array(self.master_time)}
+
+
+    def _remove(self, ids):
+        """ Remove the cuts with the given indices from the master problem. """
+        if len(ids) == 0:
+            return
+        self.master.remove([self.constrs[id] for id in ids])
+        for id in ids:
+            self.constrs[id] = None
+        self.present[ids] = False
+
+
+    def _insert(self, ids):
+        """ Add the cuts with the given indices to the master problem. """
+        if len(ids) == 0:
+            return
+        thetas = self.thetas[ids]
+        S = sp.csr_matrix((np.ones(np.sum(thetas >= 0)), (np.flatnonzero(thetas >= 0), thetas[thetas >= 0])),
+                          shape=(len(ids), self.theta.shape[0]))
+        constrs = self.master.addConstr(S@self.theta + self.G[ids]@self.x >= self.rhs[ids])
+        for id, constr in zip(ids, constrs.tolist()):
+            self.constrs[id] = constr
+        self.ages[ids] = 0
+        self.present[ids] = True
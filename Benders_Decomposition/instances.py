@@ -0,0 +1,38 @@
+"""
+This file builds randomized two-stage problems (see benders_decomposition in main.py) which are used by tests.py and
+benchmark.py.
+"""
+
+import numpy as np
+
+
+def build_instance(n,m,s,k,N,complete_recourse=False,shared_recourse=False):
+    """ Build a randomized two-stage problem with N scenarios of equal size (see test_bender in tests.py). 
+    
+    If complete_recourse = True, each W_i is extended by a negative s x s identity matrix whose columns are penalized in q_i 
+    and h_i is drawn smaller. Then every first stage decision is feasible and only optimality cuts are generated.
+    If shared_recourse = True, all scenarios share the same W_i and q_i.
+    """
+    # Create first stage problem data
+    A = np.hstack((np.random.randint(1,20,(m,n)), np.eye(m,m)))
+    b = np.random.randint(n*10,n*100,m)
+    c = np.hstack((np.random.randint(-10,-1,n), np.zeros(m)))
+
+    # Create second stage problem data 
+    T = [np.hstack((np.random.randint(1,20,(s,n)),np.zeros((s,m)))) for _ in range(N)]
+    W = [np.hstack((np.random.randint(1,20,(s,k)),np.eye(s,s))) for _ in range(N)]
+    h = [np.random.randint(n*10+k*10,n*100+k*100,s) for _ in range(N)]
+    q = [np.hstack((np.random.randint(-10,-1,k),np.zeros(s))) for _ in range(N)]
+    p = np.random.randint(0,100,N)
+    p = p/np.sum(p)
+
+    if complete_recourse:
+        h = [np.random.randint(n*10,n*50,s) for _ in range(N)]
+        W = [np.hstack((W_i,-np.eye(s,s))) for W_i in W]
+        q = [np.hstack((q_i,np.random.randint(1,10,s))) for q_i in q]
+
+    if shared_recourse:
+        W = [W[0] for _ in range(N)]
+        q = [q[0] for _ in range(N)]
+
+    return A,b,c,T,W,h,q,p
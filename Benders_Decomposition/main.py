@@ -1,15 +1,25 @@
 """ This file implements the Benders decomposition method to solve two-stage models with finite discrete distribution. """
 
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from gurobipy import GRB 
-from aux_fct import init_master, init_scenarios, stopping_criterion
+from aux_fct import init_env, init_master, init_clusters, init_scenarios, init_worker, solve_scenarios, stopping_criterion
+from aux_fct import stack_blocks, scenario_objectives, optimality_cut, bound_criterion, solve_scenario
+from cache import DualCache, init_structures, solve_scenarios_cached
+from stabilization import Stabilizer
+from cut_pool import CutPool
 
 # Constants
 MAX_ITER = 10000
 TOL_OPT = 0.001
+TOL_DUAL = 1e-9     # tolerance for the dual feasibility of stored dual solutions and rays
+INEXACT_GAP = 0.1   # relative gap below which the scenarios are solved exactly again
+INEXACT_MIN = 0.05  # initial level of inexactness (fraction of the scenarios or of the simplex iterations)
 
 
-def benders_decomposition(A,b,c,T,W,h,q,p):
+def benders_decomposition(A,b,c,T,W,h,q,p, num_workers=1, pool="thread", num_clusters=1, cache=False, 
+                          stabilization=None, max_cut_age=None, cuts=None, inexact=None, callback=None, env=None):
     """ Solve a block-structured linear program using Benders decomposition.
 
     The linear program is of the form
@@ -29,16 +39,52 @@ def benders_decomposition(A,b,c,T,W,h,q,p):
     In each iteration the method solves a master problem yielding a vector x. 
     Then, for this fixed x, the dual problems for the scenarios 1,...,N are solved independently of each other.
     Based on the dual solutions, in each iteration a cut is generated to remove infeasible or suboptimal points.
+    Optimality cuts are either aggregated over all scenarios (single-cut), added for each scenario separately (multi-cut) 
+    or aggregated over clusters of scenarios (hybrid). More cuts per iteration yield a larger master problem 
+    but usually fewer iterations.
+    Optionally, the scenarios are split into num_workers blocks which are solved in parallel by a thread or process pool. 
+    Each block is always solved by the same worker, hence the generated cuts are the same as in the serial case.
+    If cache = True, scenarios sharing the same W_i and q_i are solved with a single dual model and a cache of the dual 
+    vertices and rays found so far (see cache.py), such that an LP is only solved if no cached vertex is proven optimal.
+    The method can be stabilized by a trust region, a proximal term or a level set around the best point found so far 
+    (see stabilization.py). It then stops as soon as the gap between the lower and the upper bound is small enough.
+    To keep the master problem small, cuts which are inactive for more than max_cut_age iterations can be removed. 
+    They are added again as soon as they are violated (see cut_pool.py).
+    To solve several problems that only differ in b, h or c, use BendersSolver directly.
+    The cuts of a previous solve of a related problem (see BendersSolver.export_cuts) can be passed as cuts. They are 
+    re-derived from their dual solutions and rays for the current data and only used if still valid.
+    While the relative gap between theta and the recourse value is large, the scenarios can be solved inexactly: 
+    With inexact = "limit", the simplex iterations of each scenario are limited, with inexact = "sample", only a 
+    rotating subset of the scenarios is solved and the others keep their last dual solution. Every dual feasible point 
+    yields a valid cut, so only the cuts get weaker. The limit or the subset grows as the gap shrinks and the method 
+    only stops after an exact iteration, such that the final bound is valid.
+    After each iteration, callback (if given) is called with a dictionary containing the iteration, the lower and upper 
+    bound, their relative gap, the number of cuts and the size of the master problem as well as the wall times of the 
+    master problem, the scenarios and the cut assembly in this iteration. If it returns True, the method stops. 
+    The IterationRecorder from recorder.py stores this information for all iterations.
 
     Input:
         A: Technology matrix 
         b: Right-hand side vector 
         c: Cost vector 
-        T: List where each entry corresponds to a matrix T_i, i=1,..,N of a scenario
-        W: List where each entry corresponds to a matrix W_i, i=1,..,N of a scenario
+        T: List where each entry corresponds to a matrix T_i, i=1,..,N of a scenario (numpy array or scipy.sparse matrix)
+        W: List where each entry corresponds to a matrix W_i, i=1,..,N of a scenario (numpy array or scipy.sparse matrix)
         h: List where each entry corresponds to a right hand-side vector h_i, i=1,..,N of a scenario
         q: List where each entry corresponds to a cost vector q_i, i=1,..,N of a scenario
         p: Array of length N storing the probability of each scenario
+        num_workers: Number of workers solving the scenarios in parallel (1 means serial execution)
+        pool: Either "thread" or "process". Gurobi releases the GIL while optimizing, so threads are usually sufficient. 
+              Worker processes build their own copies of the scenario models.
+        num_clusters: Number of optimality cuts per iteration. 1 yields the single-cut method, N the multi-cut method 
+                      and any other value groups consecutive scenarios into num_clusters clusters.
+        cache: Whether to deduplicate scenarios with identical recourse structure (only for serial execution)
+        stabilization: None for plain Benders decomposition or one of "trust_region", "proximal" and "level"
+        max_cut_age: Number of iterations after which inactive cuts are removed (None means never)
+        cuts: Cuts exported from a previous solve with the same number of scenarios and rows of the T_i (optional)
+        inexact: None for exact scenario solves or one of "limit" and "sample" (only without cache and process pool)
+        callback: Function called after each iteration (optional)
+        env: Gurobi environment for the master problem and the serial scenario models (optional, it is not disposed 
+             such that it can be reused for several problems)
 
     Output:
         A dictionary containing
@@ -46,74 +92,453 @@ def benders_decomposition(A,b,c,T,W,h,q,p):
             opt_val: Objective value of the optimal solution
             termination_reason: Reason for termination of the algorithm
             iter: Number of iterations performed during the algorithm
+            lower_bound: Lower bound on the optimal value given by the master problem
+            upper_bound: Objective value of the best solution found
+            cut_pool: Number of active and removed cuts and master solve time of each iteration
+            simplex_iter: Total number of simplex iterations of the scenarios (None for a process pool or the cache)
+            phase_times: Total wall time of the master problem, the scenarios and the cut assembly
     
     An exception is raised if the problem turns out to be unsolvable.
     """
-  
-    # Initialize and solve master problem
-    master, x = init_master(A,b,c)
-    theta_set = False      
-
-    if master.Status == GRB.OPTIMAL:
-        x_master = x.X 
-    else:
-        raise Exception("Initial relaxation is not solvable.")
-
-    # Initialize the dual problem for each scenario
-    N = len(W)      # Number of scenarios
-    models, variables = init_scenarios(N, W, q)
-
-    # Main algorithm
-    theta = None
-    iter = 0
-    while not stopping_criterion(iter, MAX_ITER, theta, models, p, N, TOL_OPT):
-        # Solve the dual problems of the scenarios given the master solution 
-        optimal_solutions = []
-        for scenario in range(N):
-            models[scenario].setObjective((h[scenario]-T[scenario]@x_master)@variables[scenario], GRB.MAXIMIZE)
-            models[scenario].optimize()
 
+    solver = BendersSolver(A,b,c,T,W,h,q,p, num_workers, pool, num_clusters, cache, stabilization, max_cut_age, cuts, 
+                           inexact, callback, env)
+    try:
+        return solver.solve()
+    finally:
+        solver.close()
+
+
+class BendersSolver:
+    """ 
+    Persistent Benders decomposition for block-structured linear programs (see benders_decomposition).
+
+    The master problem and the dual problems of the scenarios are built once in a single shared Gurobi environment. 
+    As environments are not thread-safe, each block of scenarios gets its own environment if a thread pool is used.
+    Subsequent calls of solve only update the coefficients b, h and c and keep the bases of all models as warm start. 
+    Generated cuts stay valid for any b and c. If h changes, their right-hand sides are re-derived from the stored 
+    dual solutions and unbounded rays. The cuts can be exported and used to warm-start a solver for a related problem.
+
+    The matrices T_i and vectors h_i are stored stacked on top of each other (as a CSR matrix for sparse input), such 
+    that the objectives of all scenarios are obtained from one matrix-vector product and all optimality cuts of an 
+    iteration from one matrix-matrix product.
+    """
+
+    def __init__(self, A,b,c,T,W,h,q,p, num_workers=1, pool="thread", num_clusters=1, cache=False, stabilization=None, 
+                 max_cut_age=None, cuts=None, inexact=None, callback=None, env=None):
+        """ Build the master problem and the scenario models. The input is the same as for benders_decomposition. """
+        self.W, self.q = W, q
+        self.T, self.offsets = stack_blocks(T)
+        self.h = stack_blocks(h)[0]
+        self.c = np.asarray(c, dtype=np.float64)
+        self.p = p
+        self.N = len(W)      # Number of scenarios
+        self.clusters = init_clusters(self.N, num_clusters)
+        self.num_first_stage_constrs = np.shape(A)[0]
+
+        # Initialize the master problem
+        self.env = init_env() if env is None else env
+        self.master, self.x, self.theta = init_master(A,b,c,num_clusters,self.env)
+        self.theta_set = False
+        self.stabilizer = Stabilizer(stabilization) if stabilization is not None else None
+
+        # Generated cuts as tuples (indices in the pool, scenario, ray) and 
+        # (indices in the pool, dual solutions of all scenarios, master solution the duals were computed for)
+        self.pool = CutPool(self.master, self.x, self.theta, max_cut_age)
+        self.feasibility_cuts = []
+        self.optimality_cuts = []
+        if cuts is not None:
+            self.add_cuts(cuts)
+
+        # Initialize the dual problem for each scenario (in the worker processes if a process pool is used)
+        self.envs = [self.env] if env is None else []      # environments disposed by close
+        self.executors, self.blocks = None, None
+        self.models, self.variables = None, None
+        self.caches = None
+        if cache:
+            # One dual model and cache per distinct recourse structure
+            if num_workers > 1:
+                raise Exception("The scenario cache is only available for serial execution.")
+            self.structures, representatives = init_structures(W, q)
+            self.caches = [DualCache(W[scenario], q[scenario], self.env) for scenario in representatives]
+        elif num_workers > 1:
+            # Each block of scenarios is assigned to its own single worker
+            self.blocks = np.array_split(np.arange(self.N), num_workers)
+            if pool == "thread":
+                self.executors = [ThreadPoolExecutor(max_workers=1) for _ in self.blocks]
+                self.models, self.variables = [], []
+                for block in self.blocks:
+                    self.envs.append(init_env())
+                    models, variables = init_scenarios(len(block), [W[i] for i in block], [q[i] for i in block], self.envs[-1])
+                    self.models += models
+                    self.variables += variables
+            elif pool == "process":
+                self.executors = [ProcessPoolExecutor(max_workers=1, initializer=init_worker, 
+                                                      initargs=([W[i] for i in block], [q[i] for i in block])) 
+                                  for block in self.blocks]
+            else:
+                raise Exception("Unknown pool type. Choose either 'thread' or 'process'.")
+        else:
+            self.models, self.variables = init_scenarios(self.N, W, q, self.env)
+
+        # Optimal primal solutions of the scenarios
+        self.y = [None] * self.N
+
+        # Inexact scenario solves based on the last dual solution of each scenario
+        if inexact not in (None, "limit", "sample"):
+            raise Exception("Unknown inexact mode. Choose either 'limit' or 'sample'.")
+        if inexact is not None and self.models is None:
+            raise Exception("Inexact scenario solves require serial or thread-parallel execution without cache.")
+        self.inexact = inexact
+        self.callback = callback
+        self.duals = [None] * self.N
+        self.level = 1
+        self.limit = None           # current level of the iteration limits of the scenario models
+        self.next_sample = 0        # first scenario of the next sample
+        if inexact == "limit":
+            # The primal simplex method keeps the dual problem feasible after changing its objective
+            for model in self.models:
+                model.Params.Method = 0
+
+
+    def solve(self, b=None, h=None, c=None):
+        """ 
+        Solve the problem after optionally replacing the right-hand sides b and h = [h_1,...,h_N] or the cost vector c.
+
+        Output:
+            The same dictionary as for benders_decomposition
+        """
+        if b is not None:
+            self.master.setAttr("RHS", self.master.getConstrs()[:self.num_first_stage_constrs], b)
+        if c is not None:
+            self.c = np.asarray(c, dtype=np.float64)
+            self.x.Obj = c
+        if h is not None:
+            self.h = stack_blocks(h)[0]
+            for ids, scenario, ray in self.feasibility_cuts:
+                self.pool.set_rhs(ids, np.dot(ray, self.h[self.offsets[scenario]:self.offsets[scenario+1]]))
+            for ids, duals, _ in self.optimality_cuts:
+                self.pool.set_rhs(ids, self._optimality_cut(duals)[1])
+
+        master, x, theta, stabilizer = self.master, self.x, self.theta, self.stabilizer
+        T, h, offsets, p = self.T, self.h, self.offsets, self.p
+        if stabilizer is not None:
+            stabilizer.reset()
+        self.level = INEXACT_MIN if self.inexact is not None else 1
+        self.simplex_iter = 0 if self.models is not None else None
+        phase_times = {"master": 0, "subproblems": 0, "cuts": 0}
+
+        # Solve the master problem (warm-started from the previous solve)
+        x_master, theta_value = self._solve_master()[:2]
+
+        # The stabilized method stops based on its bounds, plain Benders decomposition as soon as theta is exact
+        def terminated(reason=False):
+            if stopped:
+                return "Stopped by callback" if reason else True
+            if stabilizer is not None:
+                return bound_criterion(iter, MAX_ITER, stabilizer.lower, stabilizer.upper, TOL_OPT, reason)
+            return stopping_criterion(iter, MAX_ITER, theta, self.obj_vals, p, TOL_OPT, reason)
+
+        # Main algorithm
+        self.obj_vals = None
+        self.upper = np.inf
+        stopped = False
+        iter = 0
+        while not terminated():
+            # Solve the dual problems of the scenarios given the master solution and add a cut
+            start = time.perf_counter()
+            self.subproblem_time = 0
+            objectives = scenario_objectives(T, h, offsets, x_master)
+            if self.level < 1 and all(duals is not None for duals in self.duals):
+                self.obj_vals = None
+                self._inexact_iteration(objectives, x_master, theta_value)
+            else:
+                self._exact_iteration(objectives, x_master, theta_value)
+            cut_time = time.perf_counter() - start - self.subproblem_time
+
+            # Reoptimize the (stabilized) master model and update the cut pool
+            x_master, theta_value, master_time = self._solve_master()
+            self.pool.update(x_master, theta_value, master_time)
+            iter += 1
+
+            # Report the iteration
+            phase_times["master"] += master_time
+            phase_times["subproblems"] += self.subproblem_time
+            phase_times["cuts"] += cut_time
+            if self.callback is not None:
+                lower = stabilizer.lower if stabilizer is not None else (master.ObjVal if self.theta_set else -np.inf)
+                upper = stabilizer.upper if stabilizer is not None else self.upper
+                gap = (upper - lower) / np.abs(upper) if np.isfinite(upper) and np.isfinite(lower) and upper != 0 else np.inf
+                stopped = bool(self.callback({"iter": iter, "lower_bound": lower, "upper_bound": upper, "gap": gap, 
+                                              "cuts": self.pool.active[-1], "master_constrs": master.NumConstrs, 
+                                              "master_vars": master.NumVars, "time_master": master_time, 
+                                              "time_subproblems": self.subproblem_time, "time_cuts": cut_time}))
+
+
+        # The optimal primal solutions of the scenarios are the duals of the optimal dual solutions
+        if stabilizer is not None and stabilizer.center is not None:
+            result = {"solution": np.hstack((stabilizer.center, np.ravel(stabilizer.y_center))), "opt_val": stabilizer.upper, 
+                      "termination_reason": terminated(reason=True), "iter": iter, 
+                      "lower_bound": stabilizer.lower, "upper_bound": stabilizer.upper}
+        else:
+            result = {"solution": np.hstack((x_master, np.ravel(self.y))),"opt_val": master.ObjVal, 
+                      "termination_reason": terminated(reason=True),"iter": iter, 
+                      "lower_bound": master.ObjVal if self.theta_set else -np.inf, "upper_bound": self.upper}
+        result["cut_pool"] = self.pool.statistics()
+        result["simplex_iter"] = self.simplex_iter
+        result["phase_times"] = phase_times
+        return result
+
+
+    def export_cuts(self):
+        """ 
+        Export the generated cuts by the dual information they are derived from.
+
+        Output:
+            A dictionary of arrays (which can be stored with numpy.savez) containing
+                feasibility_scenarios: Scenario of each feasibility cut
+                rays: Unbounded rays of the feasibility cuts concatenated
+                ray_offsets: The ray of feasibility cut j consists of the entries ray_offsets[j]:ray_offsets[j+1]
+                duals: Matrix whose rows are the dual solutions (pi_1,...,pi_N) of all scenarios of each optimality cut
+                points: Matrix whose rows are the master solutions x the duals of each optimality cut were computed for
+        """
+        rays = [ray for _, _, ray in self.feasibility_cuts]
+        return {"feasibility_scenarios": np.array([scenario for _, scenario, _ in self.feasibility_cuts], dtype=int),
+                "rays": np.concatenate(rays) if rays else np.zeros(0),
+                "ray_offsets": np.concatenate(([0], np.cumsum([len(ray) for ray in rays], dtype=int))),
+                "duals": np.array([np.concatenate(duals) for _, duals, _ in self.optimality_cuts]).reshape(-1, self.offsets[-1]),
+                "points": np.array([point for _, _, point in self.optimality_cuts]).reshape(-1, len(self.c))}
+
+
+    def add_cuts(self, cuts):
+        """ 
+        Add cuts exported by export_cuts (possibly for a problem with different data) to the master problem.
+
+        The coefficients and right-hand sides are re-derived from the stored rays and dual solutions for the current T, h 
+        and p. A feasibility cut is only added if its ray is still a ray of the dual problem of its scenario, i.e. 
+        W_i^T r <= 0. Optimality cuts stay valid as long as the duals of all scenarios are dual feasible, i.e. 
+        W_i^T pi_i <= q_i. For each scenario violating this (since W_i or q_i changed), the stored duals are replaced by 
+        the optimal dual solution of the scenario for the master solution of the cut. Hence, a few changed scenarios cost 
+        one LP per cut and changed scenario. The variables theta of the clusters with at least one cut are released.
+        """
+        if np.shape(cuts["duals"])[1] != self.offsets[-1]:
+            raise Exception("The cuts do not match the number of rows of the scenarios.")
+
+        for j, scenario in enumerate(cuts["feasibility_scenarios"]):
+            ray = cuts["rays"][cuts["ray_offsets"][j]:cuts["ray_offsets"][j+1]]
+            if np.all(self.W[scenario].T@ray <= TOL_DUAL * np.max(np.abs(ray))):
+                rows = slice(self.offsets[scenario], self.offsets[scenario+1])
+                ids = self.pool.add((self.T[rows].T@ray)[None,:], [-1], [np.dot(ray,self.h[rows])])
+                self.feasibility_cuts.append((ids, scenario, ray))
+
+        num_clusters = self.theta.shape[0]
+        covered = np.zeros(num_clusters, dtype=bool)
+        models = {}             # dual models of the changed scenarios
+        for row, point in zip(cuts["duals"], cuts["points"]):
+            duals = np.split(row, self.offsets[1:-1])
+            for i in range(self.N):
+                if np.any(self.W[i].T@duals[i] > self.q[i] + TOL_DUAL * (1 + np.abs(self.q[i]))):
+                    if i not in models:
+                        models[i] = init_scenarios(1, [self.W[i]], [self.q[i]], self.env)
+                    duals[i] = self._replacement_dual(i, *models[i], point)
+                    # If the dual is infeasible, the primal problem is infeasible or unbounded (and hence not solvable)
+                    if duals[i] is None:
+                        for model_list, _ in models.values():
+                            model_list[0].dispose()
+                        raise Exception("Problem is not solvable")
+            coefs, rhs = self._optimality_cut(duals)
+            ids = self.pool.add(coefs, np.arange(num_clusters), rhs)
+            self.optimality_cuts.append((ids, duals, point))
+            covered[:] = True
+        for model_list, _ in models.values():
+            model_list[0].dispose()
+
+        # Only the variables theta which are bounded by a cut can be released
+        for cluster in np.flatnonzero(covered):
+            self.theta[cluster].LB = -np.inf
+            self.theta[cluster].UB = np.inf
+        self.theta_set = bool(np.all(covered))
+
+
+    def _replacement_dual(self, scenario, models, variables, point):
+        """ 
+        Compute a dual feasible solution of the scenario which is optimal for the master solution point. If the dual is 
+        unbounded, a feasibility cut is added and any dual feasible solution is returned. None means that the dual 
+        problem is infeasible.
+        """
+        rows = slice(self.offsets[scenario], self.offsets[scenario+1])
+        status, vector = solve_scenario(models[0], variables[0], self.h[rows] - self.T[rows]@point)[:2]
+        if status == GRB.UNBOUNDED:
+            ids = self.pool.add((self.T[rows].T@vector)[None,:], [-1], [np.dot(vector,self.h[rows])])
+            self.feasibility_cuts.append((ids, scenario, vector))
+            status, vector = solve_scenario(models[0], variables[0], np.zeros(rows.stop - rows.start))[:2]
+        return vector if status == GRB.OPTIMAL else None
+
+
+    def close(self):
+        """ Shut down the workers and free the Gurobi models and environments. """
+        for executor in self.executors or []:
+            executor.shutdown()
+        for model in [self.master] + (self.models or []):
+            model.dispose()
+        for cache in self.caches or []:
+            cache.dispose()
+        for env in self.envs:
+            env.dispose()
+
+
+    def _solve_subset(self, objectives, scenarios):
+        """ Solve the dual problems of the given (sorted) scenarios and count the simplex iterations (see solve_scenarios). """
+        start = time.perf_counter()
+        if self.models is None:
+            # Worker processes always solve all scenarios of their block
+            results = solve_scenarios(None, None, objectives, self.executors, self.blocks)
+            self.subproblem_time += time.perf_counter() - start
+            return results
+        if self.executors is None:
+            results = solve_scenarios([self.models[i] for i in scenarios], [self.variables[i] for i in scenarios], 
+                                      [objectives[i] for i in scenarios])
+        else:
+            blocks = [block[np.isin(block, scenarios)] for block in self.blocks]
+            results = solve_scenarios(self.models, self.variables, objectives, self.executors, blocks)
+        self.subproblem_time += time.perf_counter() - start
+        self.simplex_iter += sum(self.models[i].IterCount for i in scenarios[:len(results)])
+
+        return results
+
+
+    def _exact_iteration(self, objectives, x_master, theta_value):
+        """ Solve the dual problems of all scenarios exactly and add a feasibility cut or the optimality cuts. """
+        T, h, offsets, c, p, N, theta = self.T, self.h, self.offsets, self.c, self.p, self.N, self.theta
+        if self.caches is not None:
+            start = time.perf_counter()
+            results = solve_scenarios_cached(self.caches, self.structures, objectives)
+            self.subproblem_time += time.perf_counter() - start
+        else:
+            self._set_iteration_limit(1)
+            results = self._solve_subset(objectives, np.arange(N))
+
+        optimal_solutions = []
+        self.obj_vals = None
+        for scenario, (status, vector, obj_val, y_scenario) in enumerate(results):
             # If the dual is infeasible, the primal problem is infeasible or unbounded (and hence not solvable)
-            if models[scenario].Status == GRB.INFEASIBLE:
+            if status == GRB.INFEASIBLE:
                 raise Exception("Problem is not solvable")
 
             # If the dual is unbounded (and hence the primal infeasible), add a feasibility cut
-            if models[scenario].Status == GRB.UNBOUNDED:
-                ray = variables[scenario].UnbdRay
-                master.addConstr((T[scenario].T@ray)@x >= np.dot(ray,h[scenario]))
+            if status == GRB.UNBOUNDED:
+                ray = vector
+                rows = slice(offsets[scenario], offsets[scenario+1])
+                ids = self.pool.add((T[rows].T@ray)[None,:], [-1], [np.dot(ray,h[rows])])
+                self.feasibility_cuts.append((ids, scenario, ray))
                 break
 
             # If the dual problem is solvable, store the optimal solution of the scenario
-            if models[scenario].Status == GRB.OPTIMAL:
-                optimal_solutions.append(variables[scenario].X)   
+            if status == GRB.OPTIMAL:
+                optimal_solutions.append(vector)   
+                self.y[scenario] = y_scenario
 
         # If all scenarios have an optimal solution, add an optimality cut
         if len(optimal_solutions) == N:                                         
-            # Introduce the auxiliary variable theta if it is not set yet
-            if not theta_set:
-                theta = master.addMVar(shape=1, vtype=GRB.CONTINUOUS, obj=1, lb=-np.inf)
-                theta_set = True
-
-            # Add optimality cut 
-            master.addConstr(theta + np.sum([p[model] * T[model].T@optimal_solutions[model] for model in range(N)],axis=0)@x 
-                                >= np.sum([p[model] * np.dot(h[model],optimal_solutions[model]) for model in range(N)]))
-            
-        # Reoptimize the master model 
-        master.optimize()
-        if master.Status == GRB.OPTIMAL:
-            x_master = x.X
+            self.obj_vals = obj_vals = [result[2] for result in results]
+
+            # Release the auxiliary variables theta if they are not set yet
+            if not self.theta_set:
+                theta.LB = -np.inf
+                theta.UB = np.inf
+                self.theta_set = True
+
+            # Add one optimality cut per cluster of scenarios
+            coefs, rhs = self._optimality_cut(optimal_solutions)
+            ids = self.pool.add(coefs, np.arange(theta.shape[0]), rhs)
+            self.optimality_cuts.append((ids, optimal_solutions, x_master))
+            self.duals = optimal_solutions
+            self._tighten(np.dot(p, obj_vals), theta_value)
+
+            # The objective value of x_master is an upper bound
+            value = c@x_master + np.dot(p, obj_vals)
+            self.upper = min(self.upper, value)
+            if self.stabilizer is not None:
+                self.stabilizer.update(value, x_master, self.y)
+
+
+    def _inexact_iteration(self, objectives, x_master, theta_value):
+        """ 
+        Add a feasibility cut or an optimality cut based on inexact scenario solves. All scenarios which are not solved 
+        or whose simplex method did not reach a dual feasible point keep their last dual solution.
+        """
+        if self.inexact == "sample":
+            size = int(np.ceil(self.level * self.N))
+            scenarios = np.sort((self.next_sample + np.arange(size)) % self.N)
+            self.next_sample = (self.next_sample + size) % self.N
         else:
-            raise Exception("Problem is unsolvable")
+            scenarios = np.arange(self.N)
+            self._set_iteration_limit(self.level)
+
+        duals = list(self.duals)
+        for scenario, (status, vector, _, _) in zip(scenarios, self._solve_subset(objectives, scenarios)):
+            rows = slice(self.offsets[scenario], self.offsets[scenario+1])
+            if status == GRB.INFEASIBLE:
+                raise Exception("Problem is not solvable")
+            if status == GRB.UNBOUNDED:
+                ids = self.pool.add((self.T[rows].T@vector)[None,:], [-1], [np.dot(vector,self.h[rows])])
+                self.feasibility_cuts.append((ids, scenario, vector))
+                return
+            W_i, q_i = self.W[scenario], self.q[scenario]
+            if status == GRB.OPTIMAL or np.all(W_i.T@vector <= q_i + TOL_DUAL * (1 + np.abs(q_i))):
+                duals[scenario] = vector
+
+        coefs, rhs = self._optimality_cut(duals)
+        ids = self.pool.add(coefs, np.arange(self.theta.shape[0]), rhs)
+        self.optimality_cuts.append((ids, duals, x_master))
+
+        # Estimate the recourse value, where the improvement of a sample is extrapolated to all scenarios
+        values = np.array([np.dot(pi, d) for pi, d in zip(duals, objectives)])
+        stale = np.array([np.dot(pi, d) for pi, d in zip(self.duals, objectives)])
+        estimate = np.dot(self.p, stale) + np.dot(self.p, values - stale) / max(np.sum(self.p[scenarios]), TOL_DUAL)
+        self.duals = duals
+        self._tighten(estimate, theta_value)
+
+
+    def _tighten(self, estimate, theta_value):
+        """ Increase the level of inexactness based on the relative gap between the (estimated) recourse value and theta. """
+        if self.inexact is None:
+            return
+        theta_sum = np.sum(theta_value)
+        gap = np.abs(estimate - theta_sum) / np.abs(theta_sum) if theta_sum != 0 else np.inf
+        self.level = 1 if gap <= INEXACT_GAP else max(self.level, min(INEXACT_GAP / gap, 1))
 
-        iter += 1
 
+    def _set_iteration_limit(self, level):
+        """ Limit the simplex iterations of each scenario model to the fraction level of its number of dual variables. """
+        if self.inexact != "limit" or level == self.limit:
+            return
+        for model, variables in zip(self.models, self.variables):
+            model.Params.IterationLimit = max(1, np.ceil(level * variables.shape[0])) if level < 1 else GRB.INFINITY
+        self.limit = level
 
-    # Get the optimal primal solutions to the optimal dual solutions for the scenarios and return the result
-    y = []
-    for scenario in range(N):
-        y.append(models[scenario].getAttr("Pi", models[scenario].getConstrs()))
 
-    return {"solution": np.hstack((x_master, np.ravel(y))),"opt_val": master.ObjVal, 
-            "termination_reason":stopping_criterion(iter, MAX_ITER, theta, models, p, N, TOL_OPT, reason=True),"iter": iter}
+    def _solve_master(self):
+        """ 
+        Solve the (stabilized) master problem until no cut removed from it is violated. 
+        
+        Output:
+            Master solution x and theta and the wall time needed
+        """
+        start = time.perf_counter()
+        while True:
+            if self.stabilizer is not None:
+                x_master = self.stabilizer.solve_master(self.master, self.x, self.theta, self.c, self.theta_set)
+                theta_value = self.stabilizer.theta_value
+            else:
+                self.master.optimize()
+                if self.master.Status != GRB.OPTIMAL:
+                    raise Exception("Problem is unsolvable")
+                x_master, theta_value = self.x.X, self.theta.X
+            if not self.pool.add_violated(x_master, theta_value):
+                return x_master, theta_value, time.perf_counter() - start
 
 
+    def _optimality_cut(self, duals):
+        """ Compute the coefficients and right-hand sides of the optimality cuts of all clusters for the dual solutions duals. """
+        return optimality_cut(self.T, self.h, self.offsets, duals, self.p, self.clusters, self.theta.shape[0])
@@ -0,0 +1,47 @@
+"""
+This file implements a callback for the Benders decomposition method from main.py which records the progress of each
+iteration.
+
+The information passed to the callback is written into one preallocated numpy array whose capacity is doubled when
+it is full, so that recording only costs a few assignments per iteration.
+"""
+
+import numpy as np
+
+# Information stored for each iteration (see benders_decomposition)
+FIELDS = ("iter", "lower_bound", "upper_bound", "gap", "cuts", "master_constrs", "master_vars",
+          "time_master", "time_subproblems", "time_cuts")
+CAPACITY = 64       # initial number of iterations the recorder has space for
+
+
+class IterationRecorder:
+    """
+    Callback recording the iterations of benders_decomposition. Optionally, the method is stopped as soon as the gap
+    between the bounds is at most max_gap or the total time exceeds max_time seconds.
+    """
+
+    def __init__(self, max_gap=None, max_time=None):
+        self.max_gap = max_gap
+        self.max_time = max_time
+        self.data = np.zeros((CAPACITY, len(FIELDS)))
+        self.count = 0
+        self.total_time = 0
+
+
+    def __call__(self, info):
+        """ Store the information of an iteration and return whether the method should stop. """
+        if self.count == len(self.data):
+            self.data = np.vstack((self.data, np.zeros_like(self.data)))
+        row = self.data[self.count]
+        for j, field in enumerate(FIELDS):
+            row[j] = info[field]
+        self.count += 1
+        self.total_time += info["time_master"] + info["time_subproblems"] + info["time_cuts"]
+
+        return ((self.max_gap is not None and info["gap"] <= self.max_gap) or
+                (self.max_time is not None and self.total_time >= self.max_time))
+
+
+    def traces(self):
+        """ Return a dictionary with one array per field containing its value in each recorded iteration. """
+        return {field: self.data[:self.count, j] for j, field in enumerate(FIELDS)}
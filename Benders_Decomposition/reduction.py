@@ -0,0 +1,179 @@
+"""
+This file implements the reduction of the scenarios of a two-stage problem before it is solved by the Benders
+decomposition method from main.py.
+
+Each scenario i is represented by the vector of its data (T_i, W_i, h_i, q_i) and two scenarios are compared by the
+Euclidean distance of these vectors. A subset of the scenarios is selected and the probability of every removed scenario
+is added to its closest selected scenario. For this redistribution the Kantorovich distance between the original and the
+reduced distribution equals
+    sum over the removed scenarios i of  p_i * min_{j selected} ||xi_i - xi_j||,
+which is reported as distance. The subset is chosen by
+    forward: Fast forward selection, which adds the scenario that decreases the distance the most in each step.
+             It needs the full N x N distance matrix, i.e. time and memory quadratic in N.
+    kmedoids: Alternating k-medoids clustering, which only needs the distances to the current medoids.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.spatial.distance import cdist
+from gurobipy import GRB
+from aux_fct import init_env, scenario_objectives, stack_blocks
+from cache import DualCache, init_structures, solve_scenarios_cached
+from main import benders_decomposition
+
+# Constants
+METHODS = ("forward", "kmedoids")
+MAX_ITER_MEDOIDS = 100
+
+
+def scenario_features(T,W,h,q):
+    """ Return the matrix whose rows are the data vectors of the scenarios (without entries equal for all scenarios). """
+    rows = []
+    for T_i, W_i, h_i, q_i in zip(T,W,h,q):
+        blocks = [T_i.toarray() if sp.issparse(T_i) else T_i, W_i.toarray() if sp.issparse(W_i) else W_i, h_i, q_i]
+        rows.append(np.concatenate([np.ravel(block) for block in blocks]).astype(np.float64))
+    if len({len(row) for row in rows}) > 1:
+        raise Exception("Scenario reduction requires scenarios of equal size.")
+    features = np.vstack(rows)
+
+    return features[:, np.any(features != features[0], axis=0)]
+
+
+def forward_selection(features, p, num_scenarios):
+    """ Select num_scenarios scenarios by fast forward selection and return their indices. """
+    distances = cdist(features, features)
+    selected = []
+    closest = np.full(len(p), np.inf)          # distance of each scenario to the closest selected scenario
+    for _ in range(num_scenarios):
+        # Distance of the reduced distribution if scenario u is selected in addition
+        candidates = p @ np.minimum(closest[:,None], distances)
+        candidates[selected] = np.inf
+        u = int(np.argmin(candidates))
+        selected.append(u)
+        closest = np.minimum(closest, distances[:,u])
+
+    return np.array(selected)
+
+
+def k_medoids(features, p, num_scenarios, seed=None):
+    """ Select num_scenarios scenarios as medoids of a clustering weighted by p and return their indices. """
+    rng = np.random.default_rng(seed)
+    N = len(p)
+
+    # Choose the initial medoids at random with probability proportional to p_i times the squared distance (k-means++)
+    medoids = [rng.choice(N, p=p)]
+    closest = cdist(features, features[medoids]).ravel()
+    for _ in range(num_scenarios - 1):
+        weights = p * closest**2
+        weights[medoids] = 0
+        if np.sum(weights) > 0:
+            medoids.append(rng.choice(N, p=weights / np.sum(weights)))
+        else:
+            medoids.append(rng.choice(np.setdiff1d(np.arange(N), medoids)))
+        closest = np.minimum(closest, cdist(features, features[medoids[-1:]]).ravel())
+    medoids = np.array(medoids)
+
+    for _ in range(MAX_ITER_MEDOIDS):
+        assignment = np.argmin(cdist(features, features[medoids]), axis=1)
+        new_medoids = medoids.copy()
+        for cluster in range(num_scenarios):
+            members = np.flatnonzero(assignment == cluster)
+            if len(members) > 0:
+                costs = p[members] @ cdist(features[members], features[members])
+                new_medoids[cluster] = members[np.argmin(costs)]
+        if np.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+
+    return medoids
+
+
+def reduce_scenarios(T,W,h,q,p,num_scenarios, method="forward", seed=None):
+    """
+    Reduce the scenarios (T_i, W_i, h_i, q_i) with probabilities p to num_scenarios scenarios.
+
+    Input:
+        T,W,h,q,p: Scenario data as for benders_decomposition (all scenarios of equal size)
+        num_scenarios: Number of scenarios to keep
+        method: Either "forward" (fast forward selection) or "kmedoids"
+        seed: Seed of the random initialization of k-medoids
+
+    Output:
+        A dictionary containing
+            T,W,h,q,p: Data of the selected scenarios together with their redistributed probabilities
+            scenarios: Indices of the selected scenarios
+            assignment: Index (within the selected scenarios) of the scenario each original scenario is assigned to
+            distance: Kantorovich distance between the original and the reduced distribution
+    """
+    if method not in METHODS:
+        raise Exception(f"Unknown reduction method. Choose one of {METHODS}.")
+    p = np.asarray(p, dtype=np.float64)
+    num_scenarios = min(num_scenarios, len(p))
+    features = scenario_features(T,W,h,q)
+
+    if method == "forward":
+        scenarios = forward_selection(features, p, num_scenarios)
+    else:
+        scenarios = k_medoids(features, p, num_scenarios, seed)
+
+    # Assign every scenario to the closest selected one and redistribute its probability
+    distances = cdist(features, features[scenarios])
+    assignment = np.argmin(distances, axis=1)
+    assignment[scenarios] = np.arange(num_scenarios)
+
+    return {"T": [T[i] for i in scenarios], "W": [W[i] for i in scenarios], "h": [h[i] for i in scenarios],
+            "q": [q[i] for i in scenarios], "p": np.bincount(assignment, weights=p, minlength=num_scenarios),
+            "scenarios": scenarios, "assignment": assignment,
+            "distance": np.dot(p, distances[np.arange(len(p)), assignment])}
+
+
+def evaluate_first_stage(c,T,W,h,q,p,x):
+    """
+    Compute the objective value c*x + sum_i p_i * Q_i(x) of the first stage decision x for all scenarios, where Q_i(x) is
+    the optimal value of the second stage problem of scenario i. The value is infinite if x is infeasible for a scenario.
+    """
+    env = init_env()
+    structures, representatives = init_structures(W, q)
+    caches = [DualCache(W[i], q[i], env) for i in representatives]
+    try:
+        T_stack, offsets = stack_blocks(T)
+        results = solve_scenarios_cached(caches, structures, scenario_objectives(T_stack, stack_blocks(h)[0], offsets, x))
+        status = results[-1][0]
+        if status == GRB.UNBOUNDED:
+            return np.inf
+        if status == GRB.INFEASIBLE:
+            raise Exception("Problem is not solvable")
+        return np.dot(c, x) + np.dot(p, [result[2] for result in results])
+    finally:
+        for cache in caches:
+            cache.dispose()
+        env.dispose()
+
+
+def reduced_benders_decomposition(A,b,c,T,W,h,q,p,num_scenarios, method="forward", seed=None, validate=False, **kwargs):
+    """ Solve a block-structured linear program (see benders_decomposition) after reducing its scenarios.
+
+    Input:
+        A,b,c,T,W,h,q,p: Problem data as for benders_decomposition
+        num_scenarios, method, seed: Parameters of the reduction (see reduce_scenarios)
+        validate: If True, the first stage solution of the reduced problem is evaluated on all original scenarios
+        kwargs: Further arguments of benders_decomposition
+
+    Output:
+        The dictionary returned by benders_decomposition for the reduced problem extended by
+            scenarios, p_reduced, distance: Result of the reduction (see reduce_scenarios)
+            validated_value: Objective value of the first stage solution for all original scenarios (if validate = True)
+            validation_gap: Relative difference between validated_value and the optimal value of the reduced problem
+    """
+    reduction = reduce_scenarios(T,W,h,q,p,num_scenarios, method, seed)
+    result = benders_decomposition(A,b,c, reduction["T"], reduction["W"], reduction["h"], reduction["q"], reduction["p"],
+                                   **kwargs)
+    result.update({"scenarios": reduction["scenarios"], "p_reduced": reduction["p"], "distance": reduction["distance"]})
+
+    if validate:
+        x = result["solution"][:len(c)]
+        value = evaluate_first_stage(c,T,W,h,q,p,x)
+        result["validated_value"] = value
+        result["validation_gap"] = np.abs(value - result["opt_val"]) / np.abs(value) if np.isfinite(value) else np.inf
+
+    return result
@@ -0,0 +1,274 @@
+"""
+This file implements an on-disk format for the scenario data (T_i, W_i, h_i, q_i, p_i) of the Benders decomposition method
+from main.py together with a variant of the method that streams the scenarios from disk.
+
+A scenario store is a directory containing
+    T.data, T.indices, T.indptr: The matrices T_1,...,T_N stacked on top of each other in CSR format
+    W.data, W.indices, W.indptr: The matrices W_1,...,W_N stacked on top of each other in CSR format
+    h.bin, q.bin:                The vectors h_1,...,h_N and q_1,...,q_N concatenated
+    index.npz:                   Offsets of the scenarios in the files above, the probabilities p and the index of the
+                                 recourse structure (W_i, q_i) of each scenario
+The binary files are opened as numpy memmaps, so only the scenarios currently in use are read into memory.
+"""
+
+import os
+import hashlib
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+from collections import OrderedDict
+from gurobipy import GRB
+from aux_fct import init_env, init_master, scenario_objectives, optimality_cut, stopping_criterion
+from cache import DualCache, solve_scenarios_cached
+from cut_pool import CutPool
+
+# Constants
+MAX_ITER = 10000
+TOL_OPT = 0.001
+
+
+def save_scenarios(path, scenarios, p):
+    """
+    Write the scenarios to a scenario store in the directory path.
+
+    Input:
+        path: Directory of the store (created if it does not exist)
+        scenarios: Iterable of tuples (T_i, W_i, h_i, q_i), e.g. a generator, which is consumed one scenario at a time
+        p: Array storing the probability of each scenario
+    """
+    os.makedirs(path, exist_ok=True)
+    files = {name: open(os.path.join(path, name), "wb") for name in
+             ["T.data", "T.indices", "T.indptr", "W.data", "W.indices", "W.indptr", "h.bin", "q.bin"]}
+    rows, cols, structures = [0], [], []
+    keys = {}
+    nnz = {"T": 0, "W": 0}
+    try:
+        np.zeros(1, dtype=np.int64).tofile(files["T.indptr"])
+        np.zeros(1, dtype=np.int64).tofile(files["W.indptr"])
+        for T_i, W_i, h_i, q_i in scenarios:
+            for name, matrix in (("T", T_i), ("W", W_i)):
+                matrix = sp.csr_matrix(matrix, dtype=np.float64)
+                matrix.data.tofile(files[name + ".data"])
+                matrix.indices.astype(np.int64).tofile(files[name + ".indices"])
+                (matrix.indptr[1:].astype(np.int64) + nnz[name]).tofile(files[name + ".indptr"])
+                nnz[name] += matrix.nnz
+            h_i = np.asarray(h_i, dtype=np.float64)
+            q_i = np.asarray(q_i, dtype=np.float64)
+            h_i.tofile(files["h.bin"])
+            q_i.tofile(files["q.bin"])
+            rows.append(rows[-1] + len(h_i))
+            cols.append(len(q_i))
+            n = np.shape(T_i)[1]
+
+            # Scenarios with the same recourse structure are identified by a hash of W_i and q_i
+            W_i = sp.csr_matrix(W_i, dtype=np.float64)
+            W_i.sum_duplicates()
+            W_i.eliminate_zeros()
+            key = hashlib.sha1(b"".join([np.array(W_i.shape).tobytes(), W_i.data.tobytes(), W_i.indices.tobytes(),
+                                         W_i.indptr.tobytes(), q_i.tobytes()])).hexdigest()
+            structures.append(keys.setdefault(key, len(keys)))
+    finally:
+        for file in files.values():
+            file.close()
+
+    if len(cols) == 0:
+        raise Exception("No scenarios were given.")
+    if len(np.atleast_1d(p)) != len(cols):
+        raise Exception(f"The number of probabilities ({len(np.atleast_1d(p))}) does not match the number of scenarios ({len(cols)}).")
+    np.savez(os.path.join(path, "index.npz"), n=n, rows=np.array(rows), cols=np.array(cols),
+             structures=np.array(structures), p=np.asarray(p, dtype=np.float64))
+
+
+class ScenarioStore:
+    """ Read access to a scenario store written by save_scenarios. """
+
+    def __init__(self, path):
+        self.path = path
+        index = np.load(os.path.join(path, "index.npz"))
+        self.n = int(index["n"])                    # number of columns of each T_i
+        self.rows = index["rows"]                   # T_i, W_i and h_i consist of the rows rows[i]:rows[i+1]
+        self.cols = index["cols"]                   # number of columns of W_i
+        self.q_offsets = np.concatenate(([0], np.cumsum(self.cols)))
+        self.structures = index["structures"]
+        self.p = index["p"]
+        self.N = len(self.cols)
+
+        self.data = {}
+        for name in ["T.data", "W.data", "h.bin", "q.bin"]:
+            self.data[name] = self._memmap(name, np.float64)
+        for name in ["T.indices", "T.indptr", "W.indices", "W.indptr"]:
+            self.data[name] = self._memmap(name, np.int64)
+
+
+    def __len__(self):
+        return self.N
+
+
+    def load(self, start, stop):
+        """
+        Read the scenarios start,...,stop-1 into memory.
+
+        Output:
+            T: The matrices T_i stacked on top of each other as CSR matrix
+            W: List of the matrices W_i as CSR matrices
+            h: The vectors h_i concatenated
+            q: List of the vectors q_i
+            offsets: T_i and h_i consist of the rows offsets[i-start]:offsets[i-start+1]
+        """
+        first, last = self.rows[start], self.rows[stop]
+        T = self._rows("T", first, last, self.n)
+        W = [self._rows("W", self.rows[i], self.rows[i+1], self.cols[i]) for i in range(start, stop)]
+        h = np.array(self.data["h.bin"][first:last])
+        q = [np.array(self.data["q.bin"][self.q_offsets[i]:self.q_offsets[i+1]]) for i in range(start, stop)]
+
+        return T, W, h, q, self.rows[start:stop+1] - first
+
+
+    def _rows(self, name, first, last, num_cols):
+        """ Read the rows first,...,last-1 of the stacked matrix name as CSR matrix. """
+        indptr = np.array(self.data[name + ".indptr"][first:last+1])
+        data = np.array(self.data[name + ".data"][indptr[0]:indptr[-1]])
+        indices = np.array(self.data[name + ".indices"][indptr[0]:indptr[-1]])
+        return sp.csr_matrix((data, indices, indptr - indptr[0]), shape=(last - first, num_cols))
+
+
+    def _memmap(self, name, dtype):
+        """ Open a binary file of the store as read-only memmap (or an empty array if the file is empty). """
+        file = os.path.join(self.path, name)
+        if os.path.getsize(file) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(file, dtype=dtype, mode="r")
+
+
+
+def out_of_core_benders_decomposition(A,b,c,store, num_clusters=1, chunk_size=1000, max_models=1000, y_path=None):
+    """ Solve a block-structured linear program (see benders_decomposition) whose scenarios are read from a scenario store.
+
+    In each iteration the scenarios are streamed from disk in chunks of chunk_size scenarios. The dual problems are solved
+    with one model per recourse structure together with its cache of dual vertices (see cache.py). At most max_models of
+    these models are kept; the least recently used ones are evicted. The optimality cuts are accumulated chunk by chunk.
+    Hence, the memory needed does not grow with the number of scenarios as long as the number of distinct recourse
+    structures within one chunk does not exceed max_models.
+
+    Input:
+        A,b,c: First stage data as for benders_decomposition
+        store: ScenarioStore holding the scenarios
+        num_clusters: Number of optimality cuts per iteration (clusters of consecutive scenarios)
+        chunk_size: Number of scenarios read into memory at once
+        max_models: Maximum number of recourse structures whose models are kept
+        y_path: File the second stage solutions are written to as .npy file (None for an anonymous temporary file 
+                which is deleted as soon as the memmap is closed)
+
+    Output:
+        A dictionary containing
+            solution: Optimal first stage solution x
+            y: Optimal second stage solutions (y_1,...,y_N) as memmap of the file y_path (or of the temporary file)
+            opt_val: Objective value of the optimal solution
+            termination_reason: Reason for termination of the algorithm
+            iter: Number of iterations performed during the algorithm
+            cut_pool: Number of cuts and master solve time of each iteration
+
+    An exception is raised if the problem turns out to be unsolvable.
+    """
+    N = len(store)
+    chunks = [(start, min(start + chunk_size, N)) for start in range(0, N, chunk_size)]
+    bounds = np.cumsum([0] + [len(cluster) for cluster in np.array_split(np.arange(N), num_clusters)])
+
+    # Initialize and solve master problem
+    env = init_env()
+    master, x, theta = init_master(A,b,c,num_clusters,env)
+    if master.Status == GRB.OPTIMAL:
+        x_master = x.X
+    else:
+        raise Exception("Initial relaxation is not solvable.")
+    cut_pool = CutPool(master, x, theta)
+    theta_set = False
+
+    # Least recently used models of the recourse structures
+    caches = OrderedDict()
+
+    def get_caches(start, stop, W, q):
+        """ Return the caches of the structures of the scenarios start,...,stop-1 and the local structure indices. """
+        structures, local = np.unique(store.structures[start:stop], return_inverse=True)
+        for structure in structures:
+            if structure in caches:
+                caches.move_to_end(structure)
+            else:
+                i = np.flatnonzero(store.structures[start:stop] == structure)[0]
+                caches[structure] = DualCache(W[i], q[i], env)
+        for structure in list(caches)[:max(0, len(caches) - max(max_models, len(structures)))]:
+            caches.pop(structure).dispose()
+        return [caches[structure] for structure in structures], local
+
+    try:
+        recourse = None
+        iter = 0
+        # The expected recourse value is passed to stopping_criterion as a single scenario with probability 1
+        while not stopping_criterion(iter, MAX_ITER, theta, recourse, [1], TOL_OPT):
+            recourse = 0
+            coefs, rhs = 0, 0
+            for start, stop in chunks:
+                T, W, h, q, offsets = store.load(start, stop)
+                chunk_caches, structures = get_caches(start, stop, W, q)
+                results = solve_scenarios_cached(chunk_caches, structures, scenario_objectives(T, h, offsets, x_master))
+                status, vector = results[-1][:2]
+
+                # If the dual is infeasible, the primal problem is infeasible or unbounded (and hence not solvable)
+                if status == GRB.INFEASIBLE:
+                    raise Exception("Problem is not solvable")
+
+                # If the dual is unbounded (and hence the primal infeasible), add a feasibility cut
+                if status == GRB.UNBOUNDED:
+                    rows = slice(offsets[len(results)-1], offsets[len(results)])
+                    cut_pool.add((T[rows].T@vector)[None,:], [-1], [np.dot(vector,h[rows])])
+                    recourse = None
+                    break
+
+                # Accumulate the optimality cuts of the chunk
+                duals = [result[1] for result in results]
+                clusters = np.searchsorted(bounds, np.arange(start, stop), side="right") - 1
+                chunk_coefs, chunk_rhs = optimality_cut(T, h, offsets, duals, store.p[start:stop], clusters, num_clusters)
+                coefs, rhs = coefs + chunk_coefs, rhs + chunk_rhs
+                recourse += np.dot(store.p[start:stop], [result[2] for result in results])
+
+            # If all scenarios have an optimal solution, add an optimality cut per cluster
+            if recourse is not None:
+                if not theta_set:
+                    theta.LB = -np.inf
+                    theta.UB = np.inf
+                    theta_set = True
+                cut_pool.add(coefs, np.arange(num_clusters), rhs)
+                recourse = [recourse]
+
+            # Reoptimize the master model
+            master.optimize()
+            if master.Status == GRB.OPTIMAL:
+                x_master = x.X
+            else:
+                raise Exception("Problem is unsolvable")
+            cut_pool.update(x_master, theta.X, master.Runtime)
+
+            iter += 1
+
+        # Stream the scenarios once more to write the optimal primal solutions of the scenarios to disk
+        shape = (int(store.q_offsets[-1]),)
+        if y_path is None:
+            y = np.memmap(tempfile.TemporaryFile(), dtype=np.float64, mode="w+", shape=shape)
+        else:
+            y = np.lib.format.open_memmap(y_path, mode="w+", shape=shape)
+        for start, stop in chunks:
+            T, W, h, q, offsets = store.load(start, stop)
+            chunk_caches, structures = get_caches(start, stop, W, q)
+            results = solve_scenarios_cached(chunk_caches, structures, scenario_objectives(T, h, offsets, x_master))
+            for i, result in enumerate(results):
+                y[store.q_offsets[start+i]:store.q_offsets[start+i+1]] = result[3]
+        y.flush()
+
+        return {"solution": x_master, "y": y, "opt_val": master.ObjVal,
+                "termination_reason": stopping_criterion(iter, MAX_ITER, theta, recourse, [1], TOL_OPT, reason=True),
+                "iter": iter, "cut_pool": cut_pool.statistics()}
+    finally:
+        for cache in caches.values():
+            cache.dispose()
+        master.dispose()
+        env.dispose()
@@ -0,0 +1,144 @@
+"""
+This file implements the stabilization of the Benders decomposition method from main.py.
+
+Plain Benders decomposition takes the minimizer of the cutting plane model (the master problem) as the next point.
+This point tends to jump between extreme points of the master problem. A stabilized method keeps the best point found so
+far (the center) and only moves away from it to a limited extent:
+
+    trust_region: Minimize the cutting plane model within the box ||x - center||_inf <= Delta
+    proximal:     Minimize the cutting plane model plus the penalty ||x - center||^2 / (2t)
+    level:        Minimize ||x - center||^2 over all x whose model value is at most lower + lamda * (upper - lower)
+
+If the true objective value of the next point decreases sufficiently compared to the decrease predicted by the model,
+the point becomes the new center (serious step). Otherwise, only the generated cuts improve the model (null step).
+The parameters Delta, t and lamda are enlarged or reduced depending on the outcome of each step.
+"""
+
+import numpy as np
+from gurobipy import GRB
+
+# Constants
+METHODS = ("trust_region", "proximal", "level")
+MU = 0.1                # minimal ratio of actual and predicted decrease for a serious step
+DELTA_REL = 0.1         # initial trust region radius relative to the largest entry of the first center
+DELTA_MIN = 1e-6        # minimal trust region radius
+T_INIT = 1              # initial proximal parameter
+T_MIN = 1e-6            # minimal proximal parameter
+LAMDA_INIT = 0.5        # initial level parameter
+LAMDA_MIN = 0.1         # bounds for the level parameter
+LAMDA_MAX = 0.9
+
+
+class Stabilizer:
+    """ Incumbent (center), bounds and step parameter of a stabilized Benders decomposition. """
+
+    def __init__(self, method):
+        if method not in METHODS:
+            raise Exception(f"Unknown stabilization. Choose one of {METHODS}.")
+        self.method = method
+        self.reset()
+
+
+    def reset(self):
+        """ Forget the center and the bounds (e.g. since the problem data changed). """
+        self.center = None          # best point found so far
+        self.y_center = None        # optimal primal solutions of the scenarios at the center
+        self.upper = np.inf         # objective value of the center
+        self.lower = -np.inf        # optimal value of the master problem
+        self.model_value = None     # value of the cutting plane model at the last candidate
+        self.theta_value = None     # value of theta in the master problem at the last candidate
+        self.local = True           # whether the last candidate was computed by the stabilized master problem
+        self.param = {"trust_region": None, "proximal": T_INIT, "level": LAMDA_INIT}[self.method]
+
+
+    def update(self, value, candidate, y):
+        """ Perform a serious or a null step given the objective value of the candidate and its scenario solutions y. """
+        if self.center is None:
+            self.center, self.y_center, self.upper = candidate, list(y), value
+            if self.method == "trust_region":
+                self.param = max(DELTA_REL * np.max(np.abs(candidate), initial=1), DELTA_MIN)
+            return
+
+        step = np.max(np.abs(candidate - self.center))
+        decrease = self.upper - value
+        predicted = self.upper - self.model_value
+        ratio = decrease / predicted if predicted > 0 else (np.inf if decrease > 0 else -np.inf)
+        serious = decrease > 0 and ratio >= MU
+        if serious:
+            self.center, self.y_center, self.upper = candidate, list(y), value
+
+        # Parameters are only adapted based on candidates of the stabilized master problem
+        if not self.local:
+            return
+        if self.method == "trust_region":
+            if serious and ratio >= 0.5 and step >= 0.99 * self.param:
+                self.param *= 2
+            elif not serious and ratio < 0:
+                self.param = max(self.param / 2, DELTA_MIN)
+        elif self.method == "proximal":
+            if serious and ratio >= 0.5:
+                self.param *= 2
+            elif not serious and ratio < 0:
+                self.param = max(self.param / 2, T_MIN)
+        else:
+            if serious:
+                self.param = max(self.param * 0.9, LAMDA_MIN)
+            else:
+                self.param = min(self.param * 1.1, LAMDA_MAX)
+
+
+    def solve_master(self, master, x, theta, c, bounded=True):
+        """
+        Solve the master problem for the lower bound and the stabilized master problem for the next candidate.
+        If the stabilized problem predicts no significant decrease, the minimizer of the master problem is returned instead
+        such that the lower bound keeps improving.
+        The optimal value of the master problem is only a lower bound if bounded = True, i.e. all variables theta are 
+        bounded by optimality cuts instead of being fixed to 0. Otherwise, the lower bound stays at -inf.
+        """
+        linear = c@x + theta.sum()
+        master.setObjective(linear, GRB.MINIMIZE)
+        master.optimize()
+        if master.Status != GRB.OPTIMAL:
+            raise Exception("Problem is unsolvable")
+        model_min = master.ObjVal       # minimum of the cutting plane model
+        if bounded:
+            self.lower = model_min
+        self.local = False
+        self.theta_value = theta.X
+        if self.center is None:
+            return x.X
+        x_lower = x.X
+        theta_lower = self.theta_value
+
+        if self.method == "trust_region":
+            x.LB = np.maximum(self.center - self.param, 0)
+            x.UB = self.center + self.param
+            master.optimize()
+        elif self.method == "proximal":
+            master.setObjective(linear + (x - self.center)@(x - self.center) / (2 * self.param), GRB.MINIMIZE)
+            master.optimize()
+        else:
+            level = master.addConstr(linear <= model_min + self.param * (self.upper - model_min))
+            master.setObjective((x - self.center)@(x - self.center), GRB.MINIMIZE)
+            master.optimize()
+
+        solved = master.Status == GRB.OPTIMAL
+        if solved:
+            candidate = x.X
+            self.theta_value = theta.X
+            self.model_value = c@candidate + np.sum(self.theta_value)
+
+        # Restore the master problem
+        if self.method == "trust_region":
+            x.LB = 0
+            x.UB = np.inf
+        elif self.method == "level":
+            master.remove(level)
+        master.setObjective(linear, GRB.MINIMIZE)
+
+        if not solved or self.upper - self.model_value <= MU * (self.upper - model_min):
+            self.model_value = model_min
+            self.theta_value = theta_lower
+            return x_lower
+        self.local = True
+        return candidate
@@ -0,0 +1,93 @@
+"""
+This file implements a front end which decides whether a block-structured linear program (see benders_decomposition)
+is solved directly as sparse extensive form or by the Benders decomposition method from main.py.
+
+Small and moderate problems are usually solved faster directly, while large ones (in particular with many scenarios)
+profit from the decomposition. The decision is based on
+    - the number of nonzeros of the extensive form (a measure of its size and sparsity),
+    - the number of distinct recourse structures (W_i, q_i), since repeated structures make the scenario cache of the
+      decomposition effective.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gp
+from aux_fct import solve_extensive_form
+from cache import init_structures
+from main import benders_decomposition
+
+# Constants
+STRATEGIES = ("extensive_form", "benders")
+MAX_NNZ = 1000000           # maximal number of nonzeros of the extensive form which is solved directly
+MAX_REPETITION = 0.1        # maximal ratio of distinct recourse structures and scenarios for which the cache is used
+MIN_SCENARIOS = 100         # minimal number of scenarios for which the decomposition is chosen due to repetition
+
+
+def problem_statistics(A,b,c,T,W,h,q,p):
+    """ Estimate the size and sparsity of the extensive form and the repetition of the recourse structures. """
+    nnz = lambda matrix: matrix.nnz if sp.issparse(matrix) else np.count_nonzero(matrix)
+    rows = np.shape(A)[0] + sum(np.shape(W_i)[0] for W_i in W)
+    cols = np.shape(A)[1] + sum(np.shape(W_i)[1] for W_i in W)
+    nonzeros = nnz(A) + sum(nnz(T_i) for T_i in T) + sum(nnz(W_i) for W_i in W)
+    structures = init_structures(W, q)[1]
+
+    return {"scenarios": len(W), "rows": rows, "cols": cols, "nnz": nonzeros, "density": nonzeros / (rows * cols),
+            "structures": len(structures), "repetition": len(structures) / len(W)}
+
+
+def choose_strategy(statistics):
+    """ Return the strategy, the options of benders_decomposition and the reason for the choice. """
+    if statistics["nnz"] > MAX_NNZ:
+        cache = statistics["repetition"] <= MAX_REPETITION
+        return "benders", {"cache": cache}, (f"The extensive form has {statistics['nnz']} > {MAX_NNZ} nonzeros" +
+                                             (" and few distinct recourse structures." if cache else "."))
+    if statistics["repetition"] <= MAX_REPETITION and statistics["scenarios"] >= MIN_SCENARIOS:
+        return "benders", {"cache": True}, (f"{statistics['scenarios']} scenarios share only {statistics['structures']} "
+                                            f"recourse structures.")
+    return "extensive_form", {}, f"The extensive form is small enough ({statistics['nnz']} <= {MAX_NNZ} nonzeros)."
+
+
+def solve(A,b,c,T,W,h,q,p, strategy=None, **kwargs):
+    """ Solve a block-structured linear program (see benders_decomposition) with an automatically chosen strategy.
+
+    Input:
+        A,b,c,T,W,h,q,p: Problem data as for benders_decomposition
+        strategy: None for the automatic choice or one of "extensive_form" and "benders" to override it
+        kwargs: Further arguments of benders_decomposition (replacing the automatically chosen ones, or the only ones 
+                if the strategy is given). They are not allowed for strategy = "extensive_form" and not used if the 
+                extensive form is chosen automatically.
+
+    Output:
+        The dictionary returned by benders_decomposition or solve_extensive_form extended by
+            strategy: Dictionary with the chosen method, the options passed to benders_decomposition, the reason for 
+                      the choice and the problem statistics it is based on
+
+    If the extensive form turns out to be too large for Gurobi (e.g. due to a size-limited license) after an automatic
+    choice, the problem is solved by the decomposition instead.
+    """
+    if strategy is not None and strategy not in STRATEGIES:
+        raise Exception(f"Unknown strategy. Choose one of {STRATEGIES}.")
+    if strategy == "extensive_form" and kwargs:
+        raise Exception(f"The extensive form takes no further arguments, got {sorted(kwargs)}.")
+    statistics = problem_statistics(A,b,c,T,W,h,q,p)
+    method, options, reason = choose_strategy(statistics)
+    if strategy is not None:
+        method, options, reason = strategy, {}, "Chosen by the user."
+    options.update(kwargs)
+
+    if method == "extensive_form":
+        if kwargs:
+            reason += f" The arguments {sorted(kwargs)} of benders_decomposition are not used."
+        try:
+            result = solve_extensive_form(A,b,c,T,W,h,q,p)
+            result.update({"termination_reason": "Optimal solution found", "iter": None})
+        except gp.GurobiError as error:
+            if strategy is not None:
+                raise
+            method, reason = "benders", f"{reason} Solving it failed ({error}), hence the decomposition is used."
+    if method == "benders":
+        result = benders_decomposition(A,b,c,T,W,h,q,p, **options)
+
+    result["strategy"] = {"method": method, "options": options if method == "benders" else {}, "reason": reason,
+                          "statistics": statistics}
+    return result
@@ -1,10 +1,20 @@
 """ This file tests the implementation of the Benders decomposition from main.py by comparing its optimal value with the result of 
 the general-purpose solver Gurobi. """
 
+import os
+import time
+import tempfile
 import numpy as np 
-import gurobipy as gp
-from gurobipy import GRB 
-from main import benders_decomposition
+import scipy.sparse as sp
+from main import benders_decomposition, BendersSolver
+from aux_fct import solve_extensive_form
+from asynchronous import asynchronous_benders_decomposition
+from recorder import IterationRecorder
+from reduction import reduced_benders_decomposition
+from strategy import solve
+from scenario_store import save_scenarios, ScenarioStore, out_of_core_benders_decomposition
+from batch import solve_batch
+from instances import build_instance
 
 # Relative tolerance up to which an instance is considered to be solved correctly
 TOL = 0.01
@@ -32,49 +42,13 @@ def test_bender(n,m,s,k,N,num):
     counter = 0
     
     for _ in range(num):
-        # Create first stage problem data
-        A = np.hstack((np.random.randint(1,20,(m,n)), np.eye(m,m)))
-        b = np.random.randint(n*10,n*100,m)
-        c = np.hstack((np.random.randint(-10,-1,n), np.zeros(m)))
-
-        # Create second stage problem data 
-        T = [np.hstack((np.random.randint(1,20,(s,n)),np.zeros((s,m)))) for _ in range(N)]
-        W = [np.hstack((np.random.randint(1,20,(s,k)),np.eye(s,s))) for _ in range(N)]
-        h = [np.random.randint(n*10+k*10,n*100+k*100,s) for _ in range(N)]
-        q = [np.hstack((np.random.randint(-10,-1,k),np.zeros(s))) for _ in range(N)]
-        p = np.random.randint(0,100,N)
-        p = p/np.sum(p)
+        A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N)
 
         # Apply Benders decomposition 
         opt_bender = benders_decomposition(A,b,c,T,W,h,q,p)["opt_val"]
 
-        # Build standard LP data (A,b,c) for Gurobi
-        q = np.array(q,dtype=np.float64).flatten()
-        offset = 0
-        for i in range(N):
-            q[offset:offset+k+s] *= p[i]
-            offset += k+s
-        c = np.hstack((c,q))
-
-        b = np.hstack((b,np.array(h).flatten()))
-
-        A_ = np.zeros((m + N * s, n+m+N*(k+s)))
-        A_[0:m,0:n+m] = A
-        for i in range(N):
-            A_[m+i*s:m+(i+1)*s, :n+m] = T[i]
-            A_[m+i*s:m+(i+1)*s, n+m+i*(k+s):n+m+(i+1)*(k+s)] = W[i]
-        A = A_
-
-        # Solve the problem with Gurobi 
-        env = gp.Env(empty=True)
-        env.setParam("OutputFlag",0)    # suppress any Gurobi console output
-        env.start()
-        model = gp.Model(env=env)
-        x = model.addMVar(shape=np.shape(A)[1], vtype=GRB.CONTINUOUS)
-        model.addConstr(A@x == b)
-        model.setObjective(c@x, GRB.MINIMIZE)
-        model.optimize()
-        opt_gurobi = model.ObjVal
+        # Solve the extensive form of the problem with Gurobi 
+        opt_gurobi = solve_extensive_form(A,b,c,T,W,h,q,p)["opt_val"]
 
         # Check for correctness
         if np.abs((opt_bender - opt_gurobi) / opt_gurobi) <= TOL:
@@ -84,5 +58,472 @@ def test_bender(n,m,s,k,N,num):
     return f"{counter} out of {num} test instances were solved correctly."
 
 
-# Test Benders decomposition
-print(test_bender(n=100,m=50,s=10,k=20,N=10,num=100))
\ No newline at end of file
+def test_parallel(n,m,s,k,N,num_workers,pool):
+    """ Solve a randomized two-stage problem once serially and once with num_workers parallel workers and assert that 
+    both runs generate the same iterates.
+
+    Output:
+        Textual message with the speedup achieved by the parallel run.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N)
+
+    start = time.perf_counter()
+    serial = benders_decomposition(A,b,c,T,W,h,q,p)
+    time_serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = benders_decomposition(A,b,c,T,W,h,q,p, num_workers=num_workers, pool=pool)
+    time_parallel = time.perf_counter() - start
+
+    assert serial["iter"] == parallel["iter"], f"Serial run needs {serial['iter']} and parallel run {parallel['iter']} iterations."
+    assert np.array_equal(serial["solution"], parallel["solution"]), "Serial and parallel run return different solutions."
+    return (f"Serial and parallel run ({num_workers} {pool} workers) agree. "
+            f"Speedup: {time_serial / time_parallel:.2f} ({time_serial:.2f}s vs. {time_parallel:.2f}s).")
+
+
+def test_cut_modes(n,m,s,k,N,num_clusters):
+    """ Solve a randomized two-stage problem with complete recourse once for each number of clusters in num_clusters 
+    (1 is the single-cut method, N the multi-cut method).
+
+    Output:
+        Textual message with the number of iterations and the runtime of each mode.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,complete_recourse=True)
+
+    message = []
+    for clusters in num_clusters:
+        start = time.perf_counter()
+        result = benders_decomposition(A,b,c,T,W,h,q,p, num_clusters=clusters)
+        message.append(f"{clusters} cluster(s): {result['iter']} iterations in {time.perf_counter() - start:.2f}s")
+    return "\n".join(message)
+
+
+def test_solver(n,m,s,k,N,num):
+    """ Solve num perturbations of a randomized two-stage problem with one persistent BendersSolver and compare the 
+    optimal values and runtimes with fresh calls of benders_decomposition.
+
+    Output:
+        Textual message how many re-solves agree with the fresh solves and the total runtime of both approaches.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,complete_recourse=True)
+    solver = BendersSolver(A,b,c,T,W,h,q,p)
+    solver.solve()
+
+    counter = 0
+    time_solver, time_fresh = 0, 0
+    for _ in range(num):
+        b_ = b * np.random.uniform(0.9,1.1,len(b))
+        c_ = c * np.random.uniform(0.9,1.1,len(c))
+        h_ = [h_i * np.random.uniform(0.8,1.2,len(h_i)) for h_i in h]
+
+        start = time.perf_counter()
+        opt_solver = solver.solve(b=b_,h=h_,c=c_)["opt_val"]
+        time_solver += time.perf_counter() - start
+
+        start = time.perf_counter()
+        opt_fresh = benders_decomposition(A,b_,c_,T,W,h_,q,p)["opt_val"]
+        time_fresh += time.perf_counter() - start
+
+        if np.abs((opt_solver - opt_fresh) / opt_fresh) <= TOL:
+            counter += 1
+    solver.close()
+
+    return (f"{counter} out of {num} re-solves agree with a fresh solve. "
+            f"Persistent solver: {time_solver:.2f}s, fresh solves: {time_fresh:.2f}s.")
+
+
+def test_cache(n,m,s,k,N):
+    """ Solve a randomized two-stage problem whose scenarios share the same recourse structure once with and once 
+    without the scenario cache.
+
+    Output:
+        Textual message whether both runs agree, how many scenario LPs were actually solved and the runtimes.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,shared_recourse=True)
+
+    start = time.perf_counter()
+    plain = benders_decomposition(A,b,c,T,W,h,q,p)
+    time_plain = time.perf_counter() - start
+
+    solver = BendersSolver(A,b,c,T,W,h,q,p, cache=True)
+    start = time.perf_counter()
+    cached = solver.solve()
+    time_cached = time.perf_counter() - start
+    lp_solves = sum(cache.lp_solves for cache in solver.caches)
+    lookups = lp_solves + sum(cache.hits for cache in solver.caches)
+    solver.close()
+
+    agree = np.abs((plain["opt_val"] - cached["opt_val"]) / plain["opt_val"]) <= TOL
+    return (f"Runs with and without cache {'agree' if agree else 'do not agree'}. {lp_solves} LPs were solved for "
+            f"{lookups} scenario evaluations. Runtime: {time_cached:.2f}s with cache vs. {time_plain:.2f}s without.")
+
+
+def test_sparse(n,m,s,k,N,density):
+    """ Solve a randomized two-stage problem whose matrices T_i have the given density once with dense numpy arrays 
+    and once with scipy.sparse matrices as input.
+
+    Output:
+        Textual message whether both runs agree and their runtimes.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N)
+    T = [T_i * (np.random.rand(s,n+m) < density) for T_i in T]
+
+    start = time.perf_counter()
+    dense = benders_decomposition(A,b,c,T,W,h,q,p)
+    time_dense = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sparse = benders_decomposition(sp.csr_matrix(A),b,c,[sp.csr_matrix(T_i) for T_i in T],[sp.csr_matrix(W_i) for W_i in W],h,q,p)
+    time_sparse = time.perf_counter() - start
+
+    agree = np.abs((dense["opt_val"] - sparse["opt_val"]) / dense["opt_val"]) <= TOL
+    return (f"Dense and sparse input {'agree' if agree else 'do not agree'}. "
+            f"Runtime: {time_sparse:.2f}s with sparse vs. {time_dense:.2f}s with dense input.")
+
+
+def test_stabilization(n,m,s,k,N,num):
+    """ Solve num randomized two-stage problems with complete recourse with plain and with each stabilized variant of 
+    Benders decomposition.
+
+    Output:
+        Textual message with the number of correctly solved instances, the average number of iterations and the 
+        total runtime of each variant.
+    """
+    methods = [None, "trust_region", "proximal", "level"]
+    counter = {method: 0 for method in methods}
+    iterations = {method: 0 for method in methods}
+    runtime = {method: 0 for method in methods}
+    for _ in range(num):
+        A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,complete_recourse=True)
+        for method in methods:
+            start = time.perf_counter()
+            result = benders_decomposition(A,b,c,T,W,h,q,p, stabilization=method)
+            runtime[method] += time.perf_counter() - start
+            iterations[method] += result["iter"] / num
+            if method is None:
+                reference = result["opt_val"]
+            if np.abs((result["opt_val"] - reference) / reference) <= TOL:
+                counter[method] += 1
+
+    return "\n".join(f"{method or 'plain'}: {counter[method]} out of {num} correct, {iterations[method]:.1f} iterations "
+                     f"on average, {runtime[method]:.2f}s in total" for method in methods)
+
+
+def test_cut_pool(n,m,s,k,N,max_cut_age):
+    """ Solve a randomized two-stage problem with the multi-cut method once keeping all cuts and once removing cuts 
+    that are inactive for more than max_cut_age iterations.
+
+    Output:
+        Textual message whether both runs agree, the final number of cuts in the master problem and the total 
+        master solve time of both runs.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N)
+
+    messages = []
+    for age in [None, max_cut_age]:
+        result = benders_decomposition(A,b,c,T,W,h,q,p, num_clusters=N, max_cut_age=age)
+        statistics = result["cut_pool"]
+        messages.append(f"{statistics['active'][-1]} cuts in the master problem, "
+                        f"{np.sum(statistics['master_time']):.2f}s master solve time")
+        if age == max_cut_age:
+            agree = np.abs((result["opt_val"] - reference) / reference) <= TOL
+        reference = result["opt_val"]
+
+    return (f"Runs {'agree' if agree else 'do not agree'}. Without removal: {messages[0]}. "
+            f"Removal after {max_cut_age} iterations: {messages[1]}.")
+
+
+def test_asynchronous(n,m,s,k,N,num_workers,num):
+    """ Solve num randomized two-stage problems with the synchronous parallel multi-cut method and with the 
+    asynchronous method using num_workers worker threads.
+
+    Output:
+        Textual message how many asynchronous runs agree with the synchronous ones and the total runtimes.
+    """
+    counter = 0
+    time_sync, time_async = 0, 0
+    for _ in range(num):
+        A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N)
+
+        start = time.perf_counter()
+        opt_sync = benders_decomposition(A,b,c,T,W,h,q,p, num_workers=num_workers, num_clusters=N)["opt_val"]
+        time_sync += time.perf_counter() - start
+
+        start = time.perf_counter()
+        opt_async = asynchronous_benders_decomposition(A,b,c,T,W,h,q,p, num_workers=num_workers)["opt_val"]
+        time_async += time.perf_counter() - start
+
+        if np.abs((opt_async - opt_sync) / opt_sync) <= TOL:
+            counter += 1
+
+    return (f"{counter} out of {num} asynchronous runs agree with the synchronous ones. "
+            f"Runtime: {time_async:.2f}s asynchronous vs. {time_sync:.2f}s synchronous.")
+
+
+def test_inexact(n,m,s,k,N,num):
+    """ Solve num randomized two-stage problems with complete recourse with exact and with both kinds of inexact 
+    scenario solves.
+
+    Output:
+        Textual message with the number of correct runs, the average number of iterations and simplex iterations of the 
+        scenarios and the total runtime of each mode.
+    """
+    modes = [None, "limit", "sample"]
+    counter = {mode: 0 for mode in modes}
+    iterations = {mode: 0 for mode in modes}
+    simplex_iter = {mode: 0 for mode in modes}
+    runtime = {mode: 0 for mode in modes}
+    for _ in range(num):
+        A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,complete_recourse=True)
+        for mode in modes:
+            start = time.perf_counter()
+            result = benders_decomposition(A,b,c,T,W,h,q,p, inexact=mode)
+            runtime[mode] += time.perf_counter() - start
+            iterations[mode] += result["iter"] / num
+            simplex_iter[mode] += result["simplex_iter"] / num
+            if mode is None:
+                opt_val = result["opt_val"]
+            if np.abs((result["opt_val"] - opt_val) / opt_val) <= TOL:
+                counter[mode] += 1
+
+    return "\n".join(f"{mode or 'exact'}: {counter[mode]} out of {num} correct, {iterations[mode]:.1f} iterations and "
+                     f"{simplex_iter[mode]:.0f} simplex iterations on average, {runtime[mode]:.2f}s in total" for mode in modes)
+
+
+def test_recorder(n,m,s,k,N,max_gap):
+    """ Solve a randomized two-stage problem with complete recourse once to optimality and once stopped by the 
+    recorder as soon as the relative gap is at most max_gap.
+
+    Output:
+        Textual message with the recorded bounds and the share of each phase in the total time.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,complete_recourse=True)
+    recorder = IterationRecorder()
+    full = benders_decomposition(A,b,c,T,W,h,q,p, callback=recorder)
+    traces = recorder.traces()
+    stopped = benders_decomposition(A,b,c,T,W,h,q,p, callback=IterationRecorder(max_gap=max_gap))
+
+    total = sum(full["phase_times"].values())
+    shares = ", ".join(f"{phase} {100 * time / total:.0f}%" for phase, time in full["phase_times"].items())
+    return (f"Recorded {len(traces['iter'])} of {full['iter']} iterations, final bounds {traces['lower_bound'][-1]:.2f} "
+            f"and {traces['upper_bound'][-1]:.2f}. Stopped at gap {max_gap} after {stopped['iter']} iterations "
+            f"({stopped['termination_reason']}). Time: {shares}.")
+
+
+def test_strategy(n,m,s,k,N_small,N_large):
+    """ Solve a small randomized two-stage problem and a large one whose scenarios share the same recourse structure 
+    with the automatic strategy selection and compare the results with benders_decomposition.
+
+    Output:
+        Textual message with the chosen strategies, their reasons and whether the results agree.
+    """
+    message = []
+    for N, shared_recourse in [(N_small, False), (N_large, True)]:
+        A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,complete_recourse=True,shared_recourse=shared_recourse)
+        result = solve(A,b,c,T,W,h,q,p)
+        opt_val = benders_decomposition(A,b,c,T,W,h,q,p)["opt_val"]
+        agree = np.abs((result["opt_val"] - opt_val) / opt_val) <= TOL
+        message.append(f"N={N}: {result['strategy']['method']} ({result['strategy']['reason']}) "
+                       f"{'agrees' if agree else 'does not agree'} with Benders decomposition.")
+
+    # Override the automatic choice
+    result = solve(A,b,c,T,W,h,q,p, strategy="benders", num_clusters=5)
+    agree = np.abs((result["opt_val"] - opt_val) / opt_val) <= TOL
+    message.append(f"Override: {result['strategy']['method']} with {result['strategy']['options']} "
+                   f"{'agrees' if agree else 'does not agree'} with Benders decomposition.")
+
+    # Arguments of benders_decomposition cannot be used by the extensive form
+    try:
+        solve(A,b,c,T,W,h,q,p, strategy="extensive_form", num_clusters=5)
+        message.append("Override: extensive_form accepts arguments of benders_decomposition.")
+    except Exception as error:
+        message.append(f"Override: extensive_form rejects arguments of benders_decomposition ({error})")
+
+    return "\n".join(message)
+
+
+def test_warm_start(n,m,s,k,N,num,num_changed):
+    """ Solve num consecutive perturbations of a randomized two-stage problem, where b, c and h change slightly and 
+    num_changed scenarios are replaced, once from scratch and once warm-started with the cuts of the previous solve.
+
+    Output:
+        Textual message how many warm-started solves agree with the cold ones and the total iterations of both.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,complete_recourse=True)
+    cuts = None
+    counter = 0
+    iter_cold, iter_warm = 0, 0
+    for _ in range(num):
+        cold = benders_decomposition(A,b,c,T,W,h,q,p)
+        solver = BendersSolver(A,b,c,T,W,h,q,p, cuts=cuts)
+        warm = solver.solve()
+        cuts = solver.export_cuts()
+        solver.close()
+
+        iter_cold += cold["iter"]
+        iter_warm += warm["iter"]
+        if np.abs((cold["opt_val"] - warm["opt_val"]) / cold["opt_val"]) <= TOL:
+            counter += 1
+
+        # Perturb the problem for the next solve
+        b = b * np.random.uniform(0.99,1.01,len(b))
+        c = c * np.random.uniform(0.99,1.01,len(c))
+        h = [h_i * np.random.uniform(0.99,1.01,len(h_i)) for h_i in h]
+        _,_,_,T_new,W_new,h_new,q_new,_ = build_instance(n,m,s,k,num_changed,complete_recourse=True)
+        for j, i in enumerate(np.random.choice(N, num_changed, replace=False)):
+            T[i], W[i], h[i], q[i] = T_new[j], W_new[j], h_new[j], q_new[j]
+
+    return (f"{counter} out of {num} warm-started solves agree with the cold ones. "
+            f"Iterations: {iter_warm} warm-started vs. {iter_cold} cold.")
+
+
+def test_scenario_store(n,m,s,k,N,chunk_size,max_models):
+    """ Solve a randomized two-stage problem whose scenarios share a few recourse structures once in memory and once 
+    streamed from a scenario store in a temporary directory, which must not be changed by the solve.
+
+    Output:
+        Textual message whether both runs agree and the runtimes.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,complete_recourse=True)
+    W = [W[i % 5] for i in range(N)]
+    q = [q[i % 5] for i in range(N)]
+
+    start = time.perf_counter()
+    in_memory = benders_decomposition(A,b,c,T,W,h,q,p)
+    time_memory = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as path:
+        save_scenarios(path, zip(T,W,h,q), p)
+        files = sorted(os.listdir(path))
+        start = time.perf_counter()
+        out_of_core = out_of_core_benders_decomposition(A,b,c,ScenarioStore(path), chunk_size=chunk_size, max_models=max_models)
+        time_disk = time.perf_counter() - start
+        unchanged = sorted(os.listdir(path)) == files
+
+    agree = unchanged and np.abs((in_memory["opt_val"] - out_of_core["opt_val"]) / in_memory["opt_val"]) <= TOL
+    return (f"In-memory and out-of-core runs {'agree' if agree else 'do not agree'}. "
+            f"Runtime: {time_disk:.2f}s out-of-core vs. {time_memory:.2f}s in memory.")
+
+
+def test_reduction(n,m,s,k,N,num_scenarios):
+    """ Solve a randomized two-stage problem with complete recourse once with all N scenarios and once for each reduction 
+    method with num_scenarios scenarios, whose first stage solution is then evaluated on all scenarios.
+
+    Output:
+        Textual message with the distance of the reduced distributions, the relative loss of the reduced solutions 
+        compared to the optimal value and the runtimes.
+    """
+    A,b,c,T,W,h,q,p = build_instance(n,m,s,k,N,complete_recourse=True)
+
+    start = time.perf_counter()
+    opt_val = benders_decomposition(A,b,c,T,W,h,q,p)["opt_val"]
+    message = f"Runtime with all {N} scenarios: {time.perf_counter() - start:.2f}s."
+
+    for method in ["forward", "kmedoids"]:
+        start = time.perf_counter()
+        reduced = reduced_benders_decomposition(A,b,c,T,W,h,q,p,num_scenarios, method=method, seed=0, validate=True)
+        runtime = time.perf_counter() - start
+        loss = (reduced["validated_value"] - opt_val) / np.abs(opt_val)
+        message += (f" {method}: distance {reduced['distance']:.1f}, loss {100*loss:.2f}%, runtime {runtime:.2f}s.")
+
+    return message
+
+
+def test_batch(n,m,s,k,N,num,num_workers):
+    """ Solve num randomized two-stage problems one after another and as a batch with num_workers worker processes.
+
+    Output:
+        Textual message how many batch results agree with the sequential ones, how many instances failed and the total 
+        runtimes.
+    """
+    instances = [dict(zip("AbcTWhqp", build_instance(n,m,s,k,N))) for _ in range(num)]
+
+    start = time.perf_counter()
+    opt_vals = [benders_decomposition(**instance)["opt_val"] for instance in instances]
+    time_sequential = time.perf_counter() - start
+
+    counter, failed = 0, 0
+    start = time.perf_counter()
+    for record in solve_batch(instances, num_workers=num_workers):
+        if "error" in record:
+            failed += 1
+        elif np.abs((record["result"]["opt_val"] - opt_vals[record["index"]]) / opt_vals[record["index"]]) <= TOL:
+            counter += 1
+    time_batch = time.perf_counter() - start
+
+    return (f"{counter} out of {num} batch results agree with the sequential ones ({failed} failed). "
+            f"Runtime: {time_batch:.2f}s batch vs. {time_sequential:.2f}s sequential.")
+
+
+def test_batch_errors(n,m,s,k,N,num,num_workers):
+    """ Solve a batch of num randomized two-stage problems, where every third instance has a lambda function as callback
+    which cannot be pickled to the worker processes.
+
+    Output:
+        Textual message how many instances returned a result and how many reported an error.
+    """
+    instances = [dict(zip("AbcTWhqp", build_instance(n,m,s,k,N))) for _ in range(num)]
+    for instance in instances[::3]:
+        instance["callback"] = lambda info: None
+
+    results, errors = set(), set()
+    for record in solve_batch(instances, num_workers=num_workers):
+        (errors if "error" in record else results).add(record["index"])
+
+    correct = errors == set(range(0,num,3)) and results == set(range(num)) - errors
+    return (f"{len(results)} out of {num} instances returned a result and {len(errors)} reported an error "
+            f"({'as expected' if correct else 'not as expected'}).")
+
+
+if __name__ == "__main__":
+    # Test Benders decomposition
+    print(test_bender(n=100,m=50,s=10,k=20,N=10,num=100))
+
+    # Compare the serial and the parallel solution of the scenarios
+    print(test_parallel(n=100,m=50,s=10,k=20,N=200,num_workers=4,pool="thread"))
+    print(test_parallel(n=100,m=50,s=10,k=20,N=200,num_workers=4,pool="process"))
+
+    # Compare the single-cut, hybrid and multi-cut method
+    print(test_cut_modes(n=100,m=50,s=10,k=20,N=50,num_clusters=[1,5,50]))
+
+    # Re-solve perturbed problems with a persistent solver
+    print(test_solver(n=100,m=50,s=10,k=20,N=50,num=20))
+
+    # Deduplicate scenarios with identical recourse structure
+    print(test_cache(n=100,m=50,s=10,k=20,N=500))
+
+    # Solve a problem with sparse technology matrices
+    print(test_sparse(n=100,m=50,s=10,k=20,N=200,density=0.05))
+
+    # Compare plain and stabilized Benders decomposition
+    print(test_stabilization(n=100,m=50,s=10,k=20,N=50,num=10))
+
+    # Remove inactive cuts from the master problem
+    print(test_cut_pool(n=100,m=50,s=10,k=20,N=100,max_cut_age=5))
+
+    # Compare synchronous and asynchronous Benders decomposition
+    print(test_asynchronous(n=100,m=50,s=10,k=20,N=100,num_workers=4,num=5))
+
+    # Solve the scenarios inexactly while the gap is large
+    print(test_inexact(n=100,m=50,s=10,k=20,N=100,num=5))
+
+    # Record the progress of the iterations
+    print(test_recorder(n=100,m=50,s=10,k=20,N=100,max_gap=0.1))
+
+    # Choose between the extensive form and the decomposition automatically
+    print(test_strategy(n=100,m=50,s=10,k=20,N_small=10,N_large=200))
+
+    # Warm-start consecutive solves with the cuts of the previous one
+    print(test_warm_start(n=100,m=50,s=10,k=20,N=50,num=10,num_changed=3))
+
+    # Stream the scenarios from disk
+    print(test_scenario_store(n=100,m=50,s=10,k=20,N=200,chunk_size=50,max_models=3))
+
+    # Reduce the number of scenarios before the decomposition
+    print(test_reduction(n=100,m=50,s=10,k=20,N=500,num_scenarios=50))
+
+    # Solve many instances in parallel worker processes
+    print(test_batch(n=100,m=50,s=10,k=20,N=50,num=20,num_workers=4))
+
+    # Report the instances which cannot be sent to the workers without losing the others
+    print(test_batch_errors(n=100,m=50,s=10,k=20,N=20,num=9,num_workers=3))
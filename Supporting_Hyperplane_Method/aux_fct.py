@@ -1,17 +1,25 @@
 """ 
-This file implements three auxiliary functions for the supporting hyperplane method implemented in main.py. 
+This file implements several auxiliary functions for the supporting hyperplane method implemented in main.py. 
 
     1. eval_nonlin_constr to evaluate the nonlinear constraints
     2. bisection to find a boundary point which is required in each iteration of the supporting hyperplane method
-    3. stopping_criterion to implement several stopping criteria for the supporting hyperplane method
+    3. ksection to find a boundary point by evaluating several points of the interval at once
+    4. boundary_point to find a boundary point with bisection or one of several root finding methods
+    5. cutting_planes to compute the cuts at one or several boundary points
+    6. stopping_criterion to implement several stopping criteria for the supporting hyperplane method
 """
 
 import numpy as np
+from scipy.optimize import brentq
+from constraints import as_constraints
 
 # Constants
 MAX_ITER = 10000
 TOL_OBJ_REL = 0.001
 TOL_BISEC = 0.001
+TOL_LAMDA = 0.0001      # maximal length of the final interval of lamda relative to x_out - x_int in the boundary search
+ROOT_FINDERS = ("bisection", "ksection", "newton", "secant", "illinois", "brent")
+SECTION_POINTS = 7
 
 
 def eval_nonlin_constr(nonlin_constr, x, type):
@@ -19,30 +27,48 @@ def eval_nonlin_constr(nonlin_constr, x, type):
     Provide access to function and gradient evaluations of the nonlinear constraints.
 
     Input:
-        nonlin_constr: Dictionary with one entry for each nonlinear constraint
+        nonlin_constr: Constraint object (see constraints.py) or dictionary with one entry for each nonlinear constraint
                        Each entry has the form {"constraint": [function, gradient]}. It provides
                        a method to evaluate the value of the constraint at a given point and
                        a method to evaluate the gradient of the constraint at a given point.
-        x : Point (numpy array) at which constraints or one particular gradient are evaluated 
+        x : Point (numpy array) or batch of points (rows of a numpy array) at which constraints or one particular 
+            gradient are evaluated 
         type: One of "feasible", "strictly_feasible", or "gradient"
     
     Output:
-        Boolean expression for "feasible" or "strictly_feasible"
-        Numpy array as a gradient evaluation at x for "gradient"
+        Boolean expression (for each point) for "feasible" or "strictly_feasible"
+        Numpy array as a gradient evaluation at x (for each point) for "gradient"
     """
+    constraints = as_constraints(nonlin_constr)
+    X = np.atleast_2d(x)
+
+    if type == "gradient":
+        # Find the constraint with the smallest function value (which will be 0) and return its gradient at x
+        gradients = constraints.values_and_gradients(X)[1]
+        return gradients if np.ndim(x) == 2 else gradients[0]
 
     # Evaluate all constraints at x
-    constr_fct_values = np.array([nonlin_constr[constr][0](x) for constr in nonlin_constr.keys()])
+    constr_fct_values = constraints.values(X)
 
     if type == "feasible":
-        return np.all(constr_fct_values >= 0)
+        feasible = np.all(constr_fct_values >= 0, axis=1)
     
     if type == "strictly_feasible":
-        return np.all(constr_fct_values > 0)
-    
-    if type == "gradient":
-        # Find the constraint with the smallest function value (which will be 0) and return its gradient at x
-        return nonlin_constr[list(nonlin_constr.keys())[np.argmin(constr_fct_values)]][1](x)    
+        feasible = np.all(constr_fct_values > 0, axis=1)
+
+    return feasible if np.ndim(x) == 2 else feasible[0]
+
+
+
+def lamda_tolerance(delta):
+    """ 
+    Return the length of the final interval of lamda in the boundary search along delta = x_out - x_int.
+
+    The distance of the boundary point to the boundary is at most TOL_BISEC and at most TOL_LAMDA times the length of 
+    delta. The latter ensures that the boundary point is close enough to x_out for the relative objective tolerance 
+    once x_out lies close to the boundary, even if delta is short.
+    """
+    return min(TOL_BISEC / np.linalg.norm(delta), TOL_LAMDA)
 
 
 
@@ -57,7 +83,7 @@ def bisection(x_int, x_out, nonlin_constr):
     Input:
         x_int: Strictly feasible point for the original problem 
         x_out: Relaxed solution that is infeasible for the original problem 
-        nonlin_constr: Dictionary for function and gradient evaluation of the nonlinear constraints
+        nonlin_constr: Constraint object or dictionary for function and gradient evaluation of the nonlinear constraints
 
     Output:
         A boundary point 
@@ -66,7 +92,7 @@ def bisection(x_int, x_out, nonlin_constr):
     lower = 0
     upper = 1
     delta = x_out - x_int
-    max_steps = -np.log2(TOL_BISEC / np.linalg.norm(delta))   
+    max_steps = -np.log2(lamda_tolerance(delta))
     
     for _ in range(int(max_steps)):
         lamda = (upper + lower) / 2
@@ -79,6 +105,198 @@ def bisection(x_int, x_out, nonlin_constr):
 
 
 
+def ksection(x_int, x_out, nonlin_constr, section_points=SECTION_POINTS, executor=None):
+    """ 
+    Execute a k-section search and return a boundary point.
+
+    Like bisection, but in each round the interval is divided into section_points + 1 parts of equal length and the 
+    constraints are evaluated at all section_points inner points at once. Since the feasible points on the line segment 
+    form an interval, the next interval lies between the last feasible and the first infeasible of these points, i.e. 
+    its length is divided by section_points + 1 in each round. Hence, log_{k+1} instead of log_2 rounds are needed.
+
+    Input:
+        x_int: Strictly feasible point for the original problem 
+        x_out: Relaxed solution that is infeasible for the original problem 
+        nonlin_constr: Constraint object or dictionary for function and gradient evaluation of the nonlinear constraints
+        section_points: Number k of points evaluated in each round
+        executor: Optional executor (e.g. concurrent.futures.ThreadPoolExecutor) which evaluates the points of a round 
+                  in parallel, one point per task, for constraints that cannot be evaluated in batches efficiently. 
+                  A ProcessPoolExecutor requires picklable constraints (e.g. no lambda functions).
+
+    Output:
+        A boundary point 
+    """
+    constraints = as_constraints(nonlin_constr)
+    lower = 0
+    upper = 1
+    delta = x_out - x_int
+    tol = lamda_tolerance(delta)
+
+    while upper - lower > tol:
+        lamdas = lower + (upper - lower) * np.arange(1, section_points + 1) / (section_points + 1)
+        X = x_int + lamdas[:,None] * delta
+        if executor is None:
+            values = constraints.values(X)
+        else:
+            values = constraints.map_values(executor, X)
+        feasible = np.all(values >= 0, axis=1)
+
+        # Number of feasible points before the first infeasible one
+        j = len(lamdas) if np.all(feasible) else np.argmin(feasible)
+        lower, upper = (lamdas[j-1] if j > 0 else lower), (lamdas[j] if j < len(lamdas) else upper)
+
+    return x_int + lower * delta
+
+
+
+def boundary_point(x_int, x_out, nonlin_constr, method="bisection", section_points=SECTION_POINTS, executor=None):
+    """ 
+    Compute a boundary point x_int + lamda * (x_out - x_int) by finding the root of 
+        phi(lamda) = min_i g_i(x_int + lamda * (x_out - x_int))
+    on [0,1] with one of the methods
+        bisection: Halve the interval in each step (see bisection)
+        ksection:  Divide the interval into section_points + 1 parts in each step (see ksection)
+        newton:    Newton's method using the gradient of the constraint attaining the minimum, i.e. phi'(lamda) 
+        secant:    Secant method through the two points evaluated last
+        illinois:  Regula falsi where the value of an endpoint which is kept twice in a row is halved
+        brent:     Brent's method (scipy.optimize.brentq)
+    All methods keep an interval [lower, upper] with phi(lower) >= 0 and phi(upper) < 0. As in Brent's method, a step 
+    leaving the interval or not shorter than half the step before the last one is replaced by a bisection step, and 
+    points are placed at least half the tolerance away from the endpoints. Hence, like bisection, the methods return a 
+    feasible point whose distance to the boundary along x_out - x_int is at most the tolerance of lamda_tolerance.
+
+    Input:
+        x_int: Strictly feasible point for the original problem 
+        x_out: Relaxed solution that is infeasible for the original problem 
+        nonlin_constr: Constraint object or dictionary for function and gradient evaluation of the nonlinear constraints
+        method: One of ROOT_FINDERS
+        section_points, executor: Parameters of the k-section search (see ksection)
+
+    Output:
+        A boundary point 
+    """
+    if method not in ROOT_FINDERS:
+        raise Exception(f"Unknown root finding method. Choose one of {ROOT_FINDERS}.")
+    if method == "bisection":
+        return bisection(x_int, x_out, nonlin_constr)
+    if method == "ksection":
+        return ksection(x_int, x_out, nonlin_constr, section_points, executor)
+
+    constraints = as_constraints(nonlin_constr)
+    x_out = np.asarray(x_out, dtype=np.float64)
+    delta = x_out - x_int
+    tol = lamda_tolerance(delta)
+    evaluated = {}
+
+    def phi(lamda):
+        """ Return phi(lamda) and phi'(lamda) (only for Newton's method), evaluating each lamda at most once. """
+        if lamda not in evaluated:
+            x = (x_int + lamda * delta)[None]
+            if method == "newton":
+                values, gradients = constraints.values_and_gradients(x)
+                evaluated[lamda] = (np.min(values), gradients[0]@delta)
+            else:
+                evaluated[lamda] = (np.min(constraints.values(x)), None)
+        return evaluated[lamda]
+
+    lower, upper = 0, 1
+    f_upper, d_upper = phi(upper)
+    if f_upper >= 0:
+        return x_out
+    f_lower = phi(lower)[0] if method != "newton" else None     # Newton's method does not need phi(0) > 0
+
+    if method == "brent":
+        # Record the tightest interval among all points evaluated by Brent's method
+        def phi_brent(lamda):
+            nonlocal lower, upper
+            value = phi(lamda)[0]
+            if value >= 0:
+                lower = max(lower, lamda)
+            else:
+                upper = min(upper, lamda)
+            return value
+        brentq(phi_brent, lower, upper, xtol=tol)
+        f_lower, f_upper = phi(lower)[0], phi(upper)[0]
+
+    last = [(upper, f_upper, d_upper)]      # points evaluated last (for Newton's and the secant method)
+    kept = None                             # endpoint kept in the last step (for the Illinois method)
+    steps = [np.inf, np.inf]                # lengths of the last steps
+    while upper - lower > tol:
+        # Proposed step of the method
+        point, value, derivative = last[-1]
+        if method == "newton" and derivative is not None and derivative < 0:
+            lamda = point - value / derivative
+        elif method == "secant" and len(last) > 1 and last[-2][1] != value:
+            lamda = point - value * (point - last[-2][0]) / (value - last[-2][1])
+        elif method in ("illinois", "brent"):
+            lamda = (lower * f_upper - upper * f_lower) / (f_upper - f_lower)
+        else:
+            lamda = (lower + upper) / 2
+
+        # Safeguards
+        if not lower < lamda < upper or np.abs(lamda - point) >= steps[-2] / 2:
+            lamda = (lower + upper) / 2
+        lamda = min(max(lamda, lower + tol / 2), upper - tol / 2)
+        steps.append(np.abs(lamda - point))
+
+        value, derivative = phi(lamda)
+        if value >= 0:
+            lower, f_lower = lamda, value
+            if kept == "upper" and method == "illinois":
+                f_upper /= 2
+            kept = "upper"
+        else:
+            upper, f_upper = lamda, value
+            if kept == "lower" and method == "illinois":
+                f_lower /= 2
+            kept = "lower"
+        last = last[-1:] + [(lamda, value, derivative)]
+
+    return x_int + lower * delta
+
+
+
+def cutting_planes(nonlin_constr, X_bd, active_tol=None, concave=False):
+    """ 
+    Compute the cutting planes gradient@x >= rhs at the boundary points X_bd.
+
+    At each boundary point, the cut of the constraint with the smallest value is the supporting hyperplane 
+    gradient@x >= gradient@x_bd of Veinott, which is valid for pseudoconcave constraints. If concave = True, its 
+    linearization gradient@(x - x_bd) >= -g_i(x_bd) is used instead. Since the boundary search only finds a point with 
+    g_i(x_bd) >= 0 close to the boundary, the linearization is a valid inequality for concave g_i, whereas the 
+    supporting hyperplane may cut off feasible points close to the boundary. If active_tol is given, a cut is added for 
+    every other constraint g_i with g_i(x_bd) <= active_tol, too. Since these constraints are not active, their 
+    linearization is used, which is a valid inequality if g_i is concave.
+
+    Input:
+        nonlin_constr: Constraint object or dictionary for function and gradient evaluation of the nonlinear constraints
+        X_bd: Boundary points (rows of a numpy array)
+        active_tol: Tolerance up to which constraints are considered as near-active (None for one cut per point)
+        concave: Whether the constraints are concave, such that their linearizations are used
+
+    Output:
+        Matrix whose rows are the gradients of the cuts and the vector of their right hand sides
+    """
+    constraints = as_constraints(nonlin_constr)
+    X_bd = np.atleast_2d(X_bd)
+    values, gradients = constraints.values_and_gradients(X_bd)
+    rhs = np.einsum("jn,jn->j", gradients, X_bd)
+    if concave:
+        rhs -= np.min(values, axis=1)
+
+    if active_tol is not None:
+        near_active = values <= active_tol
+        near_active[np.arange(len(X_bd)), np.argmin(values, axis=1)] = False
+        points, indices = np.nonzero(near_active)
+        if len(points) > 0:
+            active_gradients = constraints.gradients(X_bd[points], indices)
+            gradients = np.vstack((gradients, active_gradients))
+            rhs = np.concatenate((rhs, np.einsum("jn,jn->j", active_gradients, X_bd[points]) - values[points, indices]))
+
+    return gradients, rhs
+
+
+
 def stopping_criterion(iter, x_bd, x_out, c, reason=False):
     """ 
     If reason = False, test if one of the stopping criteria is met. 
@@ -87,7 +305,9 @@ def stopping_criterion(iter, x_bd, x_out, c, reason=False):
 
     gap = c@x_bd - c@x_out
     ground_truth = c@x_out
-    if np.abs(gap/ground_truth) <= TOL_OBJ_REL:
+    # A negative gap can occur if a cut at a boundary point with a positive constraint value cuts off better feasible 
+    # points, hence only its absolute value is tested
+    if np.abs(gap) <= TOL_OBJ_REL * np.abs(ground_truth):
         if reason == True:
             return "Relative objective tolerance reached"
         return True
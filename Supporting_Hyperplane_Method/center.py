@@ -0,0 +1,130 @@
+"""
+This file implements the choice of the interior point x_int of the supporting hyperplane method implemented in main.py.
+
+The cuts of the method are computed at the boundary points between x_int and the relaxed solutions. If x_int is close to
+the boundary of the feasible set (e.g. x_int = 0 with x >= 0), the cuts are shallow and many iterations are needed.
+Therefore, x_int can be moved to a deep interior point:
+    chebyshev: The Chebyshev center of the linear constraints Ax <= b, x >= 0 (the center of the largest ball inside, 
+               which is computed by a linear program) if it satisfies the nonlinear constraints strictly and otherwise 
+               the point halfway between x_int and the boundary in its direction
+    analytic:  An approximation of the analytic center, i.e. the maximizer of the logarithmic barrier
+                   sum_j log(b_j - A_j x) + sum_k log(x_k) + sum_i log(g_i(x)),
+               by damped Newton steps from the point above. As no second derivatives of the g_i are available, the
+               Hessian of the barrier is approximated by the sum of the outer products of the gradients of its terms.
+During the method, the interior point can be moved towards the best boundary point found so far (re-centering), such
+that the boundary points and hence the cuts concentrate around the optimal solution.
+"""
+
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+from aux_fct import eval_nonlin_constr, boundary_point
+from constraints import as_constraints
+
+# Constants
+CENTERS = ("chebyshev", "analytic")
+MAX_ITER_CENTER = 50
+TOL_CENTER = 1e-6
+MAX_BACKTRACKING = 30
+RECENTER_WEIGHT = 0.9   # weight of the best boundary point in the re-centered interior point
+
+
+def chebyshev_center(A, b, env):
+    """ Return the center and the radius of the largest ball in {x : Ax <= b, x >= 0}. """
+    model = gp.Model(env=env)
+    x = model.addMVar(shape=np.shape(A)[1])
+    r = model.addMVar(shape=1)
+    model.addConstr(A@x + np.linalg.norm(A, axis=1)[:,None]@r <= b)
+    model.addConstr(x - np.ones((len(x.tolist()), 1))@r >= 0)
+    model.setObjective(r.sum(), GRB.MAXIMIZE)
+    model.optimize()
+    if model.Status != GRB.OPTIMAL:
+        raise Exception("The Chebyshev center of the linear constraints could not be computed.")
+    center, radius = x.X, r.X[0]
+    model.dispose()
+
+    return center, radius
+
+
+def barrier(A, b, constraints, x):
+    """ Return the logarithmic barrier at x (-inf if x is not strictly feasible). """
+    slacks = np.concatenate((b - A@x, x, constraints.values(x[None])[0]))
+    return np.sum(np.log(slacks)) if np.all(slacks > 0) else -np.inf
+
+
+def analytic_center(A, b, nonlin_constr, x_start):
+    """
+    Approximate the analytic center of {x : Ax <= b, x >= 0, g_i(x) >= 0} by damped Newton steps.
+
+    Input:
+        A, b: Linear constraints Ax <= b
+        nonlin_constr: Constraint object or dictionary for function and gradient evaluation of the nonlinear constraints
+        x_start: Point strictly satisfying all constraints
+
+    Output:
+        Approximate analytic center
+    """
+    constraints = as_constraints(nonlin_constr)
+    x = np.asarray(x_start, dtype=np.float64)
+    value = barrier(A, b, constraints, x)
+    for _ in range(MAX_ITER_CENTER):
+        # Gradient and Gauss-Newton approximation of the negative Hessian of the barrier
+        slacks, values = b - A@x, constraints.values(x[None])[0]
+        gradients = constraints.gradients(np.repeat(x[None], constraints.num, axis=0), np.arange(constraints.num))
+        gradient = -A.T@(1 / slacks) + 1 / x + gradients.T@(1 / values)
+        hessian = (A.T * (1 / slacks**2))@A + np.diag(1 / x**2) + (gradients.T * (1 / values**2))@gradients
+        direction = np.linalg.solve(hessian, gradient)
+
+        # Stop if the Newton decrement is small
+        decrement = gradient@direction
+        if decrement / 2 <= TOL_CENTER:
+            break
+
+        # Backtracking line search keeping strict feasibility and ensuring sufficient increase
+        step = 1
+        for _ in range(MAX_BACKTRACKING):
+            new_value = barrier(A, b, constraints, x + step * direction)
+            if new_value >= value + step * decrement / 4:
+                break
+            step /= 2
+        else:
+            break
+        x, value = x + step * direction, new_value
+
+    return x
+
+
+def interior_point(A, b, nonlin_constr, x_int, center, env):
+    """
+    Move the strictly feasible point x_int to a deep interior point (see above).
+
+    Input:
+        A, b, nonlin_constr, x_int: As for supporting_hyperplane_method
+        center: One of CENTERS
+        env: Gurobi environment for the linear program of the Chebyshev center
+
+    Output:
+        The new interior point
+    """
+    if center not in CENTERS:
+        raise Exception(f"Unknown center. Choose one of {CENTERS}.")
+    chebyshev, radius = chebyshev_center(A, b, env)
+    if radius <= 0:
+        raise Exception("The linear constraints have no interior point.")
+
+    # The points between x_int and the Chebyshev center satisfy the linear constraints strictly
+    if eval_nonlin_constr(nonlin_constr, chebyshev, "strictly_feasible"):
+        x_center = chebyshev
+    else:
+        x_center = (x_int + boundary_point(x_int, chebyshev, nonlin_constr)) / 2
+    if center == "analytic":
+        x_center = analytic_center(A, b, nonlin_constr, x_center)
+
+    return x_center
+
+
+def recentered_point(x_center, x_best, nonlin_constr):
+    """ Return the point between x_center and x_best with weight RECENTER_WEIGHT for x_best if it is strictly feasible 
+    (and None otherwise). """
+    x_new = x_center + RECENTER_WEIGHT * (x_best - x_center)
+    return x_new if eval_nonlin_constr(nonlin_constr, x_new, "strictly_feasible") else None
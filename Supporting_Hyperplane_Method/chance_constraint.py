@@ -0,0 +1,134 @@
+"""
+This file implements the joint chance constraint
+    P(Tx >= xi) >= alpha
+with a normally distributed random vector xi ~ N(mu, Sigma) as constraint object (see constraints.py) for the
+supporting hyperplane method implemented in main.py. It is stated as the concave constraint
+    g(x) = log(F(Tx)) - log(alpha) >= 0,
+where F is the (log-concave) distribution function of xi. By the chain rule, the gradient is T^T * grad F(Tx) / F(Tx) with
+    dF/dz_i (z) = f_i(z_i) * F_i(z_{-i} | xi_i = z_i),
+where f_i is the density of xi_i and F_i the distribution function of the remaining components conditioned on xi_i = z_i.
+
+The distribution functions are computed by the quasi-Monte-Carlo method of Genz (separation of variables). For all
+points the same scrambled Sobol points are used (common random numbers), such that g is a deterministic and smooth
+function of x and the bisection is not disturbed by noise. The Cholesky factors of Sigma and of the conditional
+covariance matrices do not depend on x and are computed once. Values and gradients of recently evaluated points are
+memoized, since e.g. the boundary point is evaluated both in the boundary search and for its gradient.
+"""
+
+import numpy as np
+from scipy.special import ndtr, ndtri
+from scipy.stats import qmc
+from constraints import Constraints
+
+# Constants
+NUM_SAMPLES = 1024      # default number of quasi-Monte-Carlo points (rounded up to a power of 2)
+CACHE_SIZE = 1000       # maximal number of memoized points
+MIN_PROB = 1e-300       # probabilities are bounded from below to keep the logarithm finite
+
+
+def genz(b, L, U):
+    """
+    Estimate P(L@y <= b) for a standard normal random vector y by the method of Genz.
+
+    Input:
+        b: Upper limits for a batch of points (shape (number of points, d))
+        L: Lower triangular Cholesky factor of the covariance matrix (shape (d, d))
+        U: Quasi-Monte-Carlo points in [0,1]^(d-1) (shape (number of samples, at least d-1))
+
+    Output:
+        Estimated probability for each point
+    """
+    num, d = np.shape(b)
+    if d == 0:
+        return np.ones(num)
+    y = np.zeros((num, len(U), d))
+    e = np.repeat(ndtr(b[:,0] / L[0,0])[:,None], len(U), axis=1)
+    prob = e.copy()
+    for i in range(1, d):
+        y[:,:,i-1] = ndtri(np.clip(U[:,i-1] * e, MIN_PROB, 1 - np.finfo(float).eps))
+        e = ndtr((b[:,i,None] - y[:,:,:i]@L[i,:i]) / L[i,i])
+        prob *= e
+
+    return np.mean(prob, axis=1)
+
+
+
+class GaussianChanceConstraint(Constraints):
+    """ Joint chance constraint P(Tx >= xi) >= alpha with xi ~ N(mu, Sigma), stated as log(P(Tx >= xi)) - log(alpha) >= 0. """
+
+    num = 1
+
+    def __init__(self, T, mu, Sigma, alpha, num_samples=NUM_SAMPLES, seed=0):
+        self.T = np.atleast_2d(np.asarray(T, dtype=np.float64))
+        self.mu = np.asarray(mu, dtype=np.float64)
+        self.Sigma = np.atleast_2d(np.asarray(Sigma, dtype=np.float64))
+        self.alpha = alpha
+        self.seed = seed
+        m = len(self.mu)
+
+        # Cholesky factors of Sigma and of the covariance matrices conditioned on xi_i (independent of x)
+        self.std = np.sqrt(np.diag(self.Sigma))
+        self.L = np.linalg.cholesky(self.Sigma)
+        self.others, self.slopes, self.L_cond = [], [], []
+        for i in range(m):
+            others = np.delete(np.arange(m), i)
+            slope = self.Sigma[others,i] / self.Sigma[i,i]
+            self.others.append(others)
+            self.slopes.append(slope)
+            self.L_cond.append(np.linalg.cholesky(self.Sigma[np.ix_(others,others)] - np.outer(slope, self.Sigma[i,others])))
+
+        self.set_accuracy(num_samples)
+
+
+    def set_accuracy(self, num_samples):
+        """
+        Use num_samples (rounded up to a power of 2) quasi-Monte-Carlo points from now on, e.g. few points in early
+        iterations and more points close to the optimum. The point sets are nested, i.e. more points refine the estimate.
+        """
+        exponent = int(np.ceil(np.log2(max(num_samples, 1))))
+        dimension = max(len(self.mu) - 1, 1)
+        self.U = qmc.Sobol(d=dimension, scramble=True, seed=self.seed).random_base2(exponent)
+        self.num_samples = len(self.U)
+        self.cache = {}
+
+
+    def probabilities(self, X):
+        """ Return the estimated probabilities P(TX[j] >= xi). """
+        return genz(X@self.T.T - self.mu, self.L, self.U)
+
+
+    def values(self, X):
+        missing = [j for j, x in enumerate(X) if x.tobytes() not in self.cache]
+        if missing:
+            self._store(X[missing], np.log(np.maximum(self.probabilities(X[missing]), MIN_PROB)) - np.log(self.alpha))
+        return np.array([self.cache[x.tobytes()][0] for x in X]).reshape(len(X), 1)
+
+
+    def gradients(self, X, indices):
+        return self.values_and_gradients(X)[1]
+
+
+    def values_and_gradients(self, X):
+        missing = [j for j, x in enumerate(X) if self.cache.get(x.tobytes(), (None, None))[1] is None]
+        if missing:
+            # The value and all partial derivatives share the upper limits z = Tx - mu
+            Z = X[missing]@self.T.T - self.mu
+            prob = np.maximum(genz(Z, self.L, self.U), MIN_PROB)
+            derivatives = np.zeros_like(Z)
+            for i in range(len(self.mu)):
+                density = np.exp(-(Z[:,i] / self.std[i])**2 / 2) / (np.sqrt(2 * np.pi) * self.std[i])
+                conditional = Z[:,self.others[i]] - np.outer(Z[:,i], self.slopes[i])
+                derivatives[:,i] = density * genz(conditional, self.L_cond[i], self.U)
+            self._store(X[missing], np.log(prob) - np.log(self.alpha), (derivatives / prob[:,None])@self.T)
+
+        values = np.array([self.cache[x.tobytes()][0] for x in X]).reshape(len(X), 1)
+        return values, np.array([self.cache[x.tobytes()][1] for x in X])
+
+
+    def _store(self, X, values, gradients=None):
+        """ Memoize the values (and gradients) at the points X, forgetting the oldest points if the cache is full. """
+        for j, x in enumerate(X):
+            self.cache.pop(x.tobytes(), None)
+            self.cache[x.tobytes()] = (values[j], None if gradients is None else gradients[j])
+        while len(self.cache) > CACHE_SIZE:
+            del self.cache[next(iter(self.cache))]
@@ -0,0 +1,150 @@
+"""
+This file implements the interface of the nonlinear constraints g_i(x) >= 0, i = 1,...,l of the supporting hyperplane
+method implemented in main.py.
+
+A constraint object evaluates all l constraints for a batch of points at once:
+    1. values(X) returns the matrix of the values g_i(X[j]) of shape (number of points, l)
+    2. gradients(X, indices) returns the gradients of the constraints indices[j] at the points X[j]
+    3. values_and_gradients(X) returns the values and the gradients of the constraint with the smallest value at each
+       point, which may share work between both evaluations
+    4. map_values(executor, X) returns the values with one task of the executor per point (used by the k-section 
+       search with an executor)
+The dictionary form {"constraint": [function, gradient]} of single-point callables is adapted automatically.
+"""
+
+import numpy as np
+from abc import ABC, abstractmethod
+
+
+class Constraints(ABC):
+    """ Abstract base class of the nonlinear constraints. Subclasses implement values and gradients. """
+
+    num = 0     # number of constraints l
+
+    @abstractmethod
+    def values(self, X):
+        """ Return the values g_i(X[j]) as matrix of shape (number of points, l). """
+
+
+    @abstractmethod
+    def gradients(self, X, indices):
+        """ Return the gradients of the constraints indices[j] at the points X[j]. """
+
+
+    def values_and_gradients(self, X):
+        values = self.values(X)
+        return values, self.gradients(X, np.argmin(values, axis=1))
+
+
+    def map_values(self, executor, X):
+        """ Evaluate the values at the points X with one task of the executor per point. """
+        return np.vstack(list(executor.map(self.values, np.split(X, len(X)))))
+
+
+
+class DictConstraints(Constraints):
+    """ Constraints given as dictionary {"constraint": [function, gradient]} of callables for a single point. """
+
+    def __init__(self, nonlin_constr):
+        self.functions = [nonlin_constr[constr][0] for constr in nonlin_constr.keys()]
+        self.gradient_functions = [nonlin_constr[constr][1] for constr in nonlin_constr.keys()]
+        self.num = len(self.functions)
+
+
+    def values(self, X):
+        return np.array([[function(x) for function in self.functions] for x in X], dtype=np.float64).reshape(len(X), self.num)
+
+
+    def gradients(self, X, indices):
+        return np.array([self.gradient_functions[i](x) for x, i in zip(X, indices)], dtype=np.float64)
+
+
+
+class QuadraticConstraints(Constraints):
+    """
+    Stacked quadratic constraints x@D[i]@x + e[i]@x + f[i] >= 0, i = 1,...,l, which are evaluated for all constraints
+    and points with one tensor operation. The constraints are concave if all D[i] are negative semidefinite.
+    """
+
+    def __init__(self, D, e, f):
+        D = np.asarray(D, dtype=np.float64).reshape(-1, np.shape(D)[-2], np.shape(D)[-1])
+        self.D = (D + D.transpose(0, 2, 1)) / 2         # only the symmetric part of D[i] matters
+        self.e = np.asarray(e, dtype=np.float64).reshape(len(self.D), -1)
+        self.f = np.asarray(f, dtype=np.float64).reshape(len(self.D))
+        self.num = len(self.D)
+
+
+    def values(self, X):
+        return self._values(X, self._products(X))
+
+
+    def gradients(self, X, indices):
+        return 2 * np.einsum("jnm,jm->jn", self.D[indices], X) + self.e[indices]
+
+
+    def values_and_gradients(self, X):
+        products = self._products(X)
+        values = self._values(X, products)
+        indices = np.argmin(values, axis=1)
+        return values, 2 * products[np.arange(len(X)), indices] + self.e[indices]
+
+
+    def _products(self, X):
+        """ Return the products D[i]@X[j] of shape (number of points, l, n). """
+        return np.einsum("inm,jm->jin", self.D, X)
+
+
+    def _values(self, X, products):
+        return np.einsum("jin,jn->ji", products, X) + X@self.e.T + self.f
+
+
+
+class EvaluationCounter(Constraints):
+    """
+    Wrapper of a constraint object counting the points at which the constraints and gradients are evaluated as well 
+    as the number of (batched) evaluations of the values. A batch evaluated by an executor counts as one evaluation.
+    """
+
+    def __init__(self, constraints):
+        self.constraints = constraints
+        self.num = constraints.num
+        self.calls = 0
+        self.evaluations = 0
+        self.gradient_evaluations = 0
+
+
+    def values(self, X):
+        self.calls += 1
+        self.evaluations += len(X)
+        return self.constraints.values(X)
+
+
+    def gradients(self, X, indices):
+        self.gradient_evaluations += len(X)
+        return self.constraints.gradients(X, indices)
+
+
+    def values_and_gradients(self, X):
+        self.calls += 1
+        self.evaluations += len(X)
+        self.gradient_evaluations += len(X)
+        return self.constraints.values_and_gradients(X)
+
+
+    def map_values(self, executor, X):
+        self.calls += 1
+        self.evaluations += len(X)
+        return self.constraints.map_values(executor, X)
+
+
+    def counts(self):
+        """ Return the numbers of calls, evaluations and gradient evaluations so far. """
+        return np.array([self.calls, self.evaluations, self.gradient_evaluations])
+
+
+
+def as_constraints(nonlin_constr):
+    """ Return nonlin_constr as constraint object (adapting the dictionary form if necessary). """
+    if isinstance(nonlin_constr, Constraints):
+        return nonlin_constr
+    return DictConstraints(nonlin_constr)
@@ -0,0 +1,148 @@
+"""
+This file implements the management of the cutting planes of the supporting hyperplane method implemented in main.py.
+
+Every cut has the form  G_j x >= r_j. The pool stores all cuts generated so far together with their age, i.e. the number
+of consecutive iterations in which they were not active at the relaxed solution. Cuts are removed from the relaxation if
+    - they are dominated by a new cut, i.e. the normalized gradients coincide and the new cut is tighter,
+    - they are inactive for more than max_age iterations,
+    - the relaxation has more than max_cuts cuts (then the inactive cuts with the largest age are removed first).
+Removed cuts (except for dominated ones) stay in the pool and are added again as soon as they are violated by a relaxed
+solution, such that the final relaxation is as tight as the one with all cuts.
+
+The coefficients are stored in a preallocated array whose capacity is doubled when it is full. Whether each cut is in
+the relaxation is tracked in a boolean array together with the number of such cuts, such that adding cuts and finding
+the removed ones does not scan the whole pool.
+"""
+
+import numpy as np
+
+# Constants
+TOL_SLACK = 1e-6        # tolerance to decide whether a cut is active or violated (relative to its right-hand side)
+TOL_PARALLEL = 1e-9     # tolerance to decide whether the normalized gradients of two cuts coincide
+CAPACITY = 64           # initial number of cuts the pool has space for
+
+
+class CutPool:
+    """ Pool of all cuts of the relaxation with the variables x. """
+
+    def __init__(self, model, x, max_age=None, max_cuts=None):
+        self.model = model
+        self.x = x
+        self.max_age = max_age      # None means that cuts are never removed due to their age
+        self.max_cuts = max_cuts    # None means that the number of cuts is not bounded
+
+        self.G = np.zeros((CAPACITY, x.shape[0]))      # coefficients of x
+        self.rhs = np.zeros(CAPACITY)
+        self.ages = np.zeros(CAPACITY, dtype=int)
+        self.iters = np.zeros(CAPACITY, dtype=int)      # iteration in which each cut was generated
+        self.dominated = np.zeros(CAPACITY, dtype=bool)
+        self.present = np.zeros(CAPACITY, dtype=bool)   # whether the cut is in the relaxation
+        self.constrs = []                               # constraint in the relaxation (None if removed)
+        self.count = 0
+        self.num_present = 0                            # number of cuts in the relaxation
+
+        # Statistics for each iteration
+        self.active = []            # number of cuts in the relaxation
+        self.removed = []           # number of removed cuts
+
+
+    def add(self, G, rhs, iter=0):
+        """ Add the cuts G x >= rhs to the pool and the relaxation, remove the cuts dominated by them and return their indices. """
+        G, rhs = np.atleast_2d(G), np.atleast_1d(rhs)
+        while self.count + len(rhs) > len(self.rhs):
+            self.G = np.vstack((self.G, np.zeros_like(self.G)))
+            self.rhs, self.ages, self.iters, self.dominated, self.present = (
+                np.concatenate((array, np.zeros_like(array))) 
+                for array in (self.rhs, self.ages, self.iters, self.dominated, self.present))
+        ids = np.arange(self.count, self.count + len(rhs))
+        self.G[ids], self.rhs[ids], self.ages[ids], self.iters[ids] = G, rhs, 0, iter
+        self.constrs += [None] * len(rhs)
+        self.count += len(rhs)
+
+        # A cut with the same normalized gradient but a smaller normalized right-hand side is dominated
+        if self.num_present > 0:
+            norms = np.linalg.norm(self.G[:self.count], axis=1)
+            old = np.flatnonzero(self.present[:self.count])
+            parallel = (G / norms[ids,None])@(self.G[old] / norms[old,None]).T >= 1 - TOL_PARALLEL
+            new_rhs, old_rhs = rhs / norms[ids], self.rhs[old] / norms[old]
+            dominated = old[np.any(parallel & (old_rhs[None,:] <= new_rhs[:,None]), axis=0)]
+            self._remove(dominated)
+            self.dominated[dominated] = True
+        self._insert(ids)
+
+        return ids
+
+
+    def slacks(self, x_value):
+        """ Compute G x - rhs for all cuts with one matrix-vector product. """
+        return self.G[:self.count]@x_value - self.rhs[:self.count]
+
+
+    def add_violated(self, x_value):
+        """ Add removed cuts which are violated by x_value back to the relaxation. Return whether any cut was added. """
+        removed = ~self.present[:self.count] & ~self.dominated[:self.count]
+        if not np.any(removed):
+            return False
+        violated = removed & (self.slacks(x_value) < -TOL_SLACK * (1 + np.abs(self.rhs[:self.count])))
+        self._insert(np.flatnonzero(violated))
+
+        return bool(np.any(violated))
+
+
+    def update(self, x_value):
+        """ Age the cuts at the relaxed solution x_value, remove the old ones and record statistics. """
+        if self.max_age is not None or self.max_cuts is not None:
+            present = self.present[:self.count].copy()
+            inactive = self.slacks(x_value) > TOL_SLACK * (1 + np.abs(self.rhs[:self.count]))
+            self.ages[:self.count] = np.where(inactive, self.ages[:self.count] + 1, 0)
+            old = present & (self.ages[:self.count] > self.max_age) if self.max_age is not None else np.zeros_like(present)
+            self._remove(np.flatnonzero(old))
+
+            # Remove the inactive cuts with the largest age (and the oldest ones among them) if there are too many cuts
+            excess = self.num_present - self.max_cuts if self.max_cuts is not None else 0
+            if excess > 0:
+                candidates = np.flatnonzero(present & ~old & inactive)
+                order = np.lexsort((candidates, -self.ages[candidates]))
+                self._remove(candidates[order[:excess]])
+
+        self.active.append(self.num_present)
+        self.removed.append(self.count - self.num_present)
+
+
+    def statistics(self):
+        """ Return the number of active and removed cuts of each iteration. """
+        return {"active": np.array(self.active), "removed": np.array(self.removed)}
+
+
+    def cuts(self):
+        """ 
+        Return the coefficients, right-hand sides, indices and generating iterations of the cuts in the relaxation (in 
+        the order of the constraints of the model). 
+        """
+        self.model.update()
+        ids = np.flatnonzero(self.present[:self.count])
+        ids = ids[np.argsort([self.constrs[id].index for id in ids])].astype(int)
+        return {"G": self.G[ids], "rhs": self.rhs[ids], "ids": ids, "iters": self.iters[ids]}
+
+
+    def _remove(self, ids):
+        """ Remove the cuts with the given indices from the relaxation. """
+        if len(ids) == 0:
+            return
+        self.model.remove([self.constrs[id] for id in ids])
+        for id in ids:
+            self.constrs[id] = None
+        self.present[ids] = False
+        self.num_present -= len(ids)
+
+
+    def _insert(self, ids):
+        """ Add the cuts with the given indices to the relaxation. """
+        if len(ids) == 0:
+            return
+        constrs = self.model.addConstr(self.G[ids]@self.x >= self.rhs[ids])
+        for id, constr in zip(ids, constrs.tolist()):
+            self.constrs[id] = constr
+        self.ages[ids] = 0
+        self.present[ids] = True
+        self.num_present += len(ids)
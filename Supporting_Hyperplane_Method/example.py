@@ -8,14 +8,15 @@ subject to    x <= 6
               (x-3)^2  +  (y-2)^2  <= 2
               0.2*(x-3)^2  +  (y-2)^2  <= 1 
 
-Moreover, the result is also visualized. 
+Moreover, the result and the convergence of the method are also visualized. 
 Note that in order for the plot to work the nonlinear constraints must not be changed. However, the linear constraints and the 
 objective function can be modified to visually explore the effect of a different cost vector or different linear constraints.
 """
 
 import numpy as np
 from main import supporting_hyperplane_method
-from plot import plot_supporting_hyperplane_method
+from recorder import IterationRecorder
+from plot import plot_supporting_hyperplane_method, plot_convergence
 
 
 # Linear constraints are given as simple box constraints
@@ -41,16 +42,18 @@ nonlin_constr = {"circle": [fct_circle, gradient_circle], "ellipse": [fct_ellips
 # Strictly feasible point
 x_int = np.array([3,2])
 
-# Solve the problem
-result = supporting_hyperplane_method(A,b,c,nonlin_constr,x_int)
+# Solve the problem and record each iteration
+recorder = IterationRecorder()
+result = supporting_hyperplane_method(A,b,c,nonlin_constr,x_int,callback=recorder)
 
 # Print the results
 print("Optimal solution: ", result["x_opt"])
 print("Relative optimality gap: ", result["gap"])
 print("Number of performed iterations: ", result["iter"])
 print("Reason for termination: ", result["termination_reason"])
+print("Constraint evaluations: ", result["evaluations"])
+print("Wall time of linear programs and oracle: ", result["phase_times"])
 
 # Plot the results
 plot_supporting_hyperplane_method(result["x_opt"],  x_int, result["A"], result["b"], np.shape(A)[0])
-
-
+plot_convergence(recorder.traces())
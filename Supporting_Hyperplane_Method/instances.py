@@ -0,0 +1,37 @@
+"""
+This file builds randomized problems with concave quadratic constraints (see supporting_hyperplane_method in main.py)
+which are used by tests.py.
+"""
+
+import numpy as np
+
+
+def build_quadratic_constraints(n,l):
+    """ Build l random concave quadratic constraints x@D[i]@x + e[i]@x + f[i] >= 0 which are strictly satisfied at 0. """
+    D_ = np.random.randint(-5,5,(l,np.random.randint(5,20),n))
+    D = -np.einsum("lkn,lkm->lnm",D_,D_)        # -D_^T@D_ is always a negative semidefinite matrix
+    e = np.random.randint(-5,5,(l,n))
+    f = np.random.randint(1,5,l)
+    return D, e, f
+
+
+def build_instance(l,n_min=10,n_max=30):
+    """
+    Build a randomized problem
+        minimize    c*x
+        subject to  Ax <= b
+                    x >= 0
+                    x@D[i]@x + e[i]@x + f[i] >= 0 , i = 1,...,l
+    with n_min <= n < n_max variables and 5 <= m < n linear constraints. Since b >= 0 and f > 0, x = 0 is strictly
+    feasible.
+
+    Output:
+        A, b, c, D, e, f
+    """
+    n = np.random.randint(n_min,n_max)
+    m = np.random.randint(5,n)
+    A = np.random.randint(1,10,(m,n))
+    b = np.random.randint(5*n,50*n,m)
+    c = np.random.randint(-5,5,n)
+    D, e, f = build_quadratic_constraints(n,l)
+    return A, b, c, D, e, f
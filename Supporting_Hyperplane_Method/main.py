@@ -4,12 +4,22 @@ Linear programs are solved with Gurobi.
 """
 
 import numpy as np 
+import time
 import gurobipy as gp
 from gurobipy import GRB 
-from aux_fct import eval_nonlin_constr, bisection, stopping_criterion
+from aux_fct import eval_nonlin_constr, boundary_point, cutting_planes, stopping_criterion, SECTION_POINTS
+from constraints import as_constraints, EvaluationCounter
+from cut_pool import CutPool, TOL_SLACK
+from center import interior_point, recentered_point
 
+# Constants
+EXPORTS = ("dense", "sparse", "cuts")
 
-def supporting_hyperplane_method(A, b, c, nonlin_constr, x_int):
+
+def supporting_hyperplane_method(A, b, c, nonlin_constr, x_int, boundary_search="bisection", section_points=SECTION_POINTS, 
+                                 executor=None, active_tol=None, interior_points=None, max_cut_age=None, max_cuts=None, 
+                                 export="dense", center=None, recenter=None, env=None, cuts=None, basis=None, callback=None, 
+                                 concave=False):
     """ Execute the supporting hyperplane method of Veinott. 
 
     Solve the following convex optimization problem:
@@ -19,77 +29,317 @@ def supporting_hyperplane_method(A, b, c, nonlin_constr, x_int):
                     g_i(x) >= 0 , i = 1,...,l
 
     The method starts with only the linear constraints and then sequentially adds linear inequalities (a.k.a. cutting planes).
+    Optionally, several cuts are added before the relaxation is solved again: cuts of all near-active constraints and cuts 
+    at the boundary points between further interior points and the relaxed solution.
+    The cuts are managed by a pool which can remove dominated, old and superfluous cuts from the relaxation and adds them 
+    again as soon as they are violated (see cut_pool.py).
+    The cuts only depend on the nonlinear constraints and stay valid for any c and b. Hence, the cuts of a previous solve 
+    (and the basis of its final relaxation) can be passed to start from a tighter relaxation. To solve several problems 
+    that only differ in c or b, use SupportingHyperplaneSolver directly.
+    After each iteration, callback (if given) is called with a dictionary containing the iteration, the bound c*x of 
+    the relaxed solution, the best feasible value, their relative gap, the number of cuts in the relaxation, the number 
+    of points at which the constraints and gradients were evaluated, the number of (batched) constraint evaluations in 
+    the boundary searches (e.g. bisection steps) as well as the wall times of the linear programs (including the cut 
+    pool) and of the oracle (boundary searches and gradients) in this iteration. If it returns True, the method stops. 
+    The IterationRecorder from recorder.py stores this information for all iterations.
 
     Input:
         A: Technology matrix 
         b: Right hand side vector 
         c: Objective vector 
-        nonlin_fct: Dictionary for function and gradient evaluation of the nonlinear constraints
-                    which are assumed to be pseudoconcave differentiable functions
+        nonlin_constr: Constraint object (see constraints.py) or dictionary for function and gradient evaluation of the 
+                       nonlinear constraints which are assumed to be pseudoconcave differentiable functions
         x_int: A feasible point satisfying g_i(x_int) > 0 for i = 1,...,l 
+        boundary_search: Method to find the boundary points, one of "bisection", "ksection", "newton", "secant", 
+                         "illinois" and "brent" (see boundary_point in aux_fct.py)
+        section_points: Number of points evaluated at once in each round of the k-section search
+        executor: Optional executor evaluating the points of a round of the k-section search in parallel
+        active_tol: If given, cuts are added for all constraints g_i with g_i(x_bd) <= active_tol at a boundary point 
+                    x_bd (which requires concave constraints, see cutting_planes in aux_fct.py)
+        interior_points: Further strictly feasible points (rows of a numpy array) from which boundary points are 
+                         searched in each iteration in addition to x_int
+        max_cut_age: Number of consecutive iterations after which an inactive cut is removed (None to keep all cuts)
+        max_cuts: Maximal number of (inactive) cuts kept in the relaxation (None for no bound)
+        export: Form of the final relaxation in the result, one of
+                    "dense": Constraint matrix A as dense numpy array
+                    "sparse": Constraint matrix A as scipy.sparse matrix
+                    "cuts": Original A and b together with the cuts of the final relaxation
+        center: None to use x_int or one of "chebyshev" and "analytic" to move x_int to a deep interior point first 
+                (see center.py)
+        recenter: If given, the interior point is moved from x_int (after centering) towards the best boundary point 
+                  every recenter iterations (see recentered_point in center.py)
+        env: Gurobi environment for the relaxation (optional, it is not disposed such that it can be reused for 
+             several problems)
+        cuts: Dictionary with the coefficients G and right-hand sides rhs of cuts G x >= rhs of a previous solve 
+              (e.g. result["cuts"] for export = "cuts"), which are added to the initial relaxation (optional)
+        basis: Basis of the final relaxation of the previous solve which generated cuts (result["basis"], optional)
+        callback: Function called after each iteration (optional)
+        concave: If True, the constraints are declared to be concave and the cuts are their linearizations instead of 
+                 the supporting hyperplanes, such that no feasible point is cut off and the gap bounds the distance to 
+                 the optimal value (see cutting_planes in aux_fct.py)
 
     Output:
         Dictionary containing the following entries:
             x_opt: (Approximately) optimal solution 
-            A: Technology matrix of the final relaxation 
-            b: Right-hand side of the final relaxation 
+            A: Technology matrix of the final relaxation (of the original problem for export = "cuts")
+            b: Right-hand side of the final relaxation (of the original problem for export = "cuts")
+            cuts: Dictionary with the coefficients G, right-hand sides rhs, indices in the pool ids and generating 
+                  iterations iters of the cuts G x >= rhs of the final relaxation (only for export = "cuts")
             gap: Relative optimality gap between best boundary point and relaxed vertex solution
             iter: Number of iterations
             termination_reason: Reason for termination of the method
+            cut_pool: Number of cuts in the relaxation and of removed cuts in each iteration
+            x_int: Interior point used in the last iteration
+            basis: Basis of the final relaxation as dictionary with the lists VBasis and CBasis (see Gurobi)
+            evaluations: Total number of points at which the constraints and gradients were evaluated and of 
+                         (batched) constraint evaluations in the boundary searches
+            phase_times: Total wall time of the linear programs and of the oracle
 
     Exceptions:
-        1. x_int does not satisfy the requirements
+        1. x_int or one of the interior points does not satisfy the requirements
         2. The initial relaxation turns out to be unbounded
     """
 
-    # Check whether x_int is strictly feasible (and hence ensure feasibility of the original problem)
-    if not np.all(A@x_int <= b) or not np.all(x_int >= 0) or not eval_nonlin_constr(nonlin_constr, x_int, "strictly_feasible"):
-        raise Exception("x_int is not strictly feasible")
-        
-    # Build and optimize the relaxed model
-    env = gp.Env(empty=True)
-    env.setParam("OutputFlag",0)    # suppress any Gurobi console output
-    env.start()
-    model = gp.Model(env=env)
-    model.Params.DualReductions = 0
-    x = model.addMVar(shape = len(c))      
-    model.addConstr(A@x <= b)       # x >= 0 is set by default
-    model.setObjective(c@x, GRB.MINIMIZE)
-    model.optimize()
-
-    # Ensure solvability of the initial relaxation (and hence boundedness of the original problem)
-    if model.Status == 5:
-        raise Exception("Initial polyhedral relaxation is unbounded. Please ensure a bounded initial relaxation.")
-
-    # Get relaxed solution and corresponding boundary point
-    x_out = model.getAttr("X", model.getVars())
-    x_bd = bisection(x_int, x_out, nonlin_constr)
-
-    # x_best is the feasible solution with the smallest objective value found so far
-    x_best = x_bd
-
-    iter = 0
-    while not stopping_criterion(iter, x_best, x_out, c):
-        # Add constraint and solve refined relaxation
-        gradient = eval_nonlin_constr(nonlin_constr, x_bd, "gradient")
-        model.addConstr(gradient@x >= gradient@x_bd)
+    solver = SupportingHyperplaneSolver(A, b, c, nonlin_constr, x_int, boundary_search, section_points, executor, 
+                                        active_tol, interior_points, max_cut_age, max_cuts, export, center, recenter, env, 
+                                        cuts, basis, callback, concave)
+    try:
+        return solver.solve()
+    finally:
+        solver.close()
+
+
+class SupportingHyperplaneSolver:
+    """ 
+    Persistent supporting hyperplane method (see supporting_hyperplane_method).
+
+    The relaxation is built once. Subsequent calls of solve only update the objective c or the right-hand side b of the 
+    linear constraints and keep all cuts and the basis of the relaxation as warm start. The cuts can be exported and 
+    used to warm-start a solver for a related problem.
+    """
+
+    def __init__(self, A, b, c, nonlin_constr, x_int, boundary_search="bisection", section_points=SECTION_POINTS, 
+                 executor=None, active_tol=None, interior_points=None, max_cut_age=None, max_cuts=None, export="dense", 
+                 center=None, recenter=None, env=None, cuts=None, basis=None, callback=None, concave=False):
+        """ Build the relaxation. The input is the same as for supporting_hyperplane_method. """
+        if export not in EXPORTS:
+            raise Exception(f"Unknown export. Choose one of {EXPORTS}.")
+        self.A = np.asarray(A)
+        self.b = np.asarray(b, dtype=np.float64)
+        self.c = np.asarray(c, dtype=np.float64)
+        self.boundary_search, self.section_points, self.executor = boundary_search, section_points, executor
+        self.active_tol, self.export, self.center, self.recenter = active_tol, export, center, recenter
+        self.callback, self.concave = callback, concave
+
+        # Evaluate the constraints for batches of points (adapting the dictionary form if necessary) and count the 
+        # evaluations
+        self.nonlin_constr = EvaluationCounter(as_constraints(nonlin_constr))
+        self.x_given = np.asarray(x_int, dtype=np.float64)
+        self.interior_points = np.empty((0, len(c))) if interior_points is None else np.atleast_2d(interior_points)
+        self._check_interior_points()
+
+        # Build the relaxed model
+        self.own_env = env is None
+        if self.own_env:
+            env = gp.Env(empty=True)
+            env.setParam("OutputFlag",0)    # suppress any Gurobi console output
+            env.start()
+        self.env = env
+        self._set_interior_point()
+        self.model = gp.Model(env=env)
+        self.model.Params.DualReductions = 0
+        self.x = self.model.addMVar(shape = len(c))      
+        self.linear = self.model.addConstr(self.A@self.x <= self.b)       # x >= 0 is set by default
+        self.model.setObjective(self.c@self.x, GRB.MINIMIZE)
+        self.pool = CutPool(self.model, self.x, max_cut_age, max_cuts)
+
+        if cuts is not None:
+            self.add_cuts(cuts)
+        if basis is not None:
+            self.set_basis(basis)
+
+
+    def solve(self, b=None, c=None):
+        """ 
+        Solve the problem after optionally replacing the right-hand side b of the linear constraints or the objective c.
+
+        Output:
+            The same dictionary as for supporting_hyperplane_method (with the statistics of the cut pool of this solve)
+        """
+        if b is not None:
+            self.b = np.asarray(b, dtype=np.float64)
+            self.linear.setAttr("RHS", self.b)
+            self._check_interior_points()
+            self._set_interior_point()
+        if c is not None:
+            self.c = np.asarray(c, dtype=np.float64)
+            self.x.Obj = self.c
+
+        model, pool, nonlin_constr, c = self.model, self.pool, self.nonlin_constr, self.c
+        x_int = self.x_int
+        first_statistic = len(pool.active)
+        first_counts = nonlin_constr.counts()
+        phase_times = {"lp": 0, "oracle": 0}
+        search_steps = 0
+
+        # Optimize the relaxed model (warm-started from the previous solve)
+        start = time.perf_counter()
         model.optimize()
-        
+        phase_times["lp"] += time.perf_counter() - start
+
+        # Ensure solvability of the initial relaxation (and hence boundedness of the original problem)
+        if model.Status == 5:
+            raise Exception("Initial polyhedral relaxation is unbounded. Please ensure a bounded initial relaxation.")
+
         # Get relaxed solution and corresponding boundary point
-        x_out = model.getAttr("X", model.getVars())
-        x_bd = bisection(x_int, x_out, nonlin_constr)
+        x_out = np.array(model.getAttr("X", model.getVars()))
+        start, calls = time.perf_counter(), nonlin_constr.calls
+        X_bd = self._boundary_points(x_int, x_out)
+        phase_times["oracle"] += time.perf_counter() - start
+        search_steps += nonlin_constr.calls - calls
+
+        # x_best is the feasible solution with the smallest objective value found so far
+        x_best = min(X_bd, key=lambda x_i: c@x_i)
+
+        # The method stops by the stopping criterion or the callback
+        def terminated(reason=False):
+            if stopped:
+                return "Stopped by callback" if reason else True
+            return stopping_criterion(iter, x_best, x_out, c, reason)
+
+        stopped = False
+        iter = 0
+        while not terminated():
+            counts = nonlin_constr.counts()
+
+            # Move the interior point towards the best boundary point
+            start = time.perf_counter()
+            if self.recenter is not None and iter > 0 and iter % self.recenter == 0:
+                x_new = recentered_point(self.x_int, np.asarray(x_best), nonlin_constr)
+                if x_new is not None:
+                    x_int = x_new
+
+            # Compute the cuts. If no linearization cuts off x_out (since the boundary points only lie close to the 
+            # boundary), the linearization at x_out is added as in Kelley's cutting plane method.
+            gradients, rhs = cutting_planes(nonlin_constr, np.array(X_bd), self.active_tol, self.concave)
+            if self.concave and np.all(gradients@x_out - rhs > -TOL_SLACK * (1 + np.abs(rhs))):
+                gradients_out, rhs_out = cutting_planes(nonlin_constr, x_out, concave=True)
+                gradients, rhs = np.vstack((gradients, gradients_out)), np.concatenate((rhs, rhs_out))
+            time_oracle = time.perf_counter() - start
+
+            # Add the cuts and solve refined relaxation
+            start = time.perf_counter()
+            pool.add(gradients, rhs, iter)
+            model.optimize()
+            x_out = np.array(model.getAttr("X", model.getVars()))
+
+            # Add removed cuts violated by the relaxed solution again and remove old cuts
+            while pool.add_violated(x_out):
+                model.optimize()
+                x_out = np.array(model.getAttr("X", model.getVars()))
+            pool.update(x_out)
+            time_lp = time.perf_counter() - start
+            
+            # Get corresponding boundary points
+            start, calls = time.perf_counter(), nonlin_constr.calls
+            X_bd = self._boundary_points(x_int, x_out)
+            time_oracle += time.perf_counter() - start
+            steps = nonlin_constr.calls - calls
+
+            # Update best solution if possible
+            for x_i in X_bd:
+                if c@x_i < c@x_best:
+                    x_best = x_i
+        
+            iter += 1
+
+            # Report the iteration
+            phase_times["lp"] += time_lp
+            phase_times["oracle"] += time_oracle
+            search_steps += steps
+            if self.callback is not None:
+                counts = nonlin_constr.counts() - counts
+                stopped = bool(self.callback({"iter": iter, "bound": c@x_out, "best": c@x_best, 
+                                              "gap": np.abs((c@x_best - c@x_out) / (c@x_out)) if c@x_out != 0 else np.inf, 
+                                              "cuts": pool.active[-1], "evaluations": counts[1], 
+                                              "gradient_evaluations": counts[2], "search_steps": steps, 
+                                              "time_lp": time_lp, "time_oracle": time_oracle}))
+
+        # Return the result
+        gap = c@x_best - c@x_out
+        ground_truth = c@x_out
+        counts = nonlin_constr.counts() - first_counts
+        result = {"x_opt": x_best, "gap": (np.abs(gap/ground_truth)), "iter": iter, 
+                  "termination_reason": terminated(reason=True), 
+                  "cut_pool": {key: value[first_statistic:] for key, value in pool.statistics().items()}, 
+                  "x_int": x_int, "basis": self.get_basis(), 
+                  "evaluations": {"values": int(counts[1]), "gradients": int(counts[2]), "search_steps": search_steps}, 
+                  "phase_times": phase_times}
+        if self.export == "cuts":
+            result.update({"A": self.A, "b": self.b, "cuts": pool.cuts()})
+        else:
+            result.update({"A": model.getA() if self.export == "sparse" else model.getA().toarray(), 
+                           "b": model.getAttr("RHS", model.getConstrs())})
+        return result
+
+
+    def export_cuts(self):
+        """ Export the cuts of the current relaxation (see CutPool.cuts) in the order of the basis from get_basis. """
+        return self.pool.cuts()
+
+
+    def add_cuts(self, cuts):
+        """ Add the cuts G x >= rhs given as dictionary with the entries G and rhs (e.g. from export_cuts). """
+        G = np.atleast_2d(np.asarray(cuts["G"], dtype=np.float64))
+        if len(cuts["rhs"]) == 0:
+            return
+        if np.shape(G)[1] != len(self.c):
+            raise Exception("The cuts do not match the number of variables.")
+        self.pool.add(G, np.asarray(cuts["rhs"], dtype=np.float64), -1)
+
+
+    def get_basis(self):
+        """ Return the basis of the relaxation as dictionary with the lists VBasis and CBasis (see Gurobi). """
+        return {"VBasis": self.model.getAttr("VBasis", self.model.getVars()), 
+                "CBasis": self.model.getAttr("CBasis", self.model.getConstrs())}
+
+
+    def set_basis(self, basis):
+        """ Use the basis (see get_basis) of a relaxation with the same linear constraints and cuts as warm start. """
+        self.model.update()
+        if len(basis["VBasis"]) != self.model.NumVars or len(basis["CBasis"]) != self.model.NumConstrs:
+            raise Exception("The basis does not match the relaxation.")
+        self.model.setAttr("VBasis", self.model.getVars(), list(basis["VBasis"]))
+        self.model.setAttr("CBasis", self.model.getConstrs(), list(basis["CBasis"]))
+
+
+    def close(self):
+        """ Free the model (and the environment unless it is reused). """
+        self.model.dispose()
+        if self.own_env:
+            self.env.dispose()
+
 
-        # Update best solution if possible
-        if c@x_bd < c@x_best:
-            x_best = x_bd
-    
-        iter += 1
+    def _check_interior_points(self):
+        """ Check whether x_int and the interior points are strictly feasible (and hence ensure feasibility of the 
+        original problem). """
+        A, b, x_int = self.A, self.b, self.x_given
+        if not np.all(A@x_int <= b) or not np.all(x_int >= 0) or not eval_nonlin_constr(self.nonlin_constr, x_int, "strictly_feasible"):
+            raise Exception("x_int is not strictly feasible")
+        if not np.all(self.interior_points@np.transpose(A) <= b) or not np.all(self.interior_points >= 0) or \
+           not np.all(eval_nonlin_constr(self.nonlin_constr, self.interior_points, "strictly_feasible")):
+            raise Exception("One of the interior points is not strictly feasible")
 
-    # Return the result
-    gap = c@x_best - c@x_out
-    ground_truth = c@x_out
-    return {"x_opt": x_best, "A": model.getA().toarray(), "b": model.getAttr("RHS", model.getConstrs()), "gap": (np.abs(gap/ground_truth)), 
-            "iter": iter, "termination_reason": stopping_criterion(iter, x_best, x_out, c, reason=True)}
 
+    def _boundary_points(self, x_int, x_out):
+        """ Return the boundary points between x_int (and the further interior points) and the relaxed solution x_out. """
+        search = (self.boundary_search, self.section_points, self.executor)
+        return ([boundary_point(x_int, x_out, self.nonlin_constr, *search)] + 
+                [boundary_point(x_i, x_out, self.nonlin_constr, *search) for x_i in self.interior_points])
 
 
+    def _set_interior_point(self):
+        """ Move x_int to a deep interior point if a center is chosen (see center.py). """
+        self.x_int = self.x_given
+        if self.center is not None:
+            self.x_int = interior_point(self.A, self.b, self.nonlin_constr, self.x_given, self.center, self.env)
@@ -50,4 +50,30 @@ def plot_supporting_hyperplane_method(x_opt, x_int, constr_matrix, constr_rhs, n
     plt.ylim(0,6)
     
     plt.savefig("plot.png")
-    plt.show()
\ No newline at end of file
+    plt.show()
+
+
+def plot_convergence(traces, file="convergence.png"):
+    """
+    Plot the convergence of the supporting hyperplane method recorded by the IterationRecorder from recorder.py.
+
+    Input:
+        traces: Dictionary returned by IterationRecorder.traces
+        file: File the plot is saved to
+    """
+    fig, (ax_values, ax_gap) = plt.subplots(1, 2, figsize=(12,5))
+
+    # Bound of the relaxation and best feasible value in each iteration
+    ax_values.plot(traces["iter"], traces["bound"], 'b', label="Bound of the relaxation")
+    ax_values.plot(traces["iter"], traces["best"], 'k', label="Best feasible value")
+    ax_values.set_xlabel("Iteration")
+    ax_values.set_ylabel("Objective value")
+    ax_values.legend()
+
+    # Relative gap over the total number of points at which the constraints were evaluated
+    ax_gap.semilogy(np.cumsum(traces["evaluations"]), traces["gap"], 'k')
+    ax_gap.set_xlabel("Constraint evaluations")
+    ax_gap.set_ylabel("Relative gap")
+
+    plt.savefig(file)
+    plt.show()
@@ -0,0 +1,53 @@
+"""
+This file implements a callback for the supporting hyperplane method from main.py which records the progress of each
+iteration.
+
+The information passed to the callback is written into one preallocated numpy array whose capacity is doubled when
+it is full, so that recording only costs a few assignments per iteration. The recorded traces can be plotted with
+plot_convergence from plot.py.
+"""
+
+import numpy as np
+
+# Information stored for each iteration (see supporting_hyperplane_method)
+FIELDS = ("iter", "bound", "best", "gap", "cuts", "evaluations", "gradient_evaluations", "search_steps", 
+          "time_lp", "time_oracle")
+CAPACITY = 64       # initial number of iterations the recorder has space for
+
+
+class IterationRecorder:
+    """
+    Callback recording the iterations of supporting_hyperplane_method. Optionally, the method is stopped as soon as the 
+    relative gap is at most max_gap, the total time exceeds max_time seconds or the constraints were evaluated at more 
+    than max_evaluations points.
+    """
+
+    def __init__(self, max_gap=None, max_time=None, max_evaluations=None):
+        self.max_gap = max_gap
+        self.max_time = max_time
+        self.max_evaluations = max_evaluations
+        self.data = np.zeros((CAPACITY, len(FIELDS)))
+        self.count = 0
+        self.total_time = 0
+        self.total_evaluations = 0
+
+
+    def __call__(self, info):
+        """ Store the information of an iteration and return whether the method should stop. """
+        if self.count == len(self.data):
+            self.data = np.vstack((self.data, np.zeros_like(self.data)))
+        row = self.data[self.count]
+        for j, field in enumerate(FIELDS):
+            row[j] = info[field]
+        self.count += 1
+        self.total_time += info["time_lp"] + info["time_oracle"]
+        self.total_evaluations += info["evaluations"]
+
+        return ((self.max_gap is not None and info["gap"] <= self.max_gap) or
+                (self.max_time is not None and self.total_time >= self.max_time) or 
+                (self.max_evaluations is not None and self.total_evaluations >= self.max_evaluations))
+
+
+    def traces(self):
+        """ Return a dictionary with one array per field containing its value in each recorded iteration. """
+        return {field: self.data[:self.count, j] for j, field in enumerate(FIELDS)}
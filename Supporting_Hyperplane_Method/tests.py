@@ -6,10 +6,20 @@ Therefore, the optimal value is compared with the result of the benchmark solver
 import numpy as np
 import gurobipy as gp
 from gurobipy import GRB
-from main import supporting_hyperplane_method
+import time
+from concurrent.futures import ThreadPoolExecutor
+from main import supporting_hyperplane_method, SupportingHyperplaneSolver
+from constraints import QuadraticConstraints
+from chance_constraint import GaussianChanceConstraint
+from scipy.stats import multivariate_normal
+from batch import solve_batch
+from recorder import IterationRecorder
+from aux_fct import ROOT_FINDERS, bisection
+from instances import build_instance
 
 # Relative tolerance up to which an instance is considered to be solved correctly
 TOL = 0.01
+TOL_GUROBI = 1e-5       # relative tolerance of the optimal values computed by Gurobi
 
 
 def test_supporting_hyperplane_method(num):
@@ -77,5 +87,494 @@ def test_supporting_hyperplane_method(num):
     return f"{counter} out of {num} test instances were solved correctly."
 
 
-# Test the algorithm
-print(test_supporting_hyperplane_method(100))
+def gurobi_optimum(A,b,c,D,e,f):
+    """ Return the optimal value of the problem with the quadratic constraints x@D[i]@x + e[i]@x + f[i] >= 0 computed 
+    by Gurobi. """
+    env = gp.Env(empty=True)
+    env.setParam("OutputFlag",0)    # suppress any Gurobi console output
+    env.start()
+    model = gp.Model(env=env)
+    x = model.addMVar(shape = len(c))
+    model.setObjective(c@x, GRB.MINIMIZE)
+    model.addConstr(A@x <= b)
+    for i in range(len(D)):
+        model.addConstr(x@D[i]@x + e[i]@x + f[i] >= 0)
+    model.optimize()
+    opt_val = model.ObjVal
+    model.dispose()
+    env.dispose()
+    return opt_val
+
+
+def test_optimality(num,l):
+    """
+    Solve num randomized problems with l concave quadratic constraints, which are declared to be concave, and compare 
+    the result with the optimal value computed by Gurobi. The returned point has to be feasible and the reported gap 
+    has to bound its distance to the optimal value (up to the tolerance of Gurobi).
+
+    Output:
+        Textual message how many of the results are within the reported gap of the optimal value and the largest 
+        relative error
+    """
+    counter, max_error = 0, 0
+    for _ in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        n = len(c)
+
+        result = supporting_hyperplane_method(A,b,c,QuadraticConstraints(D,e,f),np.zeros(n),concave=True)
+        opt_val = gurobi_optimum(A,b,c,D,e,f)
+        error = (c@result["x_opt"] - opt_val) / np.abs(opt_val)
+        max_error = max(max_error, error)
+        if -TOL_GUROBI <= error <= result["gap"] + TOL_GUROBI:
+            counter += 1
+
+    return f"{counter} out of {num} results are within the reported gap of the optimum (largest relative error {max_error:.2e})."
+
+
+def test_constraint_interface(num,l):
+    """
+    Solve num randomized problems with l concave quadratic constraints once with the constraints given as dictionary of 
+    callables and once as stacked QuadraticConstraints.
+
+    Output:
+        Textual message how many of the optimal values coincide (within some tolerance) and the runtimes of both forms
+    """
+    counter = 0
+    time_dict, time_stacked = 0, 0
+    for _ in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        n = len(c)
+        nonlin_constr = {f"quadratic_{i}": [lambda x, i=i: x@D[i]@x + e[i]@x + f[i], lambda x, i=i: 2*D[i]@x + e[i]] 
+                         for i in range(l)}
+
+        start = time.perf_counter()
+        x_dict = supporting_hyperplane_method(A,b,c,nonlin_constr,np.zeros(n))["x_opt"]
+        time_dict += time.perf_counter() - start
+
+        start = time.perf_counter()
+        x_stacked = supporting_hyperplane_method(A,b,c,QuadraticConstraints(D,e,f),np.zeros(n))["x_opt"]
+        time_stacked += time.perf_counter() - start
+
+        if np.abs((c@x_dict - c@x_stacked) / (c@x_dict)) <= TOL:
+            counter += 1
+
+    return (f"{counter} out of {num} optimal values coincide for both forms of the constraints. "
+            f"Runtime: {time_stacked:.2f}s stacked vs. {time_dict:.2f}s dictionary.")
+
+
+def test_root_finders(num,l):
+    """
+    Solve num randomized problems with l concave quadratic constraints with every method to find the boundary points.
+
+    Output:
+        Textual message how many of the optimal values are at most (up to some tolerance) the ones found by bisection 
+        and the average number of constraint evaluations per boundary point of each method
+    """
+    counter = {method: 0 for method in ROOT_FINDERS}
+    evaluations = {method: 0 for method in ROOT_FINDERS}
+    iterations = {method: 0 for method in ROOT_FINDERS}
+    for _ in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        n = len(c)
+
+        for method in ROOT_FINDERS:
+            result = supporting_hyperplane_method(A,b,c,QuadraticConstraints(D,e,f),np.zeros(n),boundary_search=method)
+            if method == "bisection":
+                reference = c@result["x_opt"]
+            if (c@result["x_opt"] - reference) / np.abs(reference) <= TOL:
+                counter[method] += 1
+            evaluations[method] += result["evaluations"]["values"]
+            iterations[method] += result["iter"] + 1
+
+    return "\n".join(f"{method}: {counter[method]} out of {num} optimal values are at least as good as with bisection, "
+                     f"{evaluations[method] / iterations[method]:.1f} evaluations per boundary point" 
+                     for method in ROOT_FINDERS)
+
+
+def test_ksection(num,l):
+    """
+    Solve num randomized problems with l concave quadratic constraints using k-section searches for several k, once 
+    with batched evaluations and once with one point per task of a thread pool.
+
+    Output:
+        Textual message how many of the solutions and numbers of rounds (batched calls of the constraints) coincide for 
+        both kinds of evaluation and the average number of rounds per boundary point for each k
+    """
+    section_points = [1, 3, 7, 15]
+    counter = {k: 0 for k in section_points}
+    rounds = {k: 0 for k in section_points}
+    iterations = {k: 0 for k in section_points}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for _ in range(num):
+            A, b, c, D, e, f = build_instance(l)
+            n = len(c)
+
+            for k in section_points:
+                result = supporting_hyperplane_method(A,b,c,QuadraticConstraints(D,e,f),np.zeros(n),"ksection",k)
+                result_pool = supporting_hyperplane_method(A,b,c,QuadraticConstraints(D,e,f),np.zeros(n),"ksection",k,
+                                                           executor)
+                if (np.allclose(result["x_opt"], result_pool["x_opt"]) and 
+                    result["evaluations"]["search_steps"] == result_pool["evaluations"]["search_steps"]):
+                    counter[k] += 1
+                rounds[k] += result["evaluations"]["search_steps"]
+                iterations[k] += result["iter"] + 1
+
+    return "\n".join(f"k = {k}: {counter[k]} out of {num} solutions and rounds coincide with the thread pool, "
+                     f"{rounds[k] / iterations[k]:.1f} rounds per boundary point" for k in section_points)
+
+
+def test_chance_constraint(num):
+    """
+    Solve num randomized problems 
+        minimize    c*x
+        subject to  sum(x) <= b
+                    x >= 0
+                    P(Tx >= xi) >= alpha
+    with xi ~ N(mu, Sigma) and nonnegative c and T, once with few and once with many quasi-Monte-Carlo points.
+
+    Output:
+        Textual message how many of the solutions satisfy the chance constraint (checked with scipy up to some 
+        tolerance), how many optimal values coincide for both accuracies and the runtimes of both accuracies
+    """
+    alpha = 0.9
+    feasible, counter = 0, 0
+    runtimes = {256: 0, 4096: 0}
+    for _ in range(num):
+        n = np.random.randint(3,8)
+        m = np.random.randint(2,5)
+        c = np.random.randint(1,10,n)
+        T = np.random.uniform(0,1,(m,n))
+        mu = np.random.uniform(1,3,m)
+        B = np.random.uniform(-1,1,(m,m))
+        Sigma = B@B.T / m + 0.1 * np.eye(m)
+
+        # A point where all components of Tx exceed mu by at least four standard deviations is strictly feasible
+        x_int = np.full(n, np.max((mu + 4 * np.sqrt(np.diag(Sigma))) / np.sum(T, axis=1)))
+        A = np.ones((1,n))
+        b = 2 * A@x_int
+
+        opt_vals = []
+        for num_samples in runtimes:
+            start = time.perf_counter()
+            x_opt = supporting_hyperplane_method(A,b,c,GaussianChanceConstraint(T,mu,Sigma,alpha,num_samples),x_int)["x_opt"]
+            runtimes[num_samples] += time.perf_counter() - start
+            opt_vals.append(c@x_opt)
+        if multivariate_normal(mu,Sigma).cdf(T@x_opt) >= alpha - TOL:
+            feasible += 1
+        if np.abs((opt_vals[0] - opt_vals[1]) / opt_vals[1]) <= TOL:
+            counter += 1
+
+    return (f"{feasible} out of {num} solutions satisfy the chance constraint. {counter} out of {num} optimal values "
+            f"coincide for both accuracies. Runtime: {runtimes[256]:.2f}s with 256 vs. {runtimes[4096]:.2f}s with 4096 "
+            f"points.")
+
+
+def test_multiple_cuts(num,l):
+    """
+    Solve num randomized problems with l concave quadratic constraints with one cut per iteration, with cuts of all 
+    near-active constraints and with cuts from boundary points of several interior points.
+
+    Output:
+        Textual message how many of the optimal values coincide (within some tolerance) with one cut per iteration and 
+        the average number of iterations (i.e. solved relaxations) and runtime of each variant
+    """
+    variants = {"single": {}, "near_active": {"active_tol": 1, "concave": True}, "interior_points": {}}
+    num_interior_points = 4
+    counter = {variant: 0 for variant in variants}
+    iterations = {variant: 0 for variant in variants}
+    runtimes = {variant: 0 for variant in variants}
+    for _ in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        n = len(c)
+        constraints = QuadraticConstraints(D,e,f)
+
+        # Interior points halfway between 0 and the boundary in random directions
+        interior_points = []
+        for _ in range(num_interior_points):
+            direction = np.random.uniform(0,1,n)
+            direction *= np.min(b / (A@direction))
+            interior_points.append(bisection(np.zeros(n), direction, constraints) / 2)
+
+        for variant, options in variants.items():
+            if variant == "interior_points":
+                options = {"interior_points": np.array(interior_points)}
+            start = time.perf_counter()
+            result = supporting_hyperplane_method(A,b,c,constraints,np.zeros(n),**options)
+            runtimes[variant] += time.perf_counter() - start
+            iterations[variant] += result["iter"]
+            if variant == "single":
+                reference = c@result["x_opt"]
+            if np.abs((c@result["x_opt"] - reference) / reference) <= TOL:
+                counter[variant] += 1
+
+    return "\n".join(f"{variant}: {counter[variant]} out of {num} optimal values coincide with one cut per iteration, "
+                     f"{iterations[variant] / num:.1f} iterations, {runtimes[variant]:.2f}s" for variant in variants)
+
+
+def test_cut_pool(num,l):
+    """
+    Solve num randomized problems with l concave quadratic constraints once keeping all cuts and once removing cuts 
+    which are inactive for several iterations. Moreover, the dense, sparse and cut export of the final relaxation are 
+    compared.
+
+    Output:
+        Textual message how many of the optimal values coincide (within some tolerance), the average number of cuts 
+        in the final relaxation and the runtimes of both variants as well as how many of the exports coincide
+    """
+    counter, exports = 0, 0
+    cuts = {"all": 0, "pool": 0}
+    runtimes = {"all": 0, "pool": 0}
+    for _ in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        n = len(c)
+        constraints = QuadraticConstraints(D,e,f)
+
+        start = time.perf_counter()
+        result = supporting_hyperplane_method(A,b,c,constraints,np.zeros(n))
+        runtimes["all"] += time.perf_counter() - start
+        cuts["all"] += result["cut_pool"]["active"][-1] if result["iter"] > 0 else 0
+
+        start = time.perf_counter()
+        result_pool = supporting_hyperplane_method(A,b,c,constraints,np.zeros(n),max_cut_age=5,export="cuts")
+        runtimes["pool"] += time.perf_counter() - start
+        cuts["pool"] += len(result_pool["cuts"]["rhs"])
+
+        if np.abs((c@result["x_opt"] - c@result_pool["x_opt"]) / (c@result["x_opt"])) <= TOL:
+            counter += 1
+
+        # The final relaxation consists of Ax <= b and the cuts G x >= rhs
+        result_sparse = supporting_hyperplane_method(A,b,c,constraints,np.zeros(n),max_cut_age=5,export="sparse")
+        result_dense = supporting_hyperplane_method(A,b,c,constraints,np.zeros(n),max_cut_age=5)
+        if (np.allclose(result_sparse["A"].toarray(), result_dense["A"]) and 
+            np.allclose(result_dense["A"], np.vstack((A, result_pool["cuts"]["G"]))) and
+            np.allclose(result_dense["b"], np.concatenate((b, result_pool["cuts"]["rhs"])))):
+            exports += 1
+
+    return (f"{counter} out of {num} optimal values coincide when removing old cuts. Final relaxation: "
+            f"{cuts['pool'] / num:.1f} instead of {cuts['all'] / num:.1f} cuts on average. Runtime: {runtimes['pool']:.2f}s "
+            f"vs. {runtimes['all']:.2f}s. {exports} out of {num} exports coincide.")
+
+
+def test_center(num,l):
+    """
+    Solve num randomized problems with l concave quadratic constraints starting from x_int = 0, from the Chebyshev and 
+    the analytic center and with re-centering.
+
+    Output:
+        Textual message how many of the optimal values are at most (up to some tolerance) the ones for x_int = 0 and 
+        the average number of iterations of each variant
+    """
+    variants = {"origin": {}, "chebyshev": {"center": "chebyshev"}, "analytic": {"center": "analytic"}, 
+                "recenter": {"recenter": 5}, "analytic_recenter": {"center": "analytic", "recenter": 5}}
+    counter = {variant: 0 for variant in variants}
+    iterations = {variant: 0 for variant in variants}
+    for _ in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        n = len(c)
+        constraints = QuadraticConstraints(D,e,f)
+
+        for variant, options in variants.items():
+            result = supporting_hyperplane_method(A,b,c,constraints,np.zeros(n),**options)
+            iterations[variant] += result["iter"]
+            if variant == "origin":
+                reference = c@result["x_opt"]
+            if (c@result["x_opt"] - reference) / np.abs(reference) <= TOL:
+                counter[variant] += 1
+
+    return "\n".join(f"{variant}: {counter[variant]} out of {num} optimal values are at least as good as with x_int = 0, "
+                     f"{iterations[variant] / num:.1f} iterations" for variant in variants)
+
+
+def test_batch(num,l,num_workers):
+    """
+    Solve num randomized problems with l concave quadratic constraints one after another and as a batch with 
+    num_workers worker processes.
+
+    Output:
+        Textual message how many of the batch results coincide with the sequential ones, how many instances failed and 
+        the total runtimes
+    """
+    instances = []
+    for _ in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        instances.append({"A": A, "b": b, "c": c, "nonlin_constr": QuadraticConstraints(D,e,f), "x_int": np.zeros(len(c))})
+
+    start = time.perf_counter()
+    x_opts = []
+    for instance in instances:
+        try:
+            x_opts.append(supporting_hyperplane_method(**instance)["x_opt"])
+        except Exception:
+            x_opts.append(None)
+    time_sequential = time.perf_counter() - start
+
+    counter, failed = 0, 0
+    start = time.perf_counter()
+    for record in solve_batch(instances, num_workers):
+        if "error" in record:
+            failed += 1
+        elif x_opts[record["index"]] is not None and np.allclose(record["result"]["x_opt"], x_opts[record["index"]]):
+            counter += 1
+    time_batch = time.perf_counter() - start
+
+    return (f"{counter} out of {num} batch results coincide with the sequential ones ({failed} failed). "
+            f"Runtime: {time_batch:.2f}s batch vs. {time_sequential:.2f}s sequential.")
+
+
+def test_batch_errors(num,l,num_workers):
+    """
+    Solve a batch of num randomized problems with l concave quadratic constraints, where every third instance is given
+    in the dictionary form with lambda functions, which cannot be pickled to the worker processes.
+
+    Output:
+        Textual message how many instances returned a result and how many reported an error
+    """
+    instances = []
+    for i in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        if i % 3 == 0:
+            nonlin_constr = {f"constraint_{j}": [lambda x, j=j: x@D[j]@x + e[j]@x + f[j], lambda x, j=j: 2*D[j]@x + e[j]] 
+                             for j in range(l)}
+        else:
+            nonlin_constr = QuadraticConstraints(D, e, f)
+        instances.append({"A": A, "b": b, "c": c, "nonlin_constr": nonlin_constr, "x_int": np.zeros(len(c))})
+
+    results, errors = set(), set()
+    for record in solve_batch(instances, num_workers):
+        (errors if "error" in record else results).add(record["index"])
+
+    correct = errors == set(range(0,num,3)) and results == set(range(num)) - errors
+    return (f"{len(results)} out of {num} instances returned a result and {len(errors)} reported an error "
+            f"({'as expected' if correct else 'not as expected'}).")
+
+
+def test_warm_start(num,l):
+    """
+    Solve num randomized problems with l concave quadratic constraints, perturb the objective and solve the perturbed 
+    problem from scratch, warm-started with the cuts and basis of the first solve and by the persistent solver. Then, 
+    the persistent solver also solves the problem with a smaller right-hand side. The constraints are declared to be 
+    concave, such that every result has to be within its reported gap of the optimal value computed by Gurobi.
+
+    Output:
+        Textual message how many results of each variant are within the reported gap of the optimal value and the 
+        average number of iterations and runtimes of each variant
+    """
+    variants = ("scratch", "cuts", "persistent", "persistent_rhs")
+    counter = {variant: 0 for variant in variants}
+    iterations = {variant: 0 for variant in variants}
+    runtimes = {variant: 0 for variant in variants}
+    for _ in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        n = len(c)
+        c_new = c + np.random.uniform(-0.5,0.5,n)
+        b_new = 0.9 * b
+        constraints = QuadraticConstraints(D,e,f)
+        optima = {"c": gurobi_optimum(A,b,c_new,D,e,f), "b": gurobi_optimum(A,b_new,c_new,D,e,f)}
+
+        solver = SupportingHyperplaneSolver(A,b,c,constraints,np.zeros(n),export="cuts",concave=True)
+        first = solver.solve()
+
+        for variant in variants:
+            start = time.perf_counter()
+            if variant == "scratch":
+                result = supporting_hyperplane_method(A,b,c_new,constraints,np.zeros(n),concave=True)
+            elif variant == "cuts":
+                result = supporting_hyperplane_method(A,b,c_new,constraints,np.zeros(n),cuts=first["cuts"],basis=first["basis"],
+                                                      concave=True)
+            elif variant == "persistent":
+                result = solver.solve(c=c_new)
+            else:
+                result = solver.solve(b=b_new)
+            runtimes[variant] += time.perf_counter() - start
+            iterations[variant] += result["iter"]
+
+            opt_val = optima["b" if variant == "persistent_rhs" else "c"]
+            error = (c_new@result["x_opt"] - opt_val) / np.abs(opt_val)
+            if -TOL_GUROBI <= error <= result["gap"] + TOL_GUROBI:
+                counter[variant] += 1
+        solver.close()
+
+    return "\n".join(f"{variant}: {counter[variant]} out of {num} results within the reported gap of the optimum, "
+                     f"{iterations[variant] / num:.1f} iterations, {runtimes[variant]:.2f}s" for variant in variants)
+
+
+def test_recorder(num,l,max_gap):
+    """
+    Solve num randomized problems with l concave quadratic constraints once to optimality and once stopped by the 
+    recorder as soon as the relative gap is at most max_gap.
+
+    Output:
+        Textual message how many recordings are complete, the average number of iterations of both variants, the 
+        evaluations per iteration and the share of the linear programs and the oracle in the total time
+    """
+    complete = 0
+    iterations = {"full": 0, "stopped": 0}
+    evaluations = {"values": 0, "gradients": 0, "search_steps": 0}
+    phase_times = {"lp": 0, "oracle": 0}
+    for _ in range(num):
+        A, b, c, D, e, f = build_instance(l)
+        n = len(c)
+        constraints = QuadraticConstraints(D,e,f)
+
+        recorder = IterationRecorder()
+        full = supporting_hyperplane_method(A,b,c,constraints,np.zeros(n),callback=recorder)
+        traces = recorder.traces()
+        stopped = supporting_hyperplane_method(A,b,c,constraints,np.zeros(n),callback=IterationRecorder(max_gap=max_gap))
+
+        # The recorded evaluations only miss the initial boundary search
+        if (len(traces["iter"]) == full["iter"] and np.sum(traces["evaluations"]) <= full["evaluations"]["values"] and 
+            np.sum(traces["gradient_evaluations"]) == full["evaluations"]["gradients"]):
+            complete += 1
+        iterations["full"] += full["iter"]
+        iterations["stopped"] += stopped["iter"]
+        for key in evaluations:
+            evaluations[key] += full["evaluations"][key]
+        for key in phase_times:
+            phase_times[key] += full["phase_times"][key]
+
+    total = sum(phase_times.values())
+    return (f"{complete} out of {num} recordings are complete. Iterations: {iterations['full'] / num:.1f} to optimality, "
+            f"{iterations['stopped'] / num:.1f} when stopped at gap {max_gap}. Per iteration: "
+            + ", ".join(f"{evaluations[key] / iterations['full']:.1f} {key}" for key in evaluations) + 
+            ". Time: " + ", ".join(f"{phase} {100 * time / total:.0f}%" for phase, time in phase_times.items()) + ".")
+
+
+if __name__ == "__main__":
+    # Test the algorithm
+    print(test_supporting_hyperplane_method(100))
+
+    # Compare the results with the optimal values for several quadratic constraints
+    print(test_optimality(30,5))
+
+    # Compare the dictionary form with stacked quadratic constraints
+    print(test_constraint_interface(20,10))
+
+    # Compare the methods to find the boundary points
+    print(test_root_finders(20,10))
+
+    # Compare k-section searches with several numbers of points per round
+    print(test_ksection(10,10))
+
+    # Solve problems with a Gaussian chance constraint
+    print(test_chance_constraint(10))
+
+    # Compare one with several cuts per iteration
+    print(test_multiple_cuts(10,5))
+
+    # Compare keeping all cuts with removing old cuts
+    print(test_cut_pool(10,5))
+
+    # Compare several interior points
+    print(test_center(10,5))
+
+    # Solve many instances in parallel worker processes
+    print(test_batch(20,5,4))
+
+    # Report the instances which cannot be sent to the workers without losing the others
+    print(test_batch_errors(9,5,3))
+
+    # Re-optimize after changing the objective
+    print(test_warm_start(10,5))
+
+    # Record each iteration and stop early
+    print(test_recorder(10,5,0.01))